@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录现场记录（截图/页面快照）
+登录流程中只向浏览器取回原始数据，解码、压缩和写盘放到后台线程，
+并按总大小和保存时间清理旧文件，长期运行的保活进程也不会占满磁盘
+"""
+
+import os
+import gzip
+import time
+import queue
+import atexit
+import base64
+import logging
+import threading
+
+
+# 记录时机：off不记录，failure只在失败时记录，always每次都记录
+ARTIFACT_MODES = ("off", "failure", "always")
+
+# 记录格式：png为截图，html为页面源码快照（gzip压缩，体积小且可搜索）
+ARTIFACT_FORMATS = ("png", "html")
+
+_SUFFIXES = (".png", ".html.gz")
+
+
+class ArtifactCollector:
+    """登录现场记录器"""
+
+    def __init__(self, directory: str = "artifacts", mode: str = "failure", fmt: str = "png",
+                 max_bytes: int = 50 * 1024 * 1024, max_age: float = 7 * 24 * 3600, logger=None):
+        """
+        Args:
+            directory (str): 保存目录
+            mode (str): 记录时机，ARTIFACT_MODES之一
+            fmt (str): 记录格式，ARTIFACT_FORMATS之一
+            max_bytes (int): 目录中记录文件的总大小上限（字节），超出时从最旧的开始删除
+            max_age (float): 记录文件的最长保存时间（秒）
+            logger: 日志记录器
+        """
+        if mode not in ARTIFACT_MODES:
+            raise ValueError(f"不支持的记录时机: {mode}，可选值: {', '.join(ARTIFACT_MODES)}")
+        if fmt not in ARTIFACT_FORMATS:
+            raise ValueError(f"不支持的记录格式: {fmt}，可选值: {', '.join(ARTIFACT_FORMATS)}")
+        self.directory = directory
+        self.mode = mode
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.logger = logger or logging.getLogger(__name__)
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def wants(self, success: bool) -> bool:
+        """本次结果是否需要记录"""
+        return self.mode == "always" or (self.mode == "failure" and not success)
+
+    def capture(self, driver, name: str, success: bool = False):
+        """
+        取回当前页面的截图或源码并交给后台线程写盘
+
+        Args:
+            driver: WebDriver实例
+            name (str): 记录名称，如login_failed
+            success (bool): 本次操作是否成功
+
+        Returns:
+            str: 将要写入的文件路径，不需要记录或取回失败时返回None
+        """
+        if driver is None or not self.wants(success):
+            return None
+        try:
+            if self.fmt == "png":
+                # 直接保留base64文本，解码放到后台线程
+                payload = driver.get_screenshot_as_base64()
+            else:
+                payload = driver.page_source
+        except Exception as e:
+            self.logger.error(f"获取现场记录失败: {str(e)}")
+            return None
+
+        timestamp = time.strftime("%Y%m%d_%H%M%S") + f"_{int(time.time() * 1000) % 1000:03d}"
+        suffix = ".png" if self.fmt == "png" else ".html.gz"
+        path = os.path.join(self.directory, f"{timestamp}_{name}{suffix}")
+        self._ensure_worker()
+        self._queue.put((path, payload))
+        return path
+
+    def _ensure_worker(self):
+        """首次记录时启动后台线程"""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                self._worker.start()
+                # 单次运行的命令行进程退出前把队列中的记录写完
+                atexit.register(self.flush, 5)
+
+    def _run(self):
+        while True:
+            path, payload = self._queue.get()
+            try:
+                self._write(path, payload)
+                self.prune()
+            except Exception as e:
+                self.logger.error(f"保存现场记录失败: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, path: str, payload: str):
+        """解码或压缩后写入文件，先写临时文件再改名，避免留下半个文件"""
+        os.makedirs(self.directory, exist_ok=True)
+        if path.endswith(".png"):
+            data = base64.b64decode(payload)
+        else:
+            data = gzip.compress(payload.encode("utf-8"), compresslevel=6)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.logger.info(f"现场记录已保存: {path}")
+
+    def prune(self) -> int:
+        """
+        删除超过保存时间的记录，然后从最旧的开始删除，直到总大小不超过上限
+
+        Returns:
+            int: 删除的文件数
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+
+        now = time.time()
+        files, removed = [], 0
+        for name in names:
+            if not name.endswith(_SUFFIXES):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if self.max_age is not None and now - stat.st_mtime > self.max_age:
+                removed += self._remove(path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        if self.max_bytes is not None:
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                removed += self._remove(path)
+                total -= size
+        return removed
+
+    def _remove(self, path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待队列中的记录全部写完
+
+        Args:
+            timeout (float): 最长等待时间（秒），None为一直等待
+
+        Returns:
+            bool: 是否已全部写完
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
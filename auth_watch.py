@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+根据浏览器网络事件判断登录/注销结果
+从Chrome的performance日志（DevTools Network事件）中找到认证页面发出的srun_portal请求，
+按其HTTP状态和响应内容给出结论，服务器一作出响应即可判定，不必等页面元素变化
+"""
+
+import time
+import json
+import base64
+from urllib.parse import urlparse, parse_qs
+
+from portal_http import parse_jsonp, PortalUnavailableError
+
+
+# 认证接口路径
+AUTH_PATH = "/cgi-bin/srun_portal"
+
+
+class AuthVerdict:
+    """认证接口的响应结论"""
+
+    def __init__(self, ok: bool, status: int = None, message: str = None, data: dict = None,
+                 latency: float = None):
+        """
+        Args:
+            ok (bool): 认证服务器是否接受了请求
+            status (int): HTTP状态码，请求未完成时为None
+            message (str): 服务器返回的错误信息
+            data (dict): 解析后的响应内容，页面跳转导致响应内容不可读时为空
+            latency (float): 从发出请求到收到响应的耗时（秒）
+        """
+        self.ok = ok
+        self.status = status
+        self.message = message
+        self.data = data or {}
+        self.latency = latency
+
+    @property
+    def ip(self):
+        """认证服务器看到的本机IP地址"""
+        return self.data.get("client_ip") or self.data.get("online_ip")
+
+    def __repr__(self):
+        return f"AuthVerdict(ok={self.ok}, status={self.status}, message={self.message!r})"
+
+
+class AuthResponseWatcher:
+    """监视一次登录或注销请求的网络事件"""
+
+    def __init__(self, driver, action: str = "login", path: str = AUTH_PATH):
+        """
+        创建后即开始监视，此前发出的请求不计入
+
+        Args:
+            driver: 开启了performance日志的Chrome WebDriver
+            action (str): 要监视的请求类型，login或logout
+            path (str): 认证接口路径
+        """
+        self.driver = driver
+        self.action = action
+        self.path = path
+        self.armed_at = time.time() * 1000
+        self.available = True
+        self._requests = {}
+        self._navigated = False
+
+    def _matches(self, url: str) -> bool:
+        parsed = urlparse(url)
+        return parsed.path.endswith(self.path) and parse_qs(parsed.query).get("action") == [self.action]
+
+    def _read_body(self, request_id: str):
+        """读取响应内容，页面已跳转导致内容被浏览器丢弃时返回None"""
+        try:
+            result = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return None
+        body = result.get("body", "")
+        if result.get("base64Encoded"):
+            body = base64.b64decode(body).decode("utf-8", "replace")
+        try:
+            return parse_jsonp(body)
+        except PortalUnavailableError:
+            return None
+
+    def poll(self):
+        """
+        读取新的网络事件
+
+        Returns:
+            AuthVerdict: 已得出结论时返回，尚未得出结论时返回None
+        """
+        try:
+            entries = self.driver.get_log("performance")
+        except Exception:
+            # 浏览器不支持performance日志，由调用方改用页面元素判断
+            self.available = False
+            return None
+
+        for entry in entries:
+            if entry.get("timestamp", 0) < self.armed_at:
+                continue
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method, params = message.get("method"), message.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.requestWillBeSent":
+                if self._matches(params.get("request", {}).get("url", "")):
+                    self._requests[request_id] = {"sent": params.get("timestamp")}
+                elif params.get("type") == "Document" and any(r.get("finished") for r in self._requests.values()):
+                    self._navigated = True
+            elif request_id in self._requests:
+                request = self._requests[request_id]
+                if method == "Network.responseReceived":
+                    request["status"] = params.get("response", {}).get("status")
+                    request["received"] = params.get("timestamp")
+                elif method == "Network.loadingFinished":
+                    request["finished"] = True
+                    request["data"] = self._read_body(request_id)
+                elif method == "Network.loadingFailed":
+                    return AuthVerdict(False, message=f"网络错误: {params.get('errorText')}")
+
+        return self._verdict()
+
+    def _verdict(self):
+        for request in self._requests.values():
+            if not request.get("finished"):
+                continue
+            status, data = request.get("status"), request.get("data")
+            latency = None
+            if request.get("sent") is not None and request.get("received") is not None:
+                latency = request["received"] - request["sent"]
+            if status is not None and status >= 400:
+                return AuthVerdict(False, status, f"HTTP {status}", latency=latency)
+            if data is not None:
+                ok = data.get("error") == "ok" or data.get("res") == "ok"
+                message = None if ok else (data.get("error_msg") or data.get("error") or data.get("res"))
+                return AuthVerdict(ok, status, message, data, latency)
+            if self._navigated:
+                # 响应正常且页面随即跳转（认证成功后的跳转），响应内容已随旧页面丢弃
+                return AuthVerdict(True, status, latency=latency)
+        return None
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录流程基准测试
+在本地模拟认证服务器（mock_portal.py）上测量各登录引擎的冷启动登录、热登录、注销和注销再登录耗时，
+以及测试期间进程树（含浏览器与chromedriver）的峰值内存；并对比各浏览器启动配置从启动浏览器到
+登录表单可操作的耗时和浏览器内存，以及各浏览器后端的启动耗时和内存，可在无网络的Linux机器上离线运行；
+指定--trace时改为在回放服务器上重复录制的操作，用同一份真实认证过程对比不同版本脚本的耗时；
+另外检查`gdipu_auto_login.py status`的冷启动耗时是否在预算内
+
+用法:
+    python bench_login.py --engines http,selenium --iterations 5 --json bench.json
+    python bench_login.py --engines selenium --profiles lean,full --asset-delay 5
+    python bench_login.py --engines selenium,selenium-stepwise --profiles ""
+    python bench_login.py --engines "" --profiles "" --backends chrome,cdp,firefox
+    python bench_login.py --trace trace.json.gz --engines selenium --latency-scale 1.0 --json bench.json
+    python bench_login.py --engines "" --profiles "" --startup-runs 20
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+from gdipu_auto_login import GDIPUAutoLogin, Operations, CHROME_PROFILES
+from browser_backends import BROWSER_BACKENDS
+from logging_setup import setup_logging
+from metrics import PhaseMetrics, percentile
+from mock_portal import MockPortal, MockPortalServer
+from portal_trace import ReplayPortal, ReplayServer, load_trace
+from portal_probe import PortalProbe
+from procmem import PeakRSSSampler, format_bytes
+
+
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+SCENARIOS = ("cold_login", "warm_login", "logout", "relogin")
+
+# `status`子命令冷启动耗时的预算（毫秒），扣除空解释器的启动耗时：
+# 解释器本身的启动耗时随机器和site-packages中的.pth钩子差异很大，不计入脚本的预算
+STARTUP_BUDGET_MS = 120
+
+# 冷启动测试的启动脚本：以指向模拟认证服务器的配置代替config.py，再像命令行一样运行主脚本
+# （runpy.run_path与直接运行脚本一样每次都重新编译主脚本）
+_STARTUP_BOOTSTRAP = """
+import os, sys, types, runpy
+script, portal_url = sys.argv[1:3]
+config = types.ModuleType("config")
+config.PORTAL_URL = portal_url
+config.CONNECTIVITY_CHECK_URL = None
+sys.modules["config"] = config
+sys.path.insert(0, os.path.dirname(script))
+sys.argv = [script, "--json", "status"]
+runpy.run_path(script, run_name="__main__")
+"""
+
+# 可测试的登录引擎：selenium为批量脚本登录，selenium-stepwise为逐个元素操作
+BENCH_ENGINES = {
+    "http": {"engine": "http"},
+    "selenium": {"engine": "selenium", "batched_login": True},
+    "selenium-stepwise": {"engine": "selenium", "batched_login": False},
+    "race": {"engine": "race"},
+}
+
+
+class LoginBenchmark:
+    """在模拟认证服务器上运行各场景的基准测试"""
+
+    def __init__(self, server: MockPortalServer, headless: bool = True, iterations: int = 5):
+        """
+        Args:
+            server (MockPortalServer): 已启动的模拟认证服务器（或回放服务器ReplayServer）
+            headless (bool): 浏览器是否使用无头模式
+            iterations (int): 每个场景的重复次数
+        """
+        self.server = server
+        self.headless = headless
+        self.iterations = iterations
+
+    def create_login(self, engine: str, chrome_profile: str = "lean", browser: str = "chrome") -> GDIPUAutoLogin:
+        """创建指向模拟认证服务器的登录实例，不写入计时文件"""
+        login = GDIPUAutoLogin(
+            BENCH_USERNAME, BENCH_PASSWORD, headless=self.headless,
+            metrics=PhaseMetrics(jsonl_path=None, prometheus_path=None),
+            target_url=self.server.url, chrome_profile=chrome_profile, browser=browser,
+            **BENCH_ENGINES[engine]
+        )
+        login.probe = PortalProbe(self.server.url, check_url=self.server.url + "generate_204", ttl=0)
+        return login
+
+    def engine_available(self, engine: str) -> bool:
+        """HTTP引擎总是可用；浏览器引擎需要能启动浏览器"""
+        if BENCH_ENGINES[engine]["engine"] != "selenium":
+            return True
+        login = self.create_login(engine)
+        try:
+            return login.setup_driver()
+        finally:
+            login.cleanup()
+
+    def _ensure_online(self, operations: Operations, online: bool):
+        """在计时之外把模拟服务器上的登录状态调整到场景需要的初始状态"""
+        if online:
+            if not self.server.portal.is_online("127.0.0.1"):
+                operations.login.login()
+        else:
+            self.server.portal.expire()
+
+    def _measure(self, operations: Operations, func) -> tuple:
+        """执行一次并计时，同时统计WebDriver往返次数，屏蔽操作类打印到控制台的提示"""
+        metrics = operations.login.metrics
+        with redirect_stdout(io.StringIO()):
+            round_trips = metrics.round_trips
+            start = time.perf_counter()
+            success = bool(func())
+            return time.perf_counter() - start, success, metrics.round_trips - round_trips
+
+    def run_scenario(self, engine: str, scenario: str) -> dict:
+        """运行单个场景，返回耗时统计"""
+        durations, round_trips, successes = [], [], 0
+        with PeakRSSSampler() as sampler:
+            if scenario == "cold_login":
+                for _ in range(self.iterations):
+                    self.server.portal.expire()
+                    operations = Operations(self.create_login(engine))
+                    duration, success, trips = self._measure(operations, operations.execute_login)
+                    durations.append(duration)
+                    round_trips.append(trips)
+                    successes += success
+            else:
+                operations = Operations(self.create_login(engine))
+                with operations.login.session.hold():
+                    # 预热：启动浏览器并完成一次完整登录
+                    self._ensure_online(operations, False)
+                    with redirect_stdout(io.StringIO()):
+                        operations.login.login()
+                    for _ in range(self.iterations):
+                        if scenario == "warm_login":
+                            self._ensure_online(operations, False)
+                            duration, success, trips = self._measure(operations, operations.login.login)
+                        elif scenario == "logout":
+                            self._ensure_online(operations, True)
+                            duration, success, trips = self._measure(operations, operations.execute_logout)
+                        else:
+                            self._ensure_online(operations, True)
+                            duration, success, trips = self._measure(operations, operations.execute_logout_and_relogin)
+                        durations.append(duration)
+                        round_trips.append(trips)
+                        successes += success
+
+        return {
+            "engine": engine,
+            "scenario": scenario,
+            "iterations": len(durations),
+            "successes": successes,
+            "p50_ms": percentile(durations, 0.5) * 1000,
+            "p95_ms": percentile(durations, 0.95) * 1000,
+            "min_ms": min(durations) * 1000,
+            "max_ms": max(durations) * 1000,
+            "round_trips": sum(round_trips) / len(round_trips),
+            "peak_rss_bytes": sampler.peak,
+        }
+
+    def run_profile(self, chrome_profile: str) -> dict:
+        """
+        测量浏览器启动配置：从启动浏览器到登录表单可操作的耗时（time-to-interactive-form），
+        以及此时chromedriver与浏览器进程树的内存
+        """
+        durations, rss, successes = [], [], 0
+        for _ in range(self.iterations):
+            self.server.portal.expire()
+            login = self.create_login("selenium", chrome_profile)
+            try:
+                start = time.perf_counter()
+                ready = login.setup_driver() and login.open_target_website() and login.locate_login_elements()
+                durations.append(time.perf_counter() - start)
+                successes += bool(ready)
+                if login.driver:
+                    rss.append(login.backend.memory(login.driver))
+            finally:
+                login.cleanup()
+        
+        return {
+            "profile": chrome_profile,
+            "iterations": len(durations),
+            "successes": successes,
+            "p50_ms": percentile(durations, 0.5) * 1000,
+            "p95_ms": percentile(durations, 0.95) * 1000,
+            "max_ms": max(durations) * 1000,
+            "browser_rss_bytes": max(rss, default=0),
+        }
+
+    def run_backend(self, browser: str) -> dict:
+        """
+        测量浏览器后端：启动耗时、从启动到登录表单可操作的耗时、一次完整登录的耗时，
+        以及登录表单可操作时浏览器（及驱动）进程树的内存
+        """
+        launches, forms, logins, rss, successes = [], [], [], [], 0
+        for _ in range(self.iterations):
+            self.server.portal.expire()
+            login = self.create_login("selenium", browser=browser)
+            try:
+                start = time.perf_counter()
+                ready = login.setup_driver() and login.open_target_website() and login.locate_login_elements()
+                if not ready:
+                    continue
+                forms.append(time.perf_counter() - start)
+                launches.append(login.backend.launch_time)
+                rss.append(login.backend.memory(login.driver))
+                with login.session.hold():
+                    duration, success, _ = self._measure(Operations(login), login.login)
+                logins.append(duration)
+                successes += success
+            finally:
+                login.cleanup()
+        
+        return {
+            "backend": browser,
+            "iterations": self.iterations,
+            "successes": successes,
+            "launch_p50_ms": percentile(launches, 0.5) * 1000 if launches else None,
+            "form_p50_ms": percentile(forms, 0.5) * 1000 if forms else None,
+            "login_p50_ms": percentile(logins, 0.5) * 1000 if logins else None,
+            "browser_rss_bytes": max(rss, default=0),
+        }
+
+    def run_backends(self, backends) -> list:
+        """对比各浏览器后端，无法启动的后端跳过"""
+        results = []
+        for browser in backends:
+            login = self.create_login("selenium", browser=browser)
+            try:
+                available = login.setup_driver()
+            finally:
+                login.cleanup()
+            if not available:
+                print(f"⚠️  跳过 {browser} 后端：无法启动浏览器", file=sys.stderr)
+                continue
+            results.append(self.run_backend(browser))
+        return results
+
+    def run_startup(self, runs: int, budget_ms: float = STARTUP_BUDGET_MS) -> dict:
+        """
+        在新进程中运行`gdipu_auto_login.py --json status`，测量冷启动耗时，并与空解释器的启动耗时对比
+
+        Args:
+            runs (int): 重复次数
+            budget_ms (float): 耗时预算（毫秒），按p50扣除空解释器启动耗时p50后的部分判断
+
+        Returns:
+            dict: 耗时统计，within_budget为扣除解释器启动后的p50是否在预算内
+        """
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gdipu_auto_login.py")
+        command = [sys.executable, "-c", _STARTUP_BOOTSTRAP, script, self.server.url]
+        durations, bare, states = [], [], set()
+        # 在临时目录中运行，回退到完整流程时也不会在仓库中留下日志文件
+        with tempfile.TemporaryDirectory(prefix="gdipu_bench_") as cwd:
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, "-c", "pass"], cwd=cwd, check=False)
+                bare.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                completed = subprocess.run(command, cwd=cwd, capture_output=True, text=True, check=False)
+                durations.append(time.perf_counter() - start)
+                try:
+                    states.add(json.loads(completed.stdout.strip().splitlines()[-1])["state"])
+                except (IndexError, ValueError, KeyError):
+                    states.add(None)
+
+        p50 = percentile(durations, 0.5) * 1000
+        interpreter_p50 = percentile(bare, 0.5) * 1000
+        return {
+            "runs": runs,
+            "states": sorted(str(state) for state in states),
+            "p50_ms": p50,
+            "p95_ms": percentile(durations, 0.95) * 1000,
+            "interpreter_p50_ms": interpreter_p50,
+            "overhead_p50_ms": p50 - interpreter_p50,
+            "budget_ms": budget_ms,
+            "within_budget": p50 - interpreter_p50 <= budget_ms,
+        }
+
+    def run_replay(self, engine: str, operation: str) -> dict:
+        """在回放服务器上重复录制的操作，每次都从录制的开头回放"""
+        durations, round_trips, successes = [], [], 0
+        with PeakRSSSampler() as sampler:
+            for _ in range(self.iterations):
+                self.server.portal.reset()
+                login = self.create_login(engine)
+                # 回放服务器只有录制过的地址，不做门户劫持检测
+                login.probe = PortalProbe(self.server.url, check_url=None, ttl=0)
+                operations = Operations(login)
+                func = {
+                    "logout": operations.execute_logout,
+                    "relogin": operations.execute_logout_and_relogin,
+                }.get(operation, lambda: operations.execute_login(force=True))
+                duration, success, trips = self._measure(operations, func)
+                durations.append(duration)
+                round_trips.append(trips)
+                successes += success
+                if self.server.portal.misses:
+                    print(f"⚠️  {engine} 引擎发出了 {self.server.portal.misses} 个录制中没有的请求",
+                          file=sys.stderr)
+
+        return {
+            "engine": engine,
+            "scenario": f"replay_{operation}",
+            "iterations": len(durations),
+            "successes": successes,
+            "p50_ms": percentile(durations, 0.5) * 1000,
+            "p95_ms": percentile(durations, 0.95) * 1000,
+            "min_ms": min(durations) * 1000,
+            "max_ms": max(durations) * 1000,
+            "round_trips": sum(round_trips) / len(round_trips),
+            "peak_rss_bytes": sampler.peak,
+        }
+
+    def run(self, engines) -> list:
+        """运行全部引擎与场景"""
+        results = []
+        for engine in engines:
+            if not self.engine_available(engine):
+                print(f"⚠️  跳过 {engine} 引擎：无法启动浏览器", file=sys.stderr)
+                continue
+            for scenario in SCENARIOS:
+                results.append(self.run_scenario(engine, scenario))
+        return results
+
+    def run_profiles(self, profiles) -> list:
+        """对比各浏览器启动配置"""
+        if not profiles:
+            return []
+        if not self.engine_available("selenium"):
+            print("⚠️  跳过浏览器启动配置对比：无法启动浏览器", file=sys.stderr)
+            return []
+        return [self.run_profile(profile) for profile in profiles]
+
+
+def print_results(results: list):
+    """以表格形式输出结果"""
+    header = (f"{'engine':<19}{'scenario':<16}{'ok/n':>8}{'p50 ms':>10}{'p95 ms':>10}{'min ms':>10}{'max ms':>10}"
+              f"{'WD RT':>8}{'peak RSS':>12}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['engine']:<19}{r['scenario']:<16}{r['successes']:>4}/{r['iterations']:<3}"
+            f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['min_ms']:>10.1f}{r['max_ms']:>10.1f}"
+            f"{r['round_trips']:>8.1f}{format_bytes(r['peak_rss_bytes']):>12}"
+        )
+
+
+def print_profile_results(results: list):
+    """以表格形式输出浏览器启动配置对比结果"""
+    header = f"{'profile':<10}{'ok/n':>8}{'form p50 ms':>14}{'form p95 ms':>14}{'max ms':>10}{'browser RSS':>14}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['profile']:<10}{r['successes']:>4}/{r['iterations']:<3}"
+            f"{r['p50_ms']:>14.1f}{r['p95_ms']:>14.1f}{r['max_ms']:>10.1f}"
+            f"{format_bytes(r['browser_rss_bytes']):>14}"
+        )
+
+
+def print_backend_results(results: list):
+    """以表格形式输出浏览器后端对比结果"""
+    header = (f"{'backend':<10}{'ok/n':>8}{'launch p50 ms':>16}{'form p50 ms':>14}{'login p50 ms':>15}"
+              f"{'browser RSS':>14}")
+    print(header)
+    print("-" * len(header))
+
+    def ms(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    for r in results:
+        print(
+            f"{r['backend']:<10}{r['successes']:>4}/{r['iterations']:<3}"
+            f"{ms(r['launch_p50_ms']):>16}{ms(r['form_p50_ms']):>14}{ms(r['login_p50_ms']):>15}"
+            f"{format_bytes(r['browser_rss_bytes']):>14}"
+        )
+
+
+def print_startup_result(result: dict):
+    """输出status冷启动耗时"""
+    mark = "✅" if result["within_budget"] else "⚠️ "
+    print(
+        f"{mark} status冷启动 p50 {result['p50_ms']:.1f} ms / p95 {result['p95_ms']:.1f} ms"
+        f"（扣除空解释器启动 p50 {result['interpreter_p50_ms']:.1f} ms 后为 {result['overhead_p50_ms']:.1f} ms，"
+        f"预算 {result['budget_ms']:.0f} ms；"
+        f"{result['runs']} 次，探测结果 {', '.join(result['states'])}）"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登录流程基准测试（使用本地模拟认证服务器）")
+    parser.add_argument("--engines", default="http,selenium",
+                        help=f"要测试的登录引擎，逗号分隔，可选: {', '.join(BENCH_ENGINES)}")
+    parser.add_argument("--iterations", type=int, default=5, help="每个场景的重复次数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟服务器的响应延迟（秒）")
+    parser.add_argument("--network-error-dialog", action="store_true", help="登录页弹出网络连接错误对话框")
+    parser.add_argument("--asset-delay", type=float, default=0.0, help="模拟服务器静态资源的额外延迟（秒）")
+    parser.add_argument("--profiles", default=",".join(CHROME_PROFILES),
+                        help="要对比的浏览器启动配置，逗号分隔，留空则不对比")
+    parser.add_argument("--backends", default="",
+                        help=f"要对比的浏览器后端，逗号分隔，可选: {', '.join(BROWSER_BACKENDS)}；留空则不对比")
+    parser.add_argument("--trace", help="在该录制文件的回放服务器上重复录制的操作（不再使用模拟认证服务器）")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="回放时响应延迟相对录制值的倍数")
+    parser.add_argument("--no-headless", action="store_true", help="显示浏览器窗口")
+    parser.add_argument("--startup-runs", type=int, default=10,
+                        help="测量status冷启动耗时的次数，0为不测量")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS,
+                        help="status冷启动耗时预算（毫秒，不含解释器启动），p50超出时退出码为1")
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="输出登录流程日志")
+    args = parser.parse_args()
+
+    # 基准测试的日志只输出到控制台，不写入日志文件
+    setup_logging(level="INFO" if args.verbose else "ERROR", log_file=None)
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    if args.trace:
+        trace = load_trace(args.trace)
+        with ReplayServer(ReplayPortal(trace, args.latency_scale)) as server:
+            benchmark = LoginBenchmark(server, headless=not args.no_headless, iterations=args.iterations)
+            results = []
+            for engine in engines:
+                if not benchmark.engine_available(engine):
+                    print(f"⚠️  跳过 {engine} 引擎：无法启动浏览器", file=sys.stderr)
+                    continue
+                results.append(benchmark.run_replay(engine, trace.get("operation") or "login"))
+        print_results(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"trace": args.trace, "latency_scale": args.latency_scale, "replay": results},
+                          f, ensure_ascii=False, indent=2)
+        return 0 if results else 1
+
+    portal = MockPortal({BENCH_USERNAME: BENCH_PASSWORD}, latency=args.latency,
+                        network_error_dialog=args.network_error_dialog, asset_delay=args.asset_delay)
+    with MockPortalServer(portal) as server:
+        benchmark = LoginBenchmark(server, headless=not args.no_headless, iterations=args.iterations)
+        results = benchmark.run(engines)
+        profile_results = benchmark.run_profiles([p.strip() for p in args.profiles.split(",") if p.strip()])
+        backend_results = benchmark.run_backends([b.strip() for b in args.backends.split(",") if b.strip()])
+        startup = benchmark.run_startup(args.startup_runs, args.startup_budget) if args.startup_runs > 0 else None
+
+    if results:
+        print_results(results)
+    if profile_results:
+        print()
+        print_profile_results(profile_results)
+    if backend_results:
+        print()
+        print_backend_results(backend_results)
+    if startup:
+        print()
+        print_startup_result(startup)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"scenarios": results, "profiles": profile_results, "backends": backend_results,
+                       "startup": startup}, f, ensure_ascii=False, indent=2)
+    if startup and not startup["within_budget"]:
+        return 1
+    return 0 if results or backend_results or startup else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
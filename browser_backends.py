@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器后端
+- chrome: Selenium + chromedriver + Chrome（原有方式）
+- firefox: Selenium + geckodriver + Firefox（不支持CDP，登录结果改用页面元素判断）
+- cdp: 不经chromedriver，直接通过websocket发送Chrome DevTools Protocol命令控制无头Chrome
+每个后端记录最近一次的启动耗时，并可统计浏览器进程树的内存，便于在各主机上选择开销最小的后端
+"""
+
+import os
+import time
+import shutil
+import logging
+import functools
+
+from lazy_import import LazyImport
+from procmem import process_tree_rss
+from memory_governor import launch_environment
+
+
+# cdp后端的websocket客户端和进程管理只在启动该后端时才加载
+cdp_driver = LazyImport("cdp_driver")
+webdriver = LazyImport("selenium.webdriver")
+ChromeOptions = LazyImport("selenium.webdriver.chrome.options", "Options")
+ChromeService = LazyImport("selenium.webdriver.chrome.service", "Service")
+FirefoxOptions = LazyImport("selenium.webdriver.firefox.options", "Options")
+FirefoxService = LazyImport("selenium.webdriver.firefox.service", "Service")
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_chromedriver_path(configured: str = None):
+    """
+    查找chromedriver，结果会被缓存
+
+    Args:
+        configured (str): 配置文件中指定的路径
+
+    Returns:
+        str: chromedriver路径，找不到时返回None（由Selenium Manager自动处理）
+    """
+    for candidate in (configured, "./chromedriver.exe", "./chromedriver"):
+        if candidate and os.path.isfile(candidate):
+            return candidate
+    return shutil.which("chromedriver")
+
+
+class LaunchSettings:
+    """启动浏览器所需的设置，与具体后端无关"""
+
+    def __init__(self, profile: dict, headless: bool = True, user_data_dir: str = None,
+                 disk_cache_size: int = None, performance_log: bool = False,
+                 driver_path: str = None, binary: str = None):
+        """
+        Args:
+            profile (dict): 浏览器启动配置（CHROME_PROFILES中的一项）
+            headless (bool): 是否无头模式
+            user_data_dir (str): 本账号的浏览器用户数据目录，None时使用临时配置
+            disk_cache_size (int): 持久化用户数据目录的磁盘缓存上限（字节）
+            performance_log (bool): 是否记录DevTools的Network事件
+            driver_path (str): chromedriver/geckodriver路径，None时自动查找
+            binary (str): 浏览器可执行文件，None时自动查找
+        """
+        self.profile = profile
+        self.headless = headless
+        self.user_data_dir = user_data_dir
+        self.disk_cache_size = disk_cache_size
+        self.performance_log = performance_log
+        self.driver_path = driver_path
+        self.binary = binary
+
+    def chrome_arguments(self) -> list:
+        """Chrome命令行参数"""
+        arguments = ["--no-sandbox", "--disable-dev-shm-usage", "--disable-gpu",
+                     f"--window-size={self.profile['window_size']}"]
+        arguments.extend(self.profile["arguments"])
+        if self.user_data_dir and self.disk_cache_size:
+            arguments.append(f"--disk-cache-size={self.disk_cache_size}")
+        return arguments
+
+
+class BrowserBackend:
+    """浏览器后端基类"""
+
+    name = None
+    # 是否支持execute_cdp_cmd（屏蔽资源、写入Cookie、读取网络响应）
+    supports_cdp = True
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.launch_time = None
+
+    def launch(self, settings: LaunchSettings):
+        """
+        启动浏览器并记录启动耗时
+
+        Returns:
+            WebDriver或CDPDriver
+        """
+        start = time.perf_counter()
+        driver = self._launch(settings)
+        self.launch_time = time.perf_counter() - start
+        return driver
+
+    def _launch(self, settings: LaunchSettings):
+        raise NotImplementedError
+
+    def memory(self, driver) -> int:
+        """浏览器及其驱动进程树的常驻内存（字节），无法统计时返回0"""
+        process = getattr(getattr(driver, "service", None), "process", None)
+        if process is None:
+            return 0
+        return process_tree_rss(process.pid)
+
+
+class SeleniumChromeBackend(BrowserBackend):
+    """Selenium + chromedriver + Chrome"""
+
+    name = "chrome"
+
+    def _launch(self, settings: LaunchSettings):
+        options = ChromeOptions()
+        options.page_load_strategy = settings.profile["page_load_strategy"]
+        if settings.performance_log:
+            # 开启performance日志，从中读取DevTools的Network事件
+            options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        if settings.headless:
+            options.add_argument("--headless")
+        for argument in settings.chrome_arguments():
+            options.add_argument(argument)
+        if settings.user_data_dir:
+            options.add_argument(f"--user-data-dir={settings.user_data_dir}")
+        if settings.binary:
+            options.binary_location = settings.binary
+
+        # 使用本地chromedriver，找不到时交给Selenium Manager自动下载匹配的版本
+        service = ChromeService(executable_path=resolve_chromedriver_path(settings.driver_path),
+                                env=launch_environment())
+        return webdriver.Chrome(service=service, options=options)
+
+
+class SeleniumFirefoxBackend(BrowserBackend):
+    """Selenium + geckodriver + Firefox"""
+
+    name = "firefox"
+    supports_cdp = False
+
+    def _launch(self, settings: LaunchSettings):
+        options = FirefoxOptions()
+        options.page_load_strategy = settings.profile["page_load_strategy"]
+        if settings.headless:
+            options.add_argument("-headless")
+        width, height = settings.profile["window_size"].split(",")
+        options.add_argument(f"--width={width}")
+        options.add_argument(f"--height={height}")
+        if settings.profile["blocked_urls"]:
+            # Firefox没有CDP，改用首选项关闭图片加载
+            options.set_preference("permissions.default.image", 2)
+        if settings.user_data_dir:
+            os.makedirs(settings.user_data_dir, exist_ok=True)
+            options.add_argument("-profile")
+            options.add_argument(settings.user_data_dir)
+        if settings.binary:
+            options.binary_location = settings.binary
+
+        driver_path = settings.driver_path or shutil.which("geckodriver")
+        service = FirefoxService(executable_path=driver_path, env=launch_environment())
+        return webdriver.Firefox(service=service, options=options)
+
+
+class CDPBackend(BrowserBackend):
+    """直接通过CDP控制无头Chrome，不需要chromedriver"""
+
+    name = "cdp"
+
+    def _launch(self, settings: LaunchSettings):
+        return cdp_driver.launch_chrome(
+            binary=settings.binary,
+            arguments=settings.chrome_arguments(),
+            user_data_dir=settings.user_data_dir,
+            headless=settings.headless,
+            page_load_strategy=settings.profile["page_load_strategy"],
+            performance_log=settings.performance_log,
+        )
+
+
+BROWSER_BACKENDS = {
+    backend.name: backend for backend in (SeleniumChromeBackend, SeleniumFirefoxBackend, CDPBackend)
+}
+
+
+def create_backend(name: str, logger=None) -> BrowserBackend:
+    """
+    按名称创建浏览器后端
+
+    Args:
+        name (str): BROWSER_BACKENDS中的键
+        logger: 日志记录器
+    """
+    if name not in BROWSER_BACKENDS:
+        raise ValueError(f"不支持的浏览器后端: {name}，可选值: {', '.join(BROWSER_BACKENDS)}")
+    return BROWSER_BACKENDS[name](logger)
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+直接通过Chrome DevTools Protocol控制浏览器
+不需要chromedriver：启动无头Chrome后经websocket（websocket-client）直接发送CDP命令，省去一个需要与Chrome版本匹配的进程
+和每条命令一次的HTTP往返。CDPDriver只实现登录流程用到的WebDriver接口子集
+（get、find_element(s)、execute_script、execute_async_script、execute_cdp_cmd、get_log、page_source、
+get_cookies、截图和超时设置），元素查找、脚本错误和超时抛出与Selenium相同的异常类型
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+import urllib.request
+from collections import deque
+
+from lazy_import import LazyImport
+from memory_governor import CDP_TEMP_PREFIX, launch_environment
+
+
+selenium_exceptions = LazyImport("selenium.common.exceptions")
+# websocket-client（selenium的依赖）
+websocket = LazyImport("websocket")
+
+# 常见的Chrome/Chromium可执行文件名
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+# 查找元素：按CSS选择器或XPath在this（元素）或document下查找
+_FIND_FUNCTION = """
+function (kind, value, all) {
+    var root = this && this.nodeType ? this : document;
+    if (kind === "xpath") {
+        var snapshot = document.evaluate(value, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var nodes = [];
+        for (var i = 0; i < snapshot.snapshotLength; i++) { nodes.push(snapshot.snapshotItem(i)); }
+        return all ? nodes : (nodes[0] || null);
+    }
+    return all ? Array.prototype.slice.call(root.querySelectorAll(value)) : root.querySelector(value);
+}
+"""
+
+
+def find_chrome_binary(configured: str = None):
+    """
+    查找Chrome可执行文件
+
+    Args:
+        configured (str): 配置文件中指定的路径
+
+    Returns:
+        str: 可执行文件路径，找不到时返回None
+    """
+    if configured:
+        return configured if os.path.isfile(configured) else shutil.which(configured)
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in (r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+                 r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe"):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class CDPService:
+    """浏览器进程，接口与Selenium的Service相同（process属性和stop()）"""
+
+    def __init__(self, process: subprocess.Popen, user_data_dir: str = None, temporary: bool = False):
+        self.process = process
+        self.user_data_dir = user_data_dir
+        self.temporary = temporary
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.temporary and self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class CDPElement:
+    """页面元素，接口与Selenium的WebElement相同"""
+
+    def __init__(self, driver, object_id: str):
+        self._driver = driver
+        self._object_id = object_id
+
+    def _call(self, function: str, *args):
+        return self._driver._call_function(self._object_id, function, *args)
+
+    @property
+    def text(self) -> str:
+        return self._call("function () { return this.innerText || this.textContent || ''; }")
+
+    def click(self):
+        self._call("function () { this.scrollIntoView({block: 'center'}); this.click(); }")
+
+    def clear(self):
+        self._call(
+            "function () { this.value = ''; this.dispatchEvent(new Event('input', {bubbles: true}));"
+            " this.dispatchEvent(new Event('change', {bubbles: true})); }"
+        )
+
+    def send_keys(self, text: str):
+        # 先聚焦再由浏览器输入文本，页面收到与键盘输入相同的input事件
+        self._call("function () { this.focus(); }")
+        self._driver.execute("Input.insertText", {"text": str(text)})
+
+    def get_attribute(self, name: str):
+        return self._call(
+            "function (name) { var value = this[name];"
+            " if (value !== undefined && value !== null && typeof value !== 'object' && typeof value !== 'function')"
+            " { return String(value); } return this.getAttribute(name); }",
+            name,
+        )
+
+    def is_displayed(self) -> bool:
+        return bool(self._call(
+            "function () { var style = window.getComputedStyle(this);"
+            " return style.visibility !== 'hidden' && style.display !== 'none'"
+            " && !!(this.offsetWidth || this.offsetHeight || this.getClientRects().length); }"
+        ))
+
+    def is_enabled(self) -> bool:
+        return not self._call("function () { return !!this.disabled; }")
+
+    def find_element(self, by: str, value: str):
+        return self._driver._find(by, value, False, self._object_id)
+
+    def find_elements(self, by: str, value: str) -> list:
+        return self._driver._find(by, value, True, self._object_id)
+
+
+class CDPDriver:
+    """经websocket直接控制Chrome页面的驱动"""
+
+    def __init__(self, websocket_url: str, service: CDPService = None, page_load_strategy: str = "eager",
+                 performance_log: bool = False, command_timeout: float = 30):
+        """
+        Args:
+            websocket_url (str): 页面的webSocketDebuggerUrl
+            service (CDPService): 浏览器进程，quit()时一并结束
+            page_load_strategy (str): eager等到DOMContentLoaded，normal等到load事件
+            performance_log (bool): 是否缓存Network事件供get_log("performance")读取
+            command_timeout (float): 单条CDP命令的最长等待时间（秒）
+        """
+        self.service = service
+        self.page_load_strategy = page_load_strategy
+        self.performance_log = performance_log
+        self.command_timeout = command_timeout
+        self.page_load_timeout = 30
+        self.script_timeout = 30
+        # DevTools会拒绝带Origin头的websocket连接（除非Chrome以--remote-allow-origins启动）
+        self._ws = websocket.create_connection(websocket_url, timeout=10, suppress_origin=True,
+                                               enable_multithread=True)
+        self._ws.settimeout(None)
+        self._next_id = 0
+        self._responses = {}
+        self._condition = threading.Condition()
+        self._log = deque(maxlen=10000)
+        self._lifecycle = {"Page.domContentEventFired": 0, "Page.loadEventFired": 0}
+        self._closed = None
+        self._reader = threading.Thread(target=self._read_loop, name="cdp-reader", daemon=True)
+        self._reader.start()
+
+        self.execute("Page.enable")
+        self.execute("Runtime.enable")
+        if performance_log:
+            self.execute("Network.enable")
+
+    def _read_loop(self):
+        try:
+            while True:
+                message = json.loads(self._ws.recv())
+                with self._condition:
+                    if "id" in message:
+                        self._responses[message["id"]] = message
+                    else:
+                        method = message.get("method", "")
+                        if method in self._lifecycle:
+                            self._lifecycle[method] += 1
+                        if self.performance_log and method.startswith(("Network.", "Page.")):
+                            self._log.append({
+                                "level": "INFO",
+                                "timestamp": int(time.time() * 1000),
+                                "message": json.dumps({"message": message}),
+                            })
+                    self._condition.notify_all()
+        except (OSError, ValueError, websocket.WebSocketException) as e:
+            with self._condition:
+                self._closed = str(e) or "连接已关闭"
+                self._condition.notify_all()
+
+    def execute(self, method: str, params: dict = None, timeout: float = None) -> dict:
+        """
+        发送一条CDP命令并等待结果（每条命令一次websocket往返）
+
+        Raises:
+            TimeoutException: 超时未收到结果
+            WebDriverException: 浏览器返回错误或连接已断开
+        """
+        with self._condition:
+            if self._closed:
+                raise selenium_exceptions.WebDriverException(f"浏览器连接已断开: {self._closed}")
+            self._next_id += 1
+            command_id = self._next_id
+        self._ws.send(json.dumps({"id": command_id, "method": method, "params": params or {}}))
+
+        deadline = time.monotonic() + (timeout or self.command_timeout)
+        with self._condition:
+            while command_id not in self._responses:
+                if self._closed:
+                    raise selenium_exceptions.WebDriverException(f"浏览器连接已断开: {self._closed}")
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise selenium_exceptions.TimeoutException(f"CDP命令超时: {method}")
+                self._condition.wait(remaining)
+            response = self._responses.pop(command_id)
+
+        if "error" in response:
+            message = response["error"].get("message", "")
+            if "Could not find object" in message or "Cannot find context" in message:
+                raise selenium_exceptions.StaleElementReferenceException(message)
+            raise selenium_exceptions.WebDriverException(f"{method}: {message}")
+        return response.get("result", {})
+
+    # ---- WebDriver接口 ----
+
+    def execute_cdp_cmd(self, cmd: str, cmd_args: dict) -> dict:
+        return self.execute(cmd, cmd_args)
+
+    def set_page_load_timeout(self, timeout: float):
+        self.page_load_timeout = timeout
+
+    def set_script_timeout(self, timeout: float):
+        self.script_timeout = timeout
+
+    def implicitly_wait(self, timeout: float):
+        pass
+
+    def get(self, url: str):
+        """打开页面，按page_load_strategy等待DOMContentLoaded或load事件"""
+        event = "Page.loadEventFired" if self.page_load_strategy == "normal" else "Page.domContentEventFired"
+        with self._condition:
+            seen = self._lifecycle[event]
+        self.execute("Runtime.releaseObjectGroup", {"objectGroup": "elements"})
+        result = self.execute("Page.navigate", {"url": url}, timeout=self.page_load_timeout)
+        if result.get("errorText"):
+            raise selenium_exceptions.WebDriverException(f"unknown error: {result['errorText']}")
+
+        deadline = time.monotonic() + self.page_load_timeout
+        with self._condition:
+            while self._lifecycle[event] <= seen:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    raise selenium_exceptions.TimeoutException(f"页面加载超时: {url}")
+                self._condition.wait(remaining)
+
+    def _evaluate(self, expression: str, await_promise: bool = False, timeout: float = None):
+        result = self.execute("Runtime.evaluate", {
+            "expression": expression, "returnByValue": True, "awaitPromise": await_promise,
+        }, timeout=timeout)
+        if "exceptionDetails" in result:
+            details = result["exceptionDetails"]
+            description = details.get("exception", {}).get("description") or details.get("text")
+            raise selenium_exceptions.JavascriptException(f"javascript error: {description}")
+        return result.get("result", {}).get("value")
+
+    def execute_script(self, script: str, *args):
+        arguments = json.dumps(list(args))
+        return self._evaluate(f"(function () {{\n{script}\n}}).apply(null, {arguments})")
+
+    def execute_async_script(self, script: str, *args):
+        arguments = json.dumps(list(args))
+        expression = (
+            f"new Promise(function (resolve) {{ (function () {{\n{script}\n}})"
+            f".apply(null, {arguments}.concat([resolve])); }})"
+        )
+        return self._evaluate(expression, await_promise=True, timeout=self.script_timeout)
+
+    def _call_function(self, object_id: str, function: str, *args):
+        result = self.execute("Runtime.callFunctionOn", {
+            "objectId": object_id, "functionDeclaration": function,
+            "arguments": [{"value": arg} for arg in args], "returnByValue": True,
+        })
+        if "exceptionDetails" in result:
+            raise selenium_exceptions.JavascriptException(f"javascript error: {result['exceptionDetails'].get('text')}")
+        return result.get("result", {}).get("value")
+
+    @staticmethod
+    def _selector(by: str, value: str):
+        """把Selenium的定位方式转换为CSS选择器或XPath"""
+        if by == "xpath":
+            return "xpath", value
+        if by == "id":
+            return "css", f"[id={json.dumps(value)}]"
+        if by == "name":
+            return "css", f"[name={json.dumps(value)}]"
+        if by == "class name":
+            return "css", f".{value}"
+        if by in ("tag name", "css selector"):
+            return "css", value
+        raise selenium_exceptions.InvalidSelectorException(f"不支持的定位方式: {by}")
+
+    def _find(self, by: str, value: str, all_matches: bool, object_id: str = None):
+        kind, selector = self._selector(by, value)
+        args = [{"value": kind}, {"value": selector}, {"value": all_matches}]
+        if object_id:
+            params = {"objectId": object_id}
+        else:
+            document = self.execute("Runtime.evaluate", {"expression": "document", "objectGroup": "elements"})
+            params = {"objectId": document["result"]["objectId"]}
+        params.update(functionDeclaration=_FIND_FUNCTION, arguments=args, objectGroup="elements")
+        result = self.execute("Runtime.callFunctionOn", params).get("result", {})
+
+        if not all_matches:
+            if result.get("subtype") == "null" or "objectId" not in result:
+                raise selenium_exceptions.NoSuchElementException(f"no such element: {by}={value}")
+            return CDPElement(self, result["objectId"])
+        properties = self.execute("Runtime.getProperties", {"objectId": result["objectId"], "ownProperties": True})
+        elements = [
+            (int(item["name"]), CDPElement(self, item["value"]["objectId"]))
+            for item in properties.get("result", [])
+            if item["name"].isdigit() and "objectId" in item.get("value", {})
+        ]
+        return [element for _, element in sorted(elements, key=lambda pair: pair[0])]
+
+    def find_element(self, by: str = "id", value: str = None) -> CDPElement:
+        return self._find(by, value, False)
+
+    def find_elements(self, by: str = "id", value: str = None) -> list:
+        return self._find(by, value, True)
+
+    @property
+    def page_source(self) -> str:
+        return self._evaluate("document.documentElement.outerHTML")
+
+    @property
+    def current_url(self) -> str:
+        return self._evaluate("location.href")
+
+    def get_screenshot_as_base64(self) -> str:
+        return self.execute("Page.captureScreenshot", {"format": "png"})["data"]
+
+    def get_cookies(self) -> list:
+        cookies = self.execute("Network.getCookies").get("cookies", [])
+        return [
+            {"name": c["name"], "value": c["value"], "domain": c.get("domain"), "path": c.get("path", "/"),
+             "secure": c.get("secure", False), "httpOnly": c.get("httpOnly", False),
+             **({"expiry": int(c["expires"])} if c.get("expires", -1) > 0 else {})}
+            for c in cookies
+        ]
+
+    def get_log(self, log_type: str) -> list:
+        """读取并清空缓存的事件，格式与Chrome的performance日志相同"""
+        if log_type != "performance" or not self.performance_log:
+            raise selenium_exceptions.WebDriverException(f"不支持的日志类型: {log_type}")
+        with self._condition:
+            entries = list(self._log)
+            self._log.clear()
+        return entries
+
+    def quit(self):
+        try:
+            self._ws.close(timeout=1)
+        except (OSError, websocket.WebSocketException):
+            pass
+        if self.service is not None:
+            self.service.stop()
+
+
+def launch_chrome(binary: str = None, arguments: list = (), user_data_dir: str = None,
+                  headless: bool = True, page_load_strategy: str = "eager",
+                  performance_log: bool = False, timeout: float = 20) -> CDPDriver:
+    """
+    启动Chrome并连接到其第一个页面
+
+    Args:
+        binary (str): Chrome可执行文件，None时自动查找
+        arguments (list): 额外的命令行参数
+        user_data_dir (str): 用户数据目录，None时使用临时目录并在退出时删除
+        headless (bool): 是否无头模式
+        page_load_strategy (str): eager或normal
+        performance_log (bool): 是否记录Network事件
+        timeout (float): 等待浏览器就绪的最长时间（秒）
+
+    Returns:
+        CDPDriver: 已连接的驱动
+    """
+    binary = find_chrome_binary(binary)
+    if binary is None:
+        raise selenium_exceptions.WebDriverException("找不到Chrome可执行文件，请在config.py中设置BROWSER_BINARY")
+
+    temporary = user_data_dir is None
+    user_data_dir = tempfile.mkdtemp(prefix=CDP_TEMP_PREFIX) if temporary else user_data_dir
+    os.makedirs(user_data_dir, exist_ok=True)
+    port_file = os.path.join(user_data_dir, "DevToolsActivePort")
+    if os.path.exists(port_file):
+        os.remove(port_file)
+
+    command = [binary, "--remote-debugging-port=0", f"--user-data-dir={user_data_dir}",
+               "--no-first-run", "--no-default-browser-check"]
+    if headless:
+        command.append("--headless=new")
+    command.extend(arguments)
+    command.append("about:blank")
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               env=launch_environment())
+    service = CDPService(process, user_data_dir, temporary)
+
+    try:
+        # 浏览器监听的端口写在用户数据目录的DevToolsActivePort文件中
+        deadline = time.monotonic() + timeout
+        port = None
+        while port is None:
+            if process.poll() is not None:
+                raise selenium_exceptions.WebDriverException(f"Chrome启动失败，退出码 {process.returncode}")
+            if time.monotonic() >= deadline:
+                raise selenium_exceptions.TimeoutException("等待Chrome启动超时")
+            try:
+                with open(port_file, "r") as f:
+                    port = int(f.readline().strip())
+            except (OSError, ValueError):
+                time.sleep(0.02)
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/list", timeout=timeout) as response:
+            targets = json.loads(response.read().decode("utf-8"))
+        page = next((t for t in targets if t.get("type") == "page"), None)
+        if page is None:
+            raise selenium_exceptions.WebDriverException("Chrome没有可用的页面")
+        return CDPDriver(page["webSocketDebuggerUrl"], service, page_load_strategy, performance_log)
+    except BaseException:
+        service.stop()
+        raise
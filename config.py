@@ -11,7 +11,80 @@ PASSWORD = "你的3.0密码"  # 替换为您的密码
 
 # WebDriver配置
 HEADLESS = True # 是否使用无头模式，True为后台运行，False为显示浏览器窗口
-TIMEOUT = 30      # 页面加载超时时间（秒）
+TIMEOUT = 30      # 页面加载超时时间（秒），也是各步骤自适应等待上限的最大值
+LOGIN_VERIFICATION = "network"  # 浏览器登录/注销结果的判断方式：network（认证接口的网络响应）、dom（页面元素变化）
+BATCHED_LOGIN = True  # 浏览器登录时用一次注入脚本完成定位、填写和提交，False为逐个元素操作
+ADAPTIVE_TIMEOUTS = True  # 按最近观测到的页面响应耗时（p95）自动收紧各步骤的等待上限
+CHROME_PROFILE = "lean"  # 浏览器启动配置：lean（只等DOM就绪，屏蔽图片、字体和统计脚本）、full（等待全部资源加载完成）
+CHROME_USER_DATA_DIR = None  # 浏览器用户数据目录（保留磁盘缓存和Cookie，每个账号一个子目录），None为每次使用全新配置
+CHROMEDRIVER_PATH = None  # chromedriver路径，None为依次查找当前目录和PATH，都找不到时由Selenium自动下载
+BROWSER_BACKEND = "chrome"  # 浏览器后端：chrome（Selenium+chromedriver）、firefox（Selenium+geckodriver）、cdp（直接通过CDP控制无头Chrome，不需要chromedriver）
+BROWSER_BINARY = None     # 浏览器可执行文件，None为自动查找
+GECKODRIVER_PATH = None   # firefox后端的geckodriver路径，None为从PATH查找或由Selenium自动下载
+BROWSER_MEMORY_BUDGET = 400 * 1024 * 1024  # 浏览器及驱动进程树的内存上限（字节），超出时在操作之间重启浏览器，None为不限制
+BROWSER_IDLE_TIMEOUT = 300  # 被保持复用的浏览器空闲超过该时间（秒）后关闭，None为不关闭
+REAP_ORPHAN_BROWSERS = True  # 启动浏览器和后台模式时清理上次异常退出遗留的、由本工具启动的chrome/chromedriver进程（仅Linux）
+
+# 各步骤等待上限（秒），步骤完成信号出现后立即继续，只需填写要覆盖的项
+# 可选项：page_load, page_ready, dialog, element, fill, login, status, logout
+STEP_TIMEOUTS = {
+    "login": 20,   # 点击登录后等待页面响应
+}
+
+# 多账号并发认证配置（multi_account.py）
+# 每个账号可选绑定源地址（source_address）或网卡（interface，需要root权限），绑定后只使用HTTP引擎
+ACCOUNTS = [
+    # {"username": "账号1", "password": "密码1", "source_address": "192.168.1.10"},
+    # {"username": "账号2", "password": "密码2", "interface": "eth1"},
+]
+MAX_CONCURRENCY = 4  # 最大并发数
+
+# 多机错峰重新认证配置（fleet_scheduler.py），未配置ACCOUNTS时使用USERNAME/PASSWORD
+FLEET_SCHEDULE_FILE = "gdipu_fleet.json"  # 计划文件，多台机器共用时放在共享目录（如NFS）中
+FLEET_WINDOW = 1800                      # 重新认证时间在过期前REAUTH_MARGIN之前的这段时间内随机分布（秒）
+FLEET_MIN_INTERVAL = 5                   # 全体机器两次认证请求之间的最小间隔（秒）
+
+# 登录引擎配置
+PORTAL_URL = "http://10.0.5.112/"  # 认证页面地址，测试时可指向 mock_portal.py 启动的本地模拟服务器
+LOGIN_ENGINE = "auto"  # 登录引擎：auto（优先HTTP请求，失败时回退浏览器）、http（仅HTTP）、selenium（仅浏览器）、race（HTTP与浏览器同时进行，先成功者胜出）
+AC_ID = None           # 认证区域ID，None为从认证页面自动检测
+
+# 认证状态快速探测配置
+CONNECTIVITY_CHECK_URL = "http://connect.rom.miui.com/generate_204"  # 门户劫持检测地址，None为不检测
+PROBE_TIMEOUT = 0.5    # 单次探测请求超时（秒）
+PROBE_CACHE_TTL = 5    # 探测结果缓存时间（秒）
+USER_INFO_TTL = 30     # 用户信息（IP、在线时长、已用流量等）缓存时间（秒）
+
+# 后台保活配置
+SESSION_LIFETIME = 12 * 3600        # 认证有效期（秒）
+REAUTH_MARGIN = 600                 # 在过期前多久主动重新认证（秒）
+CHECK_INTERVAL = 60                 # 低成本在线检查间隔（秒）
+RETRY_INTERVAL = 30                 # 认证失败或服务器不可达时的首次重试间隔（秒），之后按指数退避并加入随机抖动
+MAX_RETRY_INTERVAL = 600            # 重试间隔上限（秒）
+STATE_FILE = "gdipu_session.json"   # 认证状态记录文件
+NETWORK_WATCH = True                # 监听网络变化（Linux netlink，不支持时定期检查路由表），本机IP变化时立即重新认证
+SESSION_CACHE = True                # 认证记录仍在有效期内且本机IP未变时，login直接返回，不访问认证服务器
+
+# 本地认证状态服务配置（status_server.py）
+STATUS_SOCKET = "gdipu_status.sock"   # Unix域套接字路径，None为不监听
+STATUS_PORT = None                    # 本机HTTP端口（只监听127.0.0.1），None为不监听
+STATUS_REFRESH_INTERVAL = 30          # 后台快速探测刷新状态的间隔（秒）
+
+# 性能指标配置
+METRICS_FILE = "gdipu_metrics.jsonl"         # 分阶段计时记录（JSON Lines），None为不记录
+PROMETHEUS_FILE = "gdipu_auto_login.prom"    # Prometheus textfile collector输出，None为不导出
+
+# 现场记录（截图/页面快照）配置
+ARTIFACT_MODE = "failure"           # 记录时机：off（不记录）、failure（仅失败时）、always（每次都记录）
+ARTIFACT_FORMAT = "png"             # 记录格式：png（截图）、html（页面源码快照，gzip压缩）
+ARTIFACT_DIR = "artifacts"          # 保存目录
+ARTIFACT_MAX_BYTES = 50 * 1024 * 1024   # 目录总大小上限（字节），超出时删除最旧的记录
+ARTIFACT_MAX_AGE = 7 * 24 * 3600    # 最长保存时间（秒）
 
 # 日志配置
 LOG_LEVEL = "INFO"  # 日志级别：DEBUG, INFO, WARNING, ERROR
+LOG_FILE = "gdipu_auto_login.log"   # 日志文件，None为只输出到控制台
+LOG_FORMAT = "text"                 # 日志文件格式：text、json（JSON Lines，带账号、阶段和耗时字段）
+LOG_ROTATION = "size"               # 日志轮转：size（按大小）、time（每天零点）、none（不轮转）
+LOG_MAX_BYTES = 5 * 1024 * 1024     # 按大小轮转时单个日志文件的上限（字节）
+LOG_BACKUP_COUNT = 5                # 保留的历史日志文件数
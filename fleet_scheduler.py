@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多机错峰重新认证
+同一时间上线的大量机器会在12小时后同时过期、同时访问认证服务器。本模块为每个账号在过期前的
+FLEET_WINDOW时间窗口内随机安排重新认证时间，并在全体机器间限制认证请求的频率；已掉线的账号优先处理。
+多台机器把同一个计划文件放在共享目录中即可共用一份计划，读写时通过文件锁互斥
+
+用法:
+    python fleet_scheduler.py            # 持续运行
+    python fleet_scheduler.py --once     # 只执行一轮
+    python fleet_scheduler.py --show     # 显示当前计划
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import signal
+import argparse
+import threading
+from contextlib import contextmanager
+
+from gdipu_auto_login import GDIPUAutoLogin, Operations, DEFAULT_PORTAL_URL, load_setting
+from logging_setup import setup_logging, get_logger
+from portal_http import PortalUnavailableError
+from portal_probe import ProbeState
+from resilience import Backoff
+from memory_governor import MemoryGovernor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """跨进程、跨机器的文件锁（POSIX记录锁，NFS上由lockd支持；Windows使用msvcrt）"""
+
+    def __init__(self, path: str, timeout: float = 30):
+        """
+        Args:
+            path (str): 锁文件路径
+            timeout (float): 获取锁的最长等待时间（秒）
+        """
+        self.path = path
+        self.timeout = timeout
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+                return self
+            except OSError:
+                if time.monotonic() >= deadline:
+                    os.close(self._fd)
+                    self._fd = None
+                    raise TimeoutError(f"等待计划文件锁超时: {self.path}")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SharedSchedule:
+    """多台机器共用的重新认证计划（JSON文件）"""
+
+    def __init__(self, path: str = "gdipu_fleet.json"):
+        """
+        Args:
+            path (str): 计划文件路径，多台机器共用时放在共享目录中
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        data.setdefault("accounts", {})
+        data.setdefault("last_start", 0)
+        return data
+
+    def read(self) -> dict:
+        """读取当前计划（不加锁，只用于显示）"""
+        return self._load()
+
+    @contextmanager
+    def transaction(self):
+        """
+        加锁读取计划，退出时写回（先写临时文件再替换）
+
+        Yields:
+            dict: 计划内容，可直接修改
+        """
+        with self._lock, FileLock(f"{self.path}.lock"):
+            data = self._load()
+            yield data
+            tmp_path = f"{self.path}.{socket.gethostname()}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+class FleetScheduler:
+    """错峰重新认证调度器"""
+
+    def __init__(self, accounts: list, schedule: SharedSchedule = None,
+                 session_lifetime: float = 12 * 3600, reauth_margin: float = 600,
+                 window: float = 1800, min_interval: float = 5, check_interval: float = 60,
+                 retry_interval: float = 30, max_retry_interval: float = 600,
+                 engine: str = "http", target_url: str = DEFAULT_PORTAL_URL,
+                 headless: bool = True, governor: MemoryGovernor = None, logger=None):
+        """
+        Args:
+            accounts (list): 本机负责的账号列表，格式同config.py中的ACCOUNTS
+            schedule (SharedSchedule): 共用的计划文件
+            session_lifetime (float): 认证有效期（秒）
+            reauth_margin (float): 重新认证最晚在过期前多久完成（秒）
+            window (float): 重新认证时间在 [过期 - reauth_margin - window, 过期 - reauth_margin] 内随机分布（秒）
+            min_interval (float): 全体机器两次认证请求之间的最小间隔（秒）
+            check_interval (float): 检查间隔（秒）
+            retry_interval (float): 认证失败后的首次重试间隔（秒），之后按指数退避
+            max_retry_interval (float): 重试间隔上限（秒）
+            engine (str): 登录引擎；绑定了源地址或网卡的账号总是使用http引擎
+            target_url (str): 认证页面地址
+            headless (bool): 使用浏览器时是否无头模式
+            governor (MemoryGovernor): 各账号共用的浏览器内存管理器，None时使用默认设置
+            logger: 日志记录器
+        """
+        self.accounts = accounts
+        self.schedule = schedule or SharedSchedule()
+        self.session_lifetime = session_lifetime
+        self.reauth_margin = reauth_margin
+        self.window = window
+        self.min_interval = min_interval
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.engine = engine
+        self.target_url = target_url
+        self.headless = headless
+        self.host = socket.gethostname()
+        self.logger = logger or get_logger()
+        self.governor = governor or MemoryGovernor(logger=self.logger)
+        self._logins = {}
+        self._backoffs = {}
+        self._stop_event = threading.Event()
+
+    def _login_for(self, account: dict) -> GDIPUAutoLogin:
+        """获取账号的登录实例（首次使用时创建）"""
+        username = account["username"]
+        if username not in self._logins:
+            bound = bool(account.get("source_address") or account.get("interface"))
+            self._logins[username] = GDIPUAutoLogin(
+                username, account["password"], headless=self.headless,
+                engine="http" if bound else account.get("engine", self.engine),
+                ac_id=account.get("ac_id"), target_url=self.target_url,
+                source_address=account.get("source_address"), interface=account.get("interface"),
+                session_lifetime=self.session_lifetime, reauth_margin=self.reauth_margin,
+                governor=self.governor,
+            )
+        return self._logins[username]
+
+    def check_online(self, login: GDIPUAutoLogin):
+        """
+        查询账号的在线状态，不启动浏览器
+
+        Returns:
+            tuple: (online, add_time)，online为True/False，认证服务器无法访问时为None；
+                   add_time为认证服务器返回的上线时间
+        """
+        if login.source_address or login.interface:
+            # 绑定了出口的账号必须从该出口查询
+            try:
+                data = login.get_http_client().get_status()
+            except PortalUnavailableError:
+                return None, None
+            online = data.get("error") == "ok"
+        else:
+            result = login.probe.probe(force=True)
+            if result.state is ProbeState.UNREACHABLE:
+                return None, None
+            data, online = result.data, result.state is ProbeState.LOGGED_IN
+        try:
+            add_time = float(data["add_time"]) if online and data.get("add_time") else None
+        except (TypeError, ValueError):
+            add_time = None
+        return online, add_time
+
+    def plan_slot(self, expires_at: float, taken: list, now: float = None) -> float:
+        """
+        为一次重新认证安排时间：在窗口内随机取一个时间，再找离它最近、与已安排的时间
+        相隔至少min_interval的位置
+
+        Args:
+            expires_at (float): 认证过期时间戳
+            taken (list): 其他账号已安排的时间戳
+            now (float): 当前时间戳
+
+        Returns:
+            float: 安排的时间戳
+        """
+        now = time.time() if now is None else now
+        end = expires_at - self.reauth_margin
+        start = max(now, end - self.window)
+        if end <= start:
+            return start
+        target = random.uniform(start, end)
+        if self.min_interval <= 0:
+            return target
+
+        steps = int((end - start) / self.min_interval) + 1
+        for k in range(steps + 1):
+            for candidate in (target + k * self.min_interval, target - k * self.min_interval):
+                if start <= candidate <= end and all(abs(candidate - t) >= self.min_interval for t in taken):
+                    return candidate
+        self.logger.warning("重新认证窗口已排满，部分账号的认证时间将相互重叠，可调大FLEET_WINDOW")
+        return target
+
+    def refresh(self, statuses: dict, now: float = None) -> list:
+        """
+        更新计划文件中本机账号的状态和安排，并找出需要立即认证的账号
+
+        Args:
+            statuses (dict): 账号 -> check_online()的结果
+            now (float): 当前时间戳
+
+        Returns:
+            list: 需要认证的 (账号, 是否已掉线) 列表，已掉线的在前，其余按安排的时间排序
+        """
+        now = time.time() if now is None else now
+        offline, due = [], []
+        with self.schedule.transaction() as data:
+            records = data["accounts"]
+            for username, (online, add_time) in statuses.items():
+                record = records.setdefault(username, {})
+                record["host"] = self.host
+                record["checked_at"] = now
+                if online is None:
+                    continue
+                record["offline"] = not online
+                if not online:
+                    record["slot"] = None
+                    if record.get("next_attempt", 0) <= now:
+                        offline.append(username)
+                    continue
+
+                expires_at = add_time + self.session_lifetime if add_time else None
+                if expires_at is None and record.get("last_login"):
+                    expires_at = record["last_login"] + self.session_lifetime
+                if expires_at is None:
+                    continue
+                # 本地记录的过期时间与认证服务器的上线时间有几秒误差，不必因此重新安排
+                if abs((record.get("expires_at") or 0) - expires_at) > 60 or not record.get("slot"):
+                    taken = [r["slot"] for name, r in records.items() if name != username and r.get("slot")]
+                    record["expires_at"] = expires_at
+                    record["slot"] = self.plan_slot(expires_at, taken, now)
+                    self.logger.info(
+                        f"{username} 计划于 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['slot']))} 重新认证"
+                    )
+                if record["slot"] <= now and record.get("next_attempt", 0) <= now:
+                    due.append(username)
+
+        due.sort(key=lambda name: records[name]["slot"])
+        return [(name, True) for name in offline] + [(name, False) for name in due]
+
+    def acquire_turn(self, username: str, priority: bool) -> float:
+        """
+        申请在全体机器中发起一次认证请求
+
+        Args:
+            username (str): 账号
+            priority (bool): 是否为已掉线账号；有已掉线账号等待认证时，计划内的重新认证让行
+
+        Returns:
+            float: 0表示可以立即认证，否则为建议等待的秒数
+        """
+        with self.schedule.transaction() as data:
+            now = time.time()
+            wait = data["last_start"] + self.min_interval - now
+            if wait > 0:
+                return wait
+            if not priority:
+                waiting = [
+                    name for name, r in data["accounts"].items()
+                    if r.get("offline") and r.get("next_attempt", 0) <= now
+                    and now - r.get("checked_at", 0) < 3 * self.check_interval
+                ]
+                if waiting:
+                    return self.min_interval or 1.0
+            data["last_start"] = now
+            data["accounts"].setdefault(username, {})["started_at"] = now
+        return 0.0
+
+    def authenticate(self, account: dict, offline: bool) -> bool:
+        """
+        认证一个账号并记录结果
+
+        Args:
+            account (dict): 账号
+            offline (bool): True时直接登录，False时注销再登录以刷新即将过期的会话
+        """
+        username = account["username"]
+        login = self._login_for(account)
+        operations = Operations(login)
+        try:
+            if offline:
+                self.logger.warning(f"{username} 已掉线，优先重新登录")
+                success = operations.execute_login(force=True)
+            else:
+                self.logger.info(f"{username} 按计划重新认证")
+                success = operations.execute_logout_and_relogin()
+        finally:
+            login.cleanup()
+
+        backoff = self._backoffs.setdefault(
+            username, Backoff(base=self.retry_interval, cap=max(self.retry_interval, self.max_retry_interval)))
+        now = time.time()
+        with self.schedule.transaction() as data:
+            record = data["accounts"].setdefault(username, {})
+            if success:
+                backoff.reset()
+                record.update(last_login=now, expires_at=now + self.session_lifetime, offline=False,
+                              next_attempt=0, slot=self.plan_slot(
+                                  now + self.session_lifetime,
+                                  [r["slot"] for name, r in data["accounts"].items()
+                                   if name != username and r.get("slot")], now))
+            else:
+                delay = backoff.next_delay()
+                record["next_attempt"] = now + delay
+                self.logger.error(f"{username} 认证失败，{delay:.0f} 秒后重试")
+        return success
+
+    def run_once(self) -> int:
+        """
+        执行一轮：检查本机全部账号，依次认证需要认证的账号
+
+        Returns:
+            int: 本轮认证成功的账号数
+        """
+        accounts = {account["username"]: account for account in self.accounts}
+        statuses = {name: self.check_online(self._login_for(account)) for name, account in accounts.items()}
+        succeeded = 0
+        for username, offline in self.refresh(statuses):
+            while not self._stop_event.is_set():
+                wait = self.acquire_turn(username, offline)
+                if wait <= 0:
+                    break
+                self._stop_event.wait(wait)
+            if self._stop_event.is_set():
+                break
+            succeeded += self.authenticate(accounts[username], offline)
+        return succeeded
+
+    def run(self):
+        """持续运行，直到stop()被调用"""
+        self.logger.info(f"错峰重新认证已启动，本机负责 {len(self.accounts)} 个账号")
+        # 上次异常退出遗留的浏览器进程会一直占用内存，启动时先清理
+        if self.governor.reap_orphans:
+            self.governor.reap()
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    self.run_once()
+                except Exception as e:
+                    self.logger.error(f"错峰重新认证检查异常: {str(e)}")
+                self._stop_event.wait(self.check_interval)
+        finally:
+            for login in self._logins.values():
+                login.cleanup()
+            self.logger.info("错峰重新认证已退出")
+
+    def stop(self):
+        """请求退出"""
+        self._stop_event.set()
+
+
+def print_schedule(schedule: SharedSchedule):
+    """显示计划文件中全部账号的安排"""
+    now = time.time()
+
+    def fmt(ts):
+        return time.strftime("%m-%d %H:%M:%S", time.localtime(ts)) if ts else "-"
+
+    for username, record in sorted(schedule.read()["accounts"].items(), key=lambda item: item[1].get("slot") or 0):
+        state = "掉线" if record.get("offline") else "在线"
+        slot = record.get("slot")
+        remaining = f"（{(slot - now) / 60:.0f} 分钟后）" if slot and slot > now else ""
+        print(f"{username:<20}{record.get('host', '-'):<16}{state}  过期 {fmt(record.get('expires_at'))}"
+              f"  计划 {fmt(slot)}{remaining}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多机错峰重新认证")
+    parser.add_argument("--schedule", default=load_setting("FLEET_SCHEDULE_FILE", "gdipu_fleet.json"),
+                        help="计划文件，多台机器共用时放在共享目录中")
+    parser.add_argument("--once", action="store_true", help="只执行一轮")
+    parser.add_argument("--show", action="store_true", help="显示当前计划")
+    args = parser.parse_args()
+
+    schedule = SharedSchedule(args.schedule)
+    if args.show:
+        print_schedule(schedule)
+        return 0
+
+    accounts = load_setting("ACCOUNTS", [])
+    if not accounts and load_setting("USERNAME"):
+        accounts = [{"username": load_setting("USERNAME"), "password": load_setting("PASSWORD")}]
+    if not accounts:
+        print("❌ config.py 中未配置账号")
+        return 2
+
+    setup_logging(
+        level=load_setting("LOG_LEVEL", "INFO"),
+        log_file=load_setting("LOG_FILE", "gdipu_auto_login.log"),
+        fmt=load_setting("LOG_FORMAT", "text"),
+        rotation=load_setting("LOG_ROTATION", "size"),
+        max_bytes=load_setting("LOG_MAX_BYTES", 5 * 1024 * 1024),
+        backup_count=load_setting("LOG_BACKUP_COUNT", 5),
+    )
+    scheduler = FleetScheduler(
+        accounts, schedule,
+        session_lifetime=load_setting("SESSION_LIFETIME", 12 * 3600),
+        reauth_margin=load_setting("REAUTH_MARGIN", 600),
+        window=load_setting("FLEET_WINDOW", 1800),
+        min_interval=load_setting("FLEET_MIN_INTERVAL", 5),
+        check_interval=load_setting("CHECK_INTERVAL", 60),
+        retry_interval=load_setting("RETRY_INTERVAL", 30),
+        max_retry_interval=load_setting("MAX_RETRY_INTERVAL", 600),
+        engine=load_setting("LOGIN_ENGINE", "http"),
+        target_url=load_setting("PORTAL_URL", DEFAULT_PORTAL_URL),
+        headless=load_setting("HEADLESS", True),
+        governor=MemoryGovernor(
+            budget=load_setting("BROWSER_MEMORY_BUDGET", 400 * 1024 * 1024),
+            idle_timeout=load_setting("BROWSER_IDLE_TIMEOUT", 300),
+            reap_orphans=load_setting("REAP_ORPHAN_BROWSERS", True),
+        ),
+    )
+    if args.once:
+        scheduler.run_once()
+        return 0
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: scheduler.stop())
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        print("\n⚠️  用户中断操作")
+        scheduler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,21 +6,327 @@ Author: Monokuna-Hugo
 Date: 2025-11-23
 """
 
+import os
+import sys
+import copy
+import json
 import time
-import logging
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
+import queue
+import argparse
+import threading
+from contextlib import contextmanager, nullcontext, redirect_stdout
+
+from lazy_import import LazyImport
+from portal_http import PortalHTTPClient, PortalAuthError, PortalUnavailableError
+from portal_probe import PortalProbe, ProbeState, DEFAULT_CHECK_URL, local_address
+from session_store import SessionStore
+from auth_watch import AuthResponseWatcher
+from metrics import PhaseMetrics, instrumented
+from artifacts import ArtifactCollector
+from logging_setup import setup_logging, get_logger, log_file_path
+from resilience import AdaptiveTimeouts, CircuitBreaker
+from user_info import UserInfo
+from memory_governor import MemoryGovernor, claim, unclaim
+from page_state import (PageState, PageSnapshot, CLASSIFY_FUNCTION, LOGIN_FORM_IDS, READY_STATES,
+                        OUTCOME_STATES, LOGGED_OUT_STATES, classify)
+
+# selenium导入耗时较长，只在真正需要浏览器时才加载
+By = LazyImport("selenium.webdriver.common.by", "By")
+WebDriverWait = LazyImport("selenium.webdriver.support.ui", "WebDriverWait")
+EC = LazyImport("selenium.webdriver.support.expected_conditions")
+selenium_exceptions = LazyImport("selenium.common.exceptions")
+# 浏览器后端（及cdp后端的websocket客户端）只在启动浏览器时才加载
+browser_backends = LazyImport("browser_backends")
+# 录制只在--trace时使用
+TraceRecorder = LazyImport("portal_trace", "TraceRecorder")
+
+
+# 认证页面地址
+DEFAULT_PORTAL_URL = "http://10.0.5.112/"
+
+# 可选的登录引擎
+LOGIN_ENGINES = ("auto", "http", "selenium", "race")
+
+# 可选的浏览器后端，与browser_backends.BROWSER_BACKENDS的键一致
+BROWSERS = ("chrome", "firefox", "cdp")
+
+# 各步骤的默认等待上限（秒）：完成信号出现后立即继续，只有页面迟迟没有响应时才会等满；
+# 积累足够的样本后按最近观测到的耗时自适应调整
+DEFAULT_STEP_TIMEOUTS = {
+    "page_load": 30,    # 页面加载（driver.get）
+    "page_ready": 15,   # 页面进入可识别的状态
+    "dialog": 5,        # 注销确认对话框出现/消失
+    "element": 10,      # 定位登录表单元素
+    "fill": 3,          # 输入框内容写入完成
+    "login": 20,        # 点击登录后等待页面响应
+    "status": 5,        # 检查注销按钮是否存在
+    "logout": 10,       # 确认注销后等待页面响应
+}
+
+# 元素不出现也属于正常结果的步骤（如未弹出对话框、未登录时没有注销按钮），超时不计入耗时统计
+OPTIONAL_STEPS = ("dialog", "status")
+
+# 轮询页面状态的间隔（秒）
+POLL_INTERVAL = 0.1
+
+# 浏览器登录/注销结果的判断方式
+VERIFICATION_MODES = ("network", "dom")
+
+# 持久化用户数据目录的磁盘缓存上限（字节）
+PROFILE_DISK_CACHE_SIZE = 50 * 1024 * 1024
+
+# race模式落败的浏览器路径可能仍在启动浏览器，cleanup()等待其关闭浏览器的上限（秒）
+RACE_TEARDOWN_TIMEOUT = 30
+
+# 批量登录注入的异步脚本：在页面内用classifyPage等待登录表单就绪（期间关闭网络连接错误对话框），
+# 用原生setter写入账号密码并派发input/change事件，点击登录后立即返回，全程只占一次WebDriver往返
+# 参数：用户名、密码、等待上限（毫秒）、回调
+BATCHED_LOGIN_SCRIPT = CLASSIFY_FUNCTION + """
+var username = arguments[0], password = arguments[1], timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var start = Date.now(), dialogHandled = false;
+var setValue = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, "value").set;
+
+function fill(field, value) {
+    field.focus();
+    setValue.call(field, value);
+    field.dispatchEvent(new Event("input", {bubbles: true}));
+    field.dispatchEvent(new Event("change", {bubbles: true}));
+    field.blur();
+    return field.value === value;
+}
+
+function result(state, extra) {
+    var data = {state: state, dialog: dialogHandled, elapsed: Date.now() - start};
+    for (var key in extra || {}) { data[key] = extra[key]; }
+    done(data);
+}
+
+(function tick() {
+    var page = classifyPage(true);
+    dialogHandled = dialogHandled || page.dialog_handled;
+    if (page.state === "logged_in") {
+        return result("logged_in");
+    }
+    if ((page.state === "login_form" || page.state === "error_message") && !page.missing.length) {
+        if (!fill(document.getElementById("username"), username) ||
+            !fill(document.getElementById("password"), password)) {
+            return result("fill_failed");
+        }
+        document.getElementById("login-account").click();
+        return result("submitted");
+    }
+    if (Date.now() - start > timeoutMs) {
+        return result("missing", {missing: page.missing, page: page.state});
+    }
+    setTimeout(tick, 50);
+})();
+"""
+
+# 浏览器启动配置
+# full: 原有配置，等待页面全部资源加载完成（load事件）
+# lean: 只等DOM就绪（eager），屏蔽图片、字体和统计脚本，关闭扩展与后台网络请求；
+#       认证页面的某些资源迟迟加载不完时，full配置会一直等到页面加载超时
+CHROME_PROFILES = {
+    "full": {
+        "page_load_strategy": "normal",
+        "window_size": "1920,1080",
+        "arguments": (),
+        "blocked_urls": (),
+    },
+    "lean": {
+        "page_load_strategy": "eager",
+        "window_size": "1024,768",
+        "arguments": (
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-component-update",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--no-first-run",
+            "--mute-audio",
+            "--blink-settings=imagesEnabled=false",
+        ),
+        "blocked_urls": (
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+            "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+            "*google-analytics.com*", "*googletagmanager.com*", "*hm.baidu.com*", "*cnzz.com*",
+        ),
+    },
+}
+
+
+class DriverSession:
+    """WebDriver会话管理类：在多个操作之间复用同一个浏览器，并在其崩溃后透明重建"""
+    
+    def __init__(self, factory, logger, governor: MemoryGovernor = None):
+        """
+        初始化会话管理器
+        
+        Args:
+            factory: 创建新WebDriver实例的可调用对象
+            logger: 日志记录器
+            governor (MemoryGovernor): 浏览器内存管理器，None时不统计内存也不限制
+        """
+        self.factory = factory
+        self.logger = logger
+        self.governor = governor
+        self.driver = None
+        self.launch_count = 0
+        # 最近一次操作结束时浏览器进程树的内存（字节）
+        self.last_rss = None
+        self._holds = 0
+        # 空闲计时器在后台线程中关闭浏览器，与操作线程互斥
+        self._lock = threading.RLock()
+        self._idle_timer = None
+        self._generation = 0
+    
+    @staticmethod
+    def _driver_process_alive(driver):
+        """chromedriver进程是否仍在运行（进程已退出时再发命令只会触发urllib3重试风暴）"""
+        process = getattr(getattr(driver, "service", None), "process", None)
+        return process is None or process.poll() is None
+    
+    def is_alive(self):
+        """检查当前浏览器会话是否健康"""
+        if self.driver is None or not self._driver_process_alive(self.driver):
+            return False
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except selenium_exceptions.WebDriverException:
+            return False
+    
+    @property
+    def held(self):
+        """会话是否被保持（处于hold()块内）"""
+        return self._holds > 0
+    
+    def acquire(self):
+        """
+        获取可用的WebDriver，已有健康会话时直接复用，否则启动新浏览器
+        
+        Returns:
+            WebDriver
+        """
+        with self._lock:
+            self._cancel_idle_timer()
+            self.last_rss = None
+            if self.driver is not None:
+                if self.is_alive():
+                    rss = self.governor.measure(self.driver) if self.governor else 0
+                    if not (self.governor and self.governor.over_budget(rss)):
+                        self.logger.info("复用已有WebDriver会话")
+                        return self.driver
+                    self.logger.warning(f"浏览器内存 {self.governor.describe(rss)} 超出预算，正在重新启动浏览器")
+                else:
+                    self.logger.warning("WebDriver会话已失效，正在重新启动浏览器")
+                self.close()
+            
+            if self.governor and self.governor.reap_orphans:
+                self.governor.reap()
+            self.driver = self.factory()
+            claim(self.driver)
+            self.launch_count += 1
+            return self.driver
+    
+    @contextmanager
+    def hold(self):
+        """在with块内保持浏览器存活，块内各操作的cleanup()不会关闭浏览器，退出时统一关闭"""
+        self._holds += 1
+        try:
+            yield self
+        finally:
+            self._holds -= 1
+            if not self.held:
+                self.close()
+    
+    def release(self):
+        """
+        释放会话：未被保持时关闭浏览器；被保持时若内存超出预算则重启（下次acquire时启动），
+        否则开始空闲计时，超时仍未被再次使用时关闭
+        """
+        with self._lock:
+            if self.driver is not None and self.governor:
+                self.last_rss = self.governor.measure(self.driver)
+                self.logger.info(f"本次操作结束时浏览器内存: {self.governor.describe(self.last_rss)}")
+            if not self.held:
+                self.close()
+            elif self.governor and self.last_rss and self.governor.over_budget(self.last_rss):
+                self.logger.warning("浏览器内存超出预算，关闭浏览器，下次操作时重新启动")
+                self.close()
+            elif self.driver is not None and self.governor and self.governor.idle_timeout:
+                self._start_idle_timer()
+    
+    def _start_idle_timer(self):
+        self._cancel_idle_timer()
+        self._generation += 1
+        self._idle_timer = threading.Timer(self.governor.idle_timeout, self._close_if_idle, (self._generation,))
+        self._idle_timer.daemon = True
+        self._idle_timer.start()
+    
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+    
+    def _close_if_idle(self, generation: int):
+        """空闲计时结束：期间没有新的操作时关闭浏览器"""
+        with self._lock:
+            if generation != self._generation or self._idle_timer is None:
+                return
+            self._idle_timer = None
+            self.logger.info(f"浏览器已空闲 {self.governor.idle_timeout:g} 秒，关闭以释放内存")
+            self.close()
+    
+    def adopt(self, driver):
+        """接管另一个会话启动的浏览器（race模式下浏览器路径胜出时），原有浏览器会被关闭"""
+        with self._lock:
+            if driver is self.driver:
+                return
+            self.close()
+            self.driver = driver
+            claim(driver)
+            self.launch_count += 1
+    
+    def close(self):
+        """关闭浏览器"""
+        with self._lock:
+            self._cancel_idle_timer()
+            self._close()
+    
+    def _close(self):
+        if self.driver is None:
+            return
+        driver, self.driver = self.driver, None
+        unclaim(driver)
+        try:
+            if self._driver_process_alive(driver):
+                driver.quit()
+                self.logger.info("WebDriver已关闭")
+            else:
+                # chromedriver已退出，只回收本地资源，不再向其发送命令
+                driver.service.stop()
+                self.logger.info("WebDriver进程已退出，会话已丢弃")
+        except Exception:
+            pass
 
 
 class GDIPUAutoLogin:
     """广东轻工网络准入认证自动登录类"""
     
-    def __init__(self, username: str, password: str, headless: bool = False):
+    def __init__(self, username: str, password: str, headless: bool = False,
+                 engine: str = "auto", ac_id: str = None, step_timeouts: dict = None,
+                 probe: PortalProbe = None, metrics: PhaseMetrics = None,
+                 target_url: str = DEFAULT_PORTAL_URL, source_address: str = None,
+                 interface: str = None, chromedriver_path: str = None,
+                 chrome_profile: str = "lean", artifacts: ArtifactCollector = None,
+                 timeout_ceiling: float = 30, adaptive_timeouts: bool = True,
+                 batched_login: bool = True, session_store: SessionStore = None,
+                 session_lifetime: float = 12 * 3600, reauth_margin: float = 600,
+                 user_data_dir: str = None, verification: str = "network", info_ttl: float = 30,
+                 browser: str = "chrome", browser_binary: str = None, geckodriver_path: str = None,
+                 governor: MemoryGovernor = None, browser_slots=None):
         """
         初始化登录类
         
@@ -28,174 +334,437 @@ class GDIPUAutoLogin:
             username (str): 用户名
             password (str): 密码
             headless (bool): 是否无头模式，默认False
+            engine (str): 登录引擎，auto为优先HTTP、失败时回退Selenium，race为HTTP直接提交与浏览器登录
+                          同时进行、采用先成功的一方，默认auto
+            ac_id (str): 认证区域ID，None时自动检测
+            step_timeouts (dict): 各步骤等待上限（秒），覆盖DEFAULT_STEP_TIMEOUTS中的同名项
+            probe (PortalProbe): 认证状态快速探测器，None时使用默认设置
+            metrics (PhaseMetrics): 分阶段计时记录器，None时使用默认设置
+            target_url (str): 认证页面地址
+            source_address (str): HTTP引擎使用的本地源地址，None为系统默认
+            interface (str): HTTP引擎绑定的网卡，None为系统默认
+            chromedriver_path (str): chromedriver路径，None时自动查找
+            chrome_profile (str): 浏览器启动配置，CHROME_PROFILES中的键，默认lean
+            artifacts (ArtifactCollector): 登录现场记录器，None时使用默认设置（仅失败时截图）
+            timeout_ceiling (float): 任何步骤的等待上限都不超过该值（秒）
+            adaptive_timeouts (bool): 是否按最近观测到的耗时自适应调整各步骤的等待上限
+            batched_login (bool): 浏览器登录时是否用一次注入脚本完成定位、填写和提交，
+                                  False时逐个元素操作（每步一次WebDriver往返）
+            session_store (SessionStore): 本地认证记录，None时不记录也不跳过登录
+            session_lifetime (float): 认证有效期（秒）
+            reauth_margin (float): 距过期不足该时间（秒）时不再信任本地认证记录
+            user_data_dir (str): 浏览器用户数据目录（含磁盘缓存），每个账号一个子目录；
+                                 None时每次使用全新的临时配置
+            verification (str): 浏览器登录/注销结果的判断方式：network根据认证接口的网络响应，
+                                dom根据页面元素变化
+            info_ttl (float): 用户信息缓存时间（秒），0为不缓存
+            browser (str): 浏览器后端，BROWSERS中的值：chrome、firefox或cdp（不经chromedriver直接使用CDP）
+            browser_binary (str): 浏览器可执行文件，None时自动查找
+            geckodriver_path (str): firefox后端使用的geckodriver路径，None时自动查找
+            governor (MemoryGovernor): 浏览器内存管理器，None时使用默认设置
+            browser_slots: 多个实例共享的信号量（threading.Semaphore），只在真正走浏览器登录时占用，
+                           限制同时运行的浏览器数量；None为不限制
         """
+        if engine not in LOGIN_ENGINES:
+            raise ValueError(f"不支持的登录引擎: {engine}，可选值: {', '.join(LOGIN_ENGINES)}")
+        if verification not in VERIFICATION_MODES:
+            raise ValueError(f"不支持的结果判断方式: {verification}，可选值: {', '.join(VERIFICATION_MODES)}")
+        if chrome_profile not in CHROME_PROFILES:
+            raise ValueError(f"不支持的浏览器配置: {chrome_profile}，可选值: {', '.join(CHROME_PROFILES)}")
+        if browser not in BROWSERS:
+            raise ValueError(f"不支持的浏览器后端: {browser}，可选值: {', '.join(BROWSERS)}")
+        
         self.username = username
         self.password = password
         self.headless = headless
+        self.engine = engine
+        self.ac_id = ac_id
+        self.step_timeouts = AdaptiveTimeouts(
+            dict(DEFAULT_STEP_TIMEOUTS, **(step_timeouts or {})),
+            ceiling=timeout_ceiling, enabled=adaptive_timeouts,
+        )
+        self._page_load_timeout = None
+        self.batched_login = batched_login
+        self.session_store = session_store
+        self.session_lifetime = session_lifetime
+        self.reauth_margin = reauth_margin
+        self.user_data_dir = user_data_dir
+        # 本次登录时认证服务器看到的IP
+        self.session_ip = None
+        self.verification = verification
+        self._auth_verdict = None
+        self.info_ttl = info_ttl
+        self._user_info = None
+        # 录制中的操作记录（recording()块内）
+        self.trace = None
+        self.browser_slots = browser_slots
+        # race模式下另一条路径已胜出时被设置，浏览器路径在下一个检查点放弃
+        self._cancel = None
+        # race模式下仍在运行的路径线程，cleanup()时等待其关闭浏览器
+        self._race_threads = []
         self.driver = None
-        self.target_url = "http://10.0.5.112/"
+        self.http_client = None
+        self.target_url = target_url
+        self.source_address = source_address
+        self.interface = interface
+        self.chromedriver_path = chromedriver_path
+        self.geckodriver_path = geckodriver_path
+        self.browser_binary = browser_binary
+        self.chrome_profile = chrome_profile
+        self.probe = probe or PortalProbe(self.target_url)
         
         # 配置日志
         self._setup_logging()
+        self.metrics = metrics or PhaseMetrics(account=username, logger=self.logger)
+        self.artifacts = artifacts or ArtifactCollector(logger=self.logger)
+        # 登录流程中待记录的现场，在登录计时结束后再取回
+        self._pending_artifact = None
+        self.last_artifact = None
+        # 认证页面无法访问时暂停启动浏览器
+        self.breaker = CircuitBreaker(logger=self.logger)
+        self.browser = browser
+        self._backend = None
+        
+        # 浏览器会话管理
+        self.session = DriverSession(self._create_driver, self.logger,
+                                     governor or MemoryGovernor(logger=self.logger))
         
+    @property
+    def backend(self):
+        """浏览器后端，首次使用时创建"""
+        if self._backend is None:
+            self._backend = browser_backends.create_backend(self.browser, self.logger)
+        return self._backend
+    
     def _setup_logging(self):
-        """配置日志系统"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('gdipu_auto_login.log', encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        """获取本实例的日志记录器，日志由后台线程写入文件，不阻塞登录流程"""
+        self.logger = get_logger(self.username)
     
+    @instrumented("setup_driver")
     def setup_driver(self):
-        """设置WebDriver"""
+        """设置WebDriver，已有健康的浏览器会话时直接复用"""
+        if not self.breaker.allow(self.probe):
+            self.driver = None
+            self.logger.warning("认证服务器仍无法访问，跳过启动浏览器")
+            return False
         try:
-            chrome_options = Options()
-            
-            # 无头模式设置
-            if self.headless:
-                chrome_options.add_argument("--headless")
-            
-            # 其他浏览器选项
-            chrome_options.add_argument("--no-sandbox")
-            chrome_options.add_argument("--disable-dev-shm-usage")
-            chrome_options.add_argument("--disable-gpu")
-            chrome_options.add_argument("--window-size=1920,1080")
-            
-            # 使用webdriver-manager自动管理ChromeDriver
-            service = Service(executable_path="./chromedriver.exe")
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
-            
-            # 设置页面加载超时
-            self.driver.set_page_load_timeout(30)
-            self.driver.implicitly_wait(10)
-            
+            self.driver = self.session.acquire()
+            if self.trace is not None:
+                self.trace.attach_driver(self.driver)
             self.logger.info("WebDriver初始化成功")
             return True
             
         except Exception as e:
+            self.driver = None
             self.logger.error(f"WebDriver初始化失败: {str(e)}")
             return False
     
-    def wait_for_element(self, by: By, value: str, timeout: int = 10):
+    def _create_driver(self):
+        """通过浏览器后端启动新的浏览器"""
+        profile = CHROME_PROFILES[self.chrome_profile]
+        
+        # 持久化的用户数据目录保留磁盘缓存和Cookie，认证页面的静态资源不必每次重新下载；
+        # 同一目录不能被两个浏览器同时使用，因此每个账号一个子目录
+        profile_dir = None
+        if self.user_data_dir:
+            profile_dir = os.path.abspath(os.path.join(self.user_data_dir, self.username.replace(os.sep, "_")))
+        
+        settings = browser_backends.LaunchSettings(
+            profile, headless=self.headless, user_data_dir=profile_dir,
+            disk_cache_size=PROFILE_DISK_CACHE_SIZE,
+            # 开启performance日志，从中读取DevTools的Network事件（录制时也从中记录浏览器的请求）
+            performance_log=self.verification == "network" or self.trace is not None,
+            driver_path=self.geckodriver_path if self.backend.name == "firefox" else self.chromedriver_path,
+            binary=self.browser_binary,
+        )
+        driver = self.backend.launch(settings)
+        self.logger.info(
+            f"浏览器已启动（{self.backend.name}）: 耗时 {self.backend.launch_time * 1000:.0f} ms，"
+            f"内存 {self.backend.memory(driver) / (1024 * 1024):.1f} MB"
+        )
+        self.metrics.count_round_trips(driver)
+        
+        # 通过CDP屏蔽非必要资源，请求在浏览器内直接失败，不会拖住页面加载
+        if profile["blocked_urls"] and self.backend.supports_cdp:
+            try:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(profile["blocked_urls"])})
+            except selenium_exceptions.WebDriverException as e:
+                self.logger.warning(f"屏蔽非必要资源失败，继续使用完整加载: {str(e)}")
+        
+        # 没有持久化的用户数据目录时，从认证记录恢复上次的Cookie
+        if not self.user_data_dir and self.backend.supports_cdp:
+            self._restore_browser_cookies(driver)
+        
+        # 设置页面加载超时；元素等待全部使用显式条件，隐式等待会让每次"元素不存在"的判断都白等
+        self._page_load_timeout = self.step_timeouts["page_load"]
+        driver.set_page_load_timeout(self._page_load_timeout)
+        driver.implicitly_wait(0)
+        # 批量登录脚本自行控制等待上限，WebDriver的脚本超时只作兜底
+        driver.set_script_timeout(self.step_timeouts.ceiling + 5)
+        return driver
+    
+    def wait_until(self, condition, step: str):
+        """
+        轮询等待条件成立，超出该步骤的等待上限时抛出TimeoutException
+        
+        Args:
+            condition: 接收driver、返回真值表示完成的可调用对象
+            step: 步骤名称，对应step_timeouts中的键
+            
+        Returns:
+            条件成立时的返回值
+        """
+        timeout = self.step_timeouts[step]
+        start = time.perf_counter()
+        try:
+            result = WebDriverWait(
+                self.driver, timeout, poll_frequency=POLL_INTERVAL,
+                ignored_exceptions=(selenium_exceptions.NoSuchElementException,
+                                    selenium_exceptions.StaleElementReferenceException)
+            ).until(condition)
+        except selenium_exceptions.TimeoutException:
+            # 等满仍未完成说明等待上限偏小，按上限计入样本，让后续等待逐步放宽
+            if step not in OPTIONAL_STEPS:
+                self.step_timeouts.observe(step, timeout)
+            self._trace_step(step, time.perf_counter() - start, "timeout")
+            raise
+        self.step_timeouts.observe(step, time.perf_counter() - start)
+        self._trace_step(step, time.perf_counter() - start, "success")
+        return result
+    
+    def _trace_step(self, step: str, elapsed: float, outcome: str):
+        """录制中时记录步骤结束时的页面快照"""
+        if self.trace is not None and self.driver is not None:
+            self.trace.snapshot(self.driver, step, elapsed, outcome)
+    
+    def wait_for_element(self, by: By, value: str, step: str = "element"):
         """
         等待元素出现
         
         Args:
             by: 定位方式
             value: 定位值
-            timeout: 超时时间（秒）
+            step: 步骤名称，决定等待上限，默认element
             
         Returns:
             WebElement or None
         """
         try:
-            element = WebDriverWait(self.driver, timeout).until(
-                EC.presence_of_element_located((by, value))
-            )
-            return element
-        except TimeoutException:
+            return self.wait_until(EC.presence_of_element_located((by, value)), step)
+        except selenium_exceptions.TimeoutException:
             self.logger.warning(f"元素定位超时: {by}={value}")
             return None
     
+    def page_state(self, dismiss_dialog: bool = False) -> PageSnapshot:
+        """
+        识别一次页面当前状态，只占一次WebDriver往返
+        
+        Args:
+            dismiss_dialog (bool): 是否顺手关闭网络连接错误对话框
+        
+        Returns:
+            PageSnapshot: 识别结果
+        """
+        snapshot = classify(self.driver, dismiss_dialog)
+        if snapshot.dialog_handled:
+            self.logger.info("网络连接错误对话框已处理")
+        return snapshot
+    
+    def wait_for_page_state(self, states, step: str, dismiss_dialog: bool = False) -> PageSnapshot:
+        """
+        轮询页面状态直到进入指定状态之一，超出该步骤的等待上限时抛出TimeoutException
+        
+        Args:
+            states: 期望的PageState集合
+            step (str): 步骤名称，对应step_timeouts中的键
+            dismiss_dialog (bool): 轮询时是否关闭网络连接错误对话框
+        
+        Returns:
+            PageSnapshot: 进入期望状态时的识别结果
+        """
+        def reached(driver):
+            snapshot = self.page_state(dismiss_dialog)
+            return snapshot if snapshot.state in states else False
+        return self.wait_until(reached, step)
+    
+    @instrumented("open_target_website")
     def open_target_website(self):
-        """打开目标网站"""
+        """打开目标网站，等到页面可以识别出状态（期间关闭网络连接错误对话框）"""
         try:
-            self.logger.info(f"正在打开目标网站: {self.target_url}")
-            self.driver.get(self.target_url)
+            self._load_target_page()
             
-            # 等待页面加载完成
-            WebDriverWait(self.driver, 15).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # 处理网络连接错误的确认对话框
-            if self.handle_network_error_dialog():
-                self.logger.info("网络连接错误对话框已处理")
-            else:
-                self.logger.info("未检测到网络连接错误对话框")
+            # 页面进入可识别的状态即为加载完成，不再单独等待对话框出现
+            snapshot = self.wait_for_page_state(READY_STATES, "page_ready", dismiss_dialog=True)
+            self.breaker.record_success()
             
-            self.logger.info("网站打开成功")
+            self.logger.info(f"网站打开成功（页面状态: {snapshot.state.value}）")
             return True
             
-        except TimeoutException:
-            self.logger.error("页面加载超时")
+        except selenium_exceptions.TimeoutException:
+            self.logger.error("页面加载超时或页面状态无法识别")
+            self._record_page_timeout("page_load", "page_ready")
             return False
-        except WebDriverException as e:
+        except selenium_exceptions.WebDriverException as e:
             self.logger.error(f"打开网站失败: {str(e)}")
+            self.breaker.record_failure()
             return False
     
-    def handle_network_error_dialog(self):
-        """处理网络连接错误的确认对话框"""
+    def _record_page_timeout(self, *steps):
+        """
+        打开认证页面超时：等待上限已被自适应收紧时可能只是一次偶发的慢响应，不计入熔断失败
+        
+        Args:
+            steps: 可能超时的步骤名称
+        """
+        if any(self.step_timeouts.tightened(step) for step in steps):
+            self.logger.info("等待上限已按近期耗时收紧，本次超时不计入熔断")
+            return
+        self.breaker.record_failure()
+    
+    def _load_target_page(self):
+        """按当前的自适应上限设置页面加载超时并打开认证页面，超时时抛出TimeoutException"""
+        self.logger.info(f"正在打开目标网站: {self.target_url}")
+        page_load_timeout = self.step_timeouts["page_load"]
+        if page_load_timeout != self._page_load_timeout:
+            self.driver.set_page_load_timeout(page_load_timeout)
+            self._page_load_timeout = page_load_timeout
+        start = time.perf_counter()
         try:
-            # 等待对话框出现
-            dialog = WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "dialog.confirm.active"))
-            )
-            
-            self.logger.info("检测到网络连接错误对话框")
-            
-            # 定位确认按钮
-            confirm_button = dialog.find_element(By.CLASS_NAME, "btn-confirm")
-            
-            # 点击确认按钮
-            confirm_button.click()
-            self.logger.info("已点击确认按钮")
-            
-            # 等待对话框消失
-            WebDriverWait(self.driver, 5).until(
-                EC.invisibility_of_element_located((By.CLASS_NAME, "dialog.confirm.active"))
-            )
-            
-            # 短暂等待确保页面稳定
-            time.sleep(2)
-            
-            self.logger.info("网络连接错误对话框处理完成")
-            return True
-            
-        except TimeoutException:
-            # 对话框未出现，属于正常情况
-            return False
-        except Exception as e:
-            self.logger.error(f"处理网络连接错误对话框失败: {str(e)}")
-            return False
+            self.driver.get(self.target_url)
+        except selenium_exceptions.TimeoutException:
+            self.step_timeouts.observe("page_load", page_load_timeout)
+            self._trace_step("page_load", time.perf_counter() - start, "timeout")
+            raise
+        self.step_timeouts.observe("page_load", time.perf_counter() - start)
+        self._trace_step("page_load", time.perf_counter() - start, "success")
     
-    def locate_login_elements(self):
-        """定位登录相关元素"""
-        elements = {}
-        
-        # 定位用户名输入框
-        username_field = self.wait_for_element(By.ID, "username")
-        if username_field:
-            elements['username'] = username_field
-            self.logger.info("用户名输入框定位成功")
-        else:
-            self.logger.error("用户名输入框定位失败")
+    @instrumented("scripted_login", outcomes=None)
+    def scripted_login(self):
+        """
+        批量登录：打开认证页面后注入一次异步脚本完成等待表单、关闭对话框、填写和提交，
+        再用单条脚本轮询页面响应；热会话下通常只需3~4次WebDriver往返
+        
+        Returns:
+            str: success（登录成功或已登录）、error（页面提示错误）、missing（未找到登录表单）、
+                 fill_failed（填写失败）、timeout（等待页面响应超时）、unreachable（认证页面无法打开）、
+                 cancelled（race模式下另一条路径已胜出，未提交表单）
+        """
+        try:
+            self._load_target_page()
+        except selenium_exceptions.TimeoutException:
+            self.logger.error("页面加载超时")
+            self._record_page_timeout("page_load")
+            return "unreachable"
+        except selenium_exceptions.WebDriverException as e:
+            self.logger.error(f"打开网站失败: {str(e)}")
+            self.breaker.record_failure()
+            return "unreachable"
+        self.breaker.record_success()
+        if self._cancelled():
+            return "cancelled"
+        
+        timeout = self.step_timeouts["element"]
+        watcher = self._auth_watcher("login")
+        start = time.perf_counter()
+        submitted = self.driver.execute_async_script(
+            BATCHED_LOGIN_SCRIPT, self.username, self.password, int(timeout * 1000)
+        )
+        state = submitted["state"]
+        if submitted.get("dialog"):
+            self.logger.info("网络连接错误对话框已处理")
+        if state == "logged_in":
+            self.logger.info("当前已是登录状态")
+            return "success"
+        if state == "missing":
+            self.step_timeouts.observe("element", timeout)
+            self.logger.error(f"登录表单元素定位失败: {', '.join(submitted.get('missing') or [])}"
+                              f"（页面状态: {submitted.get('page')}）")
+            return "missing"
+        if state == "fill_failed":
+            self.logger.error("填写登录凭证失败")
+            return "fill_failed"
+        self.step_timeouts.observe("element", time.perf_counter() - start)
+        self.logger.info(f"登录表单已提交（页面内等待 {submitted.get('elapsed', 0)} ms）")
+        
+        verdict = self.wait_for_auth_response(watcher, "login")
+        if verdict is not None:
+            if verdict.ip:
+                self.session_ip = verdict.ip
+            return "success" if verdict.ok else "error"
+        
+        try:
+            outcome = self.wait_for_page_state(OUTCOME_STATES, "login")
+        except selenium_exceptions.TimeoutException:
+            self.logger.warning("等待登录响应超时")
+            return "timeout"
+        if outcome.state is PageState.ERROR_MESSAGE:
+            self.logger.error(f"页面错误信息: {outcome.message}")
+            return "error"
+        if outcome.ip:
+            self.session_ip = outcome.ip
+        return "success"
+    
+    def _auth_watcher(self, action: str):
+        """按结果判断方式创建认证接口的网络事件监视器，dom模式下返回None"""
+        if self.verification != "network":
             return None
+        return AuthResponseWatcher(self.driver, action)
+    
+    def wait_for_auth_response(self, watcher: AuthResponseWatcher, step: str):
+        """
+        等待认证接口作出响应
         
-        # 定位密码输入框
-        password_field = self.wait_for_element(By.ID, "password")
-        if password_field:
-            elements['password'] = password_field
-            self.logger.info("密码输入框定位成功")
-        else:
-            self.logger.error("密码输入框定位失败")
+        Args:
+            watcher (AuthResponseWatcher): 在发出请求前创建的监视器，None时直接返回None
+            step (str): 步骤名称，决定等待上限
+            
+        Returns:
+            AuthVerdict: 服务器的响应结论；浏览器不支持performance日志或等待超时时返回None，由调用方改用页面元素判断
+        """
+        if watcher is None:
+            return None
+        try:
+            verdict = self.wait_until(lambda driver: watcher.poll() or not watcher.available, step)
+        except selenium_exceptions.TimeoutException:
+            self.logger.warning("未观察到认证接口的响应，改用页面元素判断")
+            return None
+        if not watcher.available:
+            self.logger.warning("浏览器不支持performance日志，改用页面元素判断")
+            self.verification = "dom"
             return None
         
-        # 定位登录按钮
-        login_button = self.wait_for_element(By.ID, "login-account")
-        if login_button:
-            elements['login_button'] = login_button
-            self.logger.info("登录按钮定位成功")
+        latency = f"，接口耗时 {verdict.latency * 1000:.0f} ms" if verdict.latency is not None else ""
+        if verdict.ok:
+            self.logger.info(f"认证接口响应成功（HTTP {verdict.status}{latency}）")
         else:
-            self.logger.error("登录按钮定位失败")
+            self.logger.error(f"认证服务器返回: {verdict.message}（HTTP {verdict.status}{latency}）")
+        return verdict
+    
+    @instrumented("locate_login_elements")
+    def locate_login_elements(self):
+        """等到页面识别为登录表单后一次取回全部登录相关元素"""
+        try:
+            snapshot = self.wait_for_page_state(
+                {PageState.LOGIN_FORM, PageState.ERROR_MESSAGE, PageState.LOGGED_IN}, "element", dismiss_dialog=True
+            )
+        except selenium_exceptions.TimeoutException:
+            self.logger.error(f"登录表单元素定位失败（页面状态: {self.page_state().state.value}）")
+            return None
+        
+        if snapshot.state is PageState.LOGGED_IN:
+            self.logger.error("登录表单元素定位失败: 页面显示当前已是登录状态")
+            return None
+        if not snapshot.form_ready:
+            self.logger.error(f"登录表单元素定位失败: {', '.join(snapshot.missing)}")
             return None
         
+        elements = {name: self.driver.find_element(By.ID, element_id)
+                    for name, element_id in LOGIN_FORM_IDS.items()}
+        self.logger.info("登录表单元素定位成功")
         return elements
     
+    @instrumented("fill_login_credentials")
     def fill_login_credentials(self, elements: dict):
         """填写登录凭证"""
         try:
@@ -209,75 +778,81 @@ class GDIPUAutoLogin:
             elements['password'].send_keys(self.password)
             self.logger.info("密码填写完成")
             
-            # 短暂等待确保输入完成
-            time.sleep(1)
+            # 等待输入框中的值与填写内容一致，确保输入完成
+            self.wait_until(
+                lambda driver: elements['username'].get_attribute("value") == self.username
+                and elements['password'].get_attribute("value") == self.password,
+                "fill"
+            )
             return True
             
         except Exception as e:
             self.logger.error(f"填写登录凭证失败: {str(e)}")
             return False
     
+    @instrumented("click_login_button")
     def click_login_button(self, elements: dict):
         """点击登录按钮"""
         try:
+            self._auth_verdict = None
+            watcher = self._auth_watcher("login")
+            # 填写期间才弹出的网络连接错误对话框会挡住登录按钮
+            self.page_state(dismiss_dialog=True)
             elements['login_button'].click()
             self.logger.info("登录按钮点击成功")
             
-            # 等待登录操作完成
-            time.sleep(5)
+            # 等待认证接口作出响应，无法观察网络响应时改为等待页面变化
+            self._auth_verdict = self.wait_for_auth_response(watcher, "login")
+            if self._auth_verdict is None:
+                try:
+                    self.wait_for_page_state(OUTCOME_STATES, "login")
+                except selenium_exceptions.TimeoutException:
+                    self.logger.warning("等待登录响应超时")
             return True
             
         except Exception as e:
             self.logger.error(f"点击登录按钮失败: {str(e)}")
             return False
     
+    @instrumented("verify_login_status")
     def verify_login_status(self):
         """验证登录状态"""
+        verdict, self._auth_verdict = self._auth_verdict, None
+        if verdict is not None:
+            if verdict.ip:
+                self.session_ip = verdict.ip
+            self.logger.info(f"登录状态验证: {'登录成功' if verdict.ok else '登录失败'}（根据认证接口响应）")
+            return verdict.ok
         try:
-            # 等待页面稳定
-            time.sleep(5)
-            
-            # 检查登录按钮是否还存在
-            login_button_exists = False
-            try:
-                self.driver.find_element(By.ID, "login-account")
-                login_button_exists = True
-            except NoSuchElementException:
-                login_button_exists = False
-            
-            # 根据登录按钮是否存在判断登录状态
-            if not login_button_exists:
+            snapshot = self.page_state()
+            if snapshot.state is PageState.LOGGED_IN:
+                if snapshot.ip:
+                    self.session_ip = snapshot.ip
                 self.logger.info("登录状态验证: 登录成功")
                 return True
-            else:
-                self.logger.warning("登录状态验证: 登录按钮仍然存在，可能登录失败")
-                
-                # 检查是否有错误信息
-                try:
-                    error_elements = self.driver.find_elements(By.CLASS_NAME, "error")
-                    for error in error_elements:
-                        self.logger.error(f"页面错误信息: {error.text}")
-                except:
-                    pass
-                
-                return False
-                
+            
+            self.logger.warning(f"登录状态验证: 页面未进入登录状态（{snapshot.state.value}），可能登录失败")
+            if snapshot.state is PageState.ERROR_MESSAGE:
+                self.logger.error(f"页面错误信息: {snapshot.message}")
+            return False
+            
         except Exception as e:
             self.logger.error(f"登录状态验证失败: {str(e)}")
             return False
 
     def check_logout_button_exists(self):
-        """检查注销按钮是否存在"""
+        """检查页面是否处于已登录状态（注销按钮或IP地址存在），只识别一次页面状态"""
         try:
-            logout_button = self.wait_for_element(By.ID, "logout", timeout=5)
-            return logout_button is not None
+            return self.page_state().state is PageState.LOGGED_IN
         except:
             return False
 
+    @instrumented("logout")
     def logout(self):
         """执行注销操作"""
         try:
             self.logger.info("开始执行注销操作")
+            self.probe.invalidate()
             
             # 检查注销按钮是否存在
             if not self.check_logout_button_exists():
@@ -288,6 +863,7 @@ class GDIPUAutoLogin:
             logout_button = self.driver.find_element(By.ID, "logout")
             
             # 点击注销按钮
+            watcher = self._auth_watcher("logout")
             logout_button.click()
             self.logger.info("已点击注销按钮")
             
@@ -295,14 +871,21 @@ class GDIPUAutoLogin:
             if self.handle_logout_confirm_dialog():
                 self.logger.info("注销确认对话框处理成功")
                 
-                # 等待注销完成
-                time.sleep(3)
+                # 根据认证接口的响应判断注销结果
+                verdict = self.wait_for_auth_response(watcher, "logout")
+                if verdict is not None:
+                    if verdict.ok:
+                        self.logger.info("注销成功")
+                        self.forget_session()
+                    return verdict.ok
                 
-                # 验证注销是否成功
-                if not self.check_logout_button_exists():
+                # 无法观察网络响应时，等待页面离开已登录状态
+                try:
+                    self.wait_for_page_state(LOGGED_OUT_STATES, "logout")
                     self.logger.info("注销成功")
+                    self.forget_session()
                     return True
-                else:
+                except selenium_exceptions.TimeoutException:
                     self.logger.warning("注销按钮仍然存在，注销可能失败")
                     return False
             else:
@@ -313,118 +896,505 @@ class GDIPUAutoLogin:
             self.logger.error(f"注销操作失败: {str(e)}")
             return False
 
+    @instrumented("handle_logout_confirm_dialog")
     def handle_logout_confirm_dialog(self):
         """处理注销确认对话框"""
         try:
             # 等待对话框出现
-            dialog = WebDriverWait(self.driver, 5).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "dialog.confirm.active"))
-            )
-            
-            self.logger.info("检测到注销确认对话框")
-            
-            # 验证对话框内容
-            try:
-                section_text = dialog.find_element(By.CLASS_NAME, "section").text
-                if "您确定要注销吗？" in section_text:
-                    self.logger.info("确认对话框内容正确")
-                else:
-                    self.logger.warning(f"对话框内容不匹配: {section_text}")
-            except:
-                pass
-            
-            # 定位确认按钮
-            confirm_button = dialog.find_element(By.CLASS_NAME, "btn-confirm")
+            snapshot = self.wait_for_page_state({PageState.LOGOUT_CONFIRM}, "dialog")
+            self.logger.info(f"检测到注销确认对话框: {snapshot.message}")
             
             # 点击确认按钮
-            confirm_button.click()
+            self.driver.find_element(By.CSS_SELECTOR, ".dialog.confirm.active .btn-confirm").click()
             self.logger.info("已点击确认按钮")
             
             # 等待对话框消失
-            WebDriverWait(self.driver, 5).until(
-                EC.invisibility_of_element_located((By.CLASS_NAME, "dialog.confirm.active"))
-            )
-            
-            # 短暂等待确保页面稳定
-            time.sleep(2)
+            self.wait_until(lambda driver: self.page_state().state is not PageState.LOGOUT_CONFIRM, "dialog")
             
             self.logger.info("注销确认对话框处理完成")
             return True
             
-        except TimeoutException:
+        except selenium_exceptions.TimeoutException:
             self.logger.error("注销确认对话框未出现")
             return False
         except Exception as e:
             self.logger.error(f"处理注销确认对话框失败: {str(e)}")
             return False
     
-    def take_screenshot(self, filename: str = None):
-        """截取屏幕截图"""
-        try:
-            if not filename:
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                filename = f"screenshot_{timestamp}.png"
+    @instrumented("take_screenshot")
+    def take_screenshot(self, name: str = "screenshot", success: bool = False):
+        """
+        记录当前页面的截图或源码快照，写盘在后台线程完成
+        
+        Args:
+            name (str): 记录名称
+            success (bool): 本次操作是否成功，按ARTIFACT_MODE决定是否需要记录
             
-            self.driver.save_screenshot(filename)
-            self.logger.info(f"截图已保存: {filename}")
-            return filename
+        Returns:
+            str: 记录文件路径，不需要记录或失败时返回None
+        """
+        path = self.artifacts.capture(self.driver, name, success)
+        if path:
+            self.last_artifact = path
+        return path
+    
+    def _defer_artifact(self, name: str, success: bool, release: bool = False):
+        """
+        登记待记录的现场，由login()在登录计时结束后取回
+        
+        Args:
+            name (str): 记录名称
+            success (bool): 登录是否成功
+            release (bool): 记录后是否释放浏览器
             
-        except Exception as e:
-            self.logger.error(f"截图失败: {str(e)}")
+        Returns:
+            bool: success，便于直接作为登录结果返回
+        """
+        self._pending_artifact = (name, success, release)
+        return success
+    
+    def _capture_pending_artifact(self):
+        """取回登记的现场记录"""
+        pending, self._pending_artifact = self._pending_artifact, None
+        if pending is None:
+            return
+        name, success, release = pending
+        if self.driver is not None and self.artifacts.wants(success):
+            self.take_screenshot(name, success)
+        if release:
+            self.cleanup()
+    
+    def get_http_client(self):
+        """获取HTTP认证客户端（首次调用时创建）"""
+        if self.http_client is None:
+            self.http_client = PortalHTTPClient(
+                self.target_url, self.username, self.password,
+                ac_id=self.ac_id, logger=self.logger,
+                source_address=self.source_address, interface=self.interface
+            )
+            if self.session_store is not None:
+                for cookie in self.session_store.get(self.username).get("cookies") or ():
+                    self.http_client.session.cookies.set(
+                        cookie["name"], cookie["value"],
+                        domain=cookie.get("domain", ""), path=cookie.get("path", "/"),
+                    )
+        if self.trace is not None:
+            self.trace.attach_session(self.http_client.session)
+        return self.http_client
+
+    @instrumented("http_login")
+    def http_login(self):
+        """
+        使用HTTP引擎执行登录
+
+        Returns:
+            True/False: 登录成功/认证服务器拒绝登录
+            None: HTTP引擎不可用，需要回退到Selenium
+        """
+        self.logger.info("开始执行HTTP登录流程")
+        try:
+            client = self.get_http_client()
+            status = client.get_status()
+            if status.get("error") == "ok":
+                self.session_ip = status.get("online_ip") or status.get("client_ip")
+                self.logger.info("=== 当前已处于登录状态 ===")
+                return True
+
+            data = client.login()
+            self.session_ip = data.get("client_ip") or data.get("online_ip") or client.last_ip
+            self.logger.info("=== 登录成功 ===")
+            return True
+
+        except PortalAuthError as e:
+            self.logger.error(f"=== 登录失败 === 认证服务器返回: {str(e)}")
+            return False
+        except PortalUnavailableError as e:
+            self.logger.warning(f"HTTP登录引擎不可用: {str(e)}")
             return None
+
+    @instrumented("http_logout")
+    def http_logout(self):
+        """
+        使用HTTP引擎执行注销
+
+        Returns:
+            True/False: 注销成功/注销失败或当前未登录
+            None: HTTP引擎不可用，需要回退到Selenium
+        """
+        self.logger.info("开始执行HTTP注销操作")
+        self.probe.invalidate()
+        try:
+            client = self.get_http_client()
+            if not client.is_online():
+                self.logger.warning("当前未登录，无需注销")
+                self.forget_session()
+                return False
+
+            client.logout()
+            self.forget_session()
+            self.logger.info("注销成功")
+            return True
+
+        except PortalAuthError as e:
+            self.logger.error(f"注销失败，认证服务器返回: {str(e)}")
+            return False
+        except PortalUnavailableError as e:
+            self.logger.warning(f"HTTP注销引擎不可用: {str(e)}")
+            return None
+
+    def login(self, force: bool = False):
+        """
+        按配置的登录引擎执行登录，HTTP引擎不可用时自动回退到Selenium
+        
+        本地认证记录仍在有效期内且本机IP未变时直接返回，不访问认证服务器；
+        截图等现场记录和认证记录在登录计时结束后才保存，记录的登录耗时不包含这部分开销
+        
+        Args:
+            force (bool): 忽略本地认证记录，总是执行登录流程
+        """
+        if not force:
+            record = self.cached_session()
+            if record:
+                remaining = record["last_login"] + self.session_lifetime - time.time()
+                self.logger.info(f"认证仍在有效期内（剩余 {remaining / 3600:.1f} 小时，IP {record['ip']}），跳过登录")
+                return True
+        
+        self.last_artifact = None
+        self.session_ip = None
+        success = False
+        try:
+            success = self._login()
+            return success
+        finally:
+            if success:
+                self.remember_session()
+            self._capture_pending_artifact()
+    
+    @instrumented("login")
+    def _login(self):
+        """登录流程本体"""
+        # 登录后认证状态会变化，丢弃快速探测的缓存结果
+        self.probe.invalidate()
+        
+        if self.engine == "race" and self.session.driver is None:
+            return self.race_login()
+        
+        # 已有热浏览器时race没有启动开销可省，按auto方式先HTTP后浏览器
+        if self.engine in ("auto", "http", "race"):
+            result = self.http_login()
+            if result is not None:
+                return result
+            if self.engine == "http":
+                return False
+            if self.probe.probe().state is ProbeState.UNREACHABLE:
+                # 接口和门户劫持检测都无响应，启动浏览器只会等满页面加载超时
+                self.breaker.record_failure()
+            self.logger.info("回退到Selenium登录流程")
+
+        return self.selenium_login()
+
+    def selenium_login(self):
+        """执行完整的浏览器登录流程，设置了browser_slots时先等待空闲的浏览器名额"""
+        with self.browser_slots or nullcontext():
+            return self._selenium_login()
     
-    def login(self):
-        """执行完整的登录流程"""
+    def _selenium_login(self):
         self.logger.info("开始执行自动登录流程")
         
         try:
             # 1. 初始化WebDriver
             if not self.setup_driver():
                 return False
+            if self._cancelled():
+                return False
+            
+            if self.batched_login:
+                return self._batched_selenium_login()
             
             # 2. 打开目标网站
             if not self.open_target_website():
                 self.cleanup()
                 return False
+            if self._cancelled():
+                return False
             
             # 3. 定位登录元素
             elements = self.locate_login_elements()
             if not elements:
-                self.take_screenshot("element_locate_failed.png")
-                self.cleanup()
-                return False
+                return self._defer_artifact("element_locate_failed", False, release=True)
             
             # 4. 填写登录凭证
             if not self.fill_login_credentials(elements):
-                self.take_screenshot("credential_fill_failed.png")
-                self.cleanup()
-                return False
+                return self._defer_artifact("credential_fill_failed", False, release=True)
             
             # 5. 点击登录按钮
             if not self.click_login_button(elements):
-                self.take_screenshot("login_click_failed.png")
-                self.cleanup()
-                return False
+                return self._defer_artifact("login_click_failed", False, release=True)
             
             # 6. 验证登录状态
             login_success = self.verify_login_status()
             
             if login_success:
                 self.logger.info("=== 登录成功 ===")
-                self.take_screenshot("login_success.png")
-                return True
+                return self._defer_artifact("login_success", True)
             else:
                 self.logger.error("=== 登录失败 ===")
-                self.take_screenshot("login_failed.png")
-                return False
+                return self._defer_artifact("login_failed", False)
                 
         except Exception as e:
             self.logger.error(f"登录流程执行异常: {str(e)}")
-            self.take_screenshot("login_exception.png")
+            return self._defer_artifact("login_exception", False)
+        
+    def race_login(self):
+        """
+        race模式：HTTP直接提交与浏览器登录（含启动浏览器）同时进行，采用最先确认登录成功的一方，
+        另一方随即取消（浏览器路径在下一个检查点放弃并关闭浏览器）；HTTP路径被认证服务器明确拒绝时
+        浏览器提交同样会被拒绝，也立即结束
+        
+        每条路径的耗时和结果（won/lost/failed/unavailable/cancelled）记为race_http、race_browser阶段
+        
+        Returns:
+            bool: 是否登录成功
+        """
+        self.logger.info("开始执行race登录流程：HTTP直接提交与浏览器登录同时进行")
+        cancel = threading.Event()
+        claim_lock = threading.Lock()
+        results = queue.Queue()
+        contenders = {"http": self._contender(cancel), "browser": self._contender(cancel)}
+        
+        def run(path, contender, func):
+            with self.metrics.phase(f"race_{path}") as record:
+                try:
+                    ok = func(contender)
+                except Exception as e:
+                    contender.logger.error(f"race {path} 路径异常: {str(e)}")
+                    ok = None
+                with claim_lock:
+                    cancelled = cancel.is_set()
+                    won = ok is True and not cancelled
+                    if won:
+                        cancel.set()
+                if won:
+                    record.outcome = "won"
+                elif ok:
+                    record.outcome = "lost"
+                elif cancelled and path == "browser":
+                    record.outcome = "cancelled"
+                else:
+                    record.outcome = "failed" if ok is False else "unavailable"
+            if cancelled and not won:
+                # 另一条路径已胜出，关闭本路径启动的浏览器
+                contender.session.close()
+            results.put((path, ok, record.duration, won))
+        
+        # 非守护线程：命令行进程退出前落败路径也能关闭它启动的浏览器
+        for path, func in (("http", GDIPUAutoLogin._verified_http_login),
+                           ("browser", GDIPUAutoLogin.selenium_login)):
+            thread = threading.Thread(target=run, args=(path, contenders[path], func),
+                                      name=f"race-{path}-{self.username}")
+            thread.start()
+            self._race_threads.append(thread)
+        
+        winner, finished = None, {}
+        while len(finished) < len(contenders):
+            path, ok, duration, won = results.get()
+            finished[path] = ok
+            self.logger.info(f"race {path} 路径结束: {'成功' if ok else '失败'}，耗时 {duration * 1000:.0f} ms")
+            if won:
+                winner = path
+                break
+            if path == "http" and ok is False:
+                # 认证服务器明确拒绝（如密码错误），浏览器提交同样会被拒绝
+                cancel.set()
+                break
+        
+        if self.http_client is None:
+            self.http_client = contenders["http"].http_client
+        if winner == "http":
+            self.session_ip = contenders["http"].session_ip
+            self.logger.info("race结果: HTTP直接提交胜出，浏览器路径已取消")
+            return True
+        # 浏览器路径胜出或两条路径都失败：接管浏览器及其现场记录
+        if "browser" in finished:
+            self._adopt(contenders["browser"])
+        if winner == "browser":
+            self.logger.info("race结果: 浏览器登录胜出")
+            return True
+        self.logger.error("race结果: 两条路径均未能登录")
+        return False
+    
+    def _contender(self, cancel: threading.Event):
+        """race模式下一条路径使用的实例副本：共享配置、计时和日志，浏览器会话和登录结果各自独立"""
+        contender = copy.copy(self)
+        contender.session = DriverSession(contender._create_driver, self.logger, self.session.governor)
+        contender.driver = None
+        contender.session_ip = None
+        contender._pending_artifact = None
+        contender._auth_verdict = None
+        contender._cancel = cancel
+        contender._race_threads = []
+        return contender
+    
+    def _adopt(self, contender):
+        """接管浏览器路径的浏览器、登录结果和待记录的现场"""
+        if contender.session.driver is not None:
+            self.session.adopt(contender.session.driver)
+            self.driver = self.session.driver
+        self.session_ip = contender.session_ip or self.session_ip
+        self.verification = contender.verification
+        self._pending_artifact = contender._pending_artifact
+    
+    def _cancelled(self):
+        """race模式下另一条路径是否已胜出"""
+        return self._cancel is not None and self._cancel.is_set()
+    
+    def _verified_http_login(self):
+        """
+        HTTP直接提交，并用状态查询确认已在线
+        
+        Returns:
+            True/False: 已确认在线/认证服务器拒绝登录
+            None: HTTP引擎不可用或提交后未确认在线
+        """
+        result = self.http_login()
+        if not result:
+            return result
+        try:
+            if self.get_http_client().is_online():
+                return True
+        except PortalUnavailableError:
+            pass
+        self.logger.warning("HTTP提交后状态查询未确认在线")
+        return None
+    
+    def cached_session(self):
+        """
+        获取仍然可信的本地认证记录：上次登录已验证、距过期还有reauth_margin以上，且本机IP与记录一致
+        
+        Returns:
+            dict: 认证记录，不可信或没有记录时返回None
+        """
+        if self.session_store is None:
+            return None
+        record = self.session_store.get(self.username)
+        last_login, ip = record.get("last_login"), record.get("ip")
+        if not record.get("verified") or not last_login or not ip:
+            return None
+        if time.time() >= last_login + self.session_lifetime - self.reauth_margin:
+            return None
+        if ip != (self.source_address or local_address(self.target_url)):
+            return None
+        return record
+    
+    def remember_session(self):
+        """登录成功后保存认证记录：登录时间、IP、Cookie和验证状态"""
+        self._user_info = None
+        if self.session_store is None:
+            return
+        cookies = []
+        if self.driver is not None:
+            try:
+                if not self.session_ip:
+                    ip_elements = self.driver.find_elements(By.ID, "ipv4")
+                    self.session_ip = ip_elements[0].text.strip() if ip_elements else None
+                cookies = self.driver.get_cookies()
+            except selenium_exceptions.WebDriverException as e:
+                self.logger.warning(f"读取浏览器会话信息失败: {str(e)}")
+        elif self.http_client is not None:
+            cookies = [
+                {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+                for c in self.http_client.session.cookies
+            ]
+        self.session_store.update(
+            self.username,
+            last_login=time.time(),
+            ip=self.session_ip or self.source_address or local_address(self.target_url),
+            cookies=cookies,
+            verified=True,
+        )
+    
+    def forget_session(self):
+        """注销后将本地认证记录标记为无效"""
+        self._user_info = None
+        if self.session_store is not None:
+            self.session_store.update(self.username, verified=False)
+    
+    def _restore_browser_cookies(self, driver):
+        """通过CDP在打开页面前写入上次保存的Cookie"""
+        if self.session_store is None:
+            return
+        cookies = self.session_store.get(self.username).get("cookies")
+        if not cookies:
+            return
+        params = []
+        for cookie in cookies:
+            param = {key: cookie[key] for key in ("name", "value", "domain", "path", "secure", "httpOnly")
+                     if key in cookie}
+            if "expiry" in cookie:
+                param["expires"] = cookie["expiry"]
+            params.append(param)
+        try:
+            driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+        except selenium_exceptions.WebDriverException as e:
+            self.logger.warning(f"恢复Cookie失败: {str(e)}")
+    
+    def _batched_selenium_login(self):
+        """批量模式的浏览器登录，失败时登记对应的现场记录"""
+        outcome = self.scripted_login()
+        if outcome == "success":
+            self.logger.info("=== 登录成功 ===")
+            return self._defer_artifact("login_success", True)
+        if outcome == "unreachable":
+            self.cleanup()
             return False
+        if outcome == "cancelled":
+            return False
+        self.logger.error("=== 登录失败 ===")
+        if outcome == "missing":
+            return self._defer_artifact("element_locate_failed", False, release=True)
+        if outcome == "fill_failed":
+            return self._defer_artifact("credential_fill_failed", False, release=True)
+        return self._defer_artifact("login_failed", False)
+    
+    def get_user_info(self, deep: bool = False, max_age: float = None):
+        """
+        获取当前登录用户信息：IP、账号、在线时长、已用流量和预计过期时间
         
-    def get_user_info(self):
-        """获取当前登录用户信息"""
+        Args:
+            deep (bool): 是否使用浏览器打开认证页面读取，默认先使用rad_user_info接口
+            max_age (float): 可接受的缓存时间（秒），None时使用info_ttl
+            
+        Returns:
+            UserInfo: 用户信息，未登录或无法获取时返回None
+        """
+        max_age = self.info_ttl if max_age is None else max_age
+        cached = self._user_info
+        if cached is not None and cached.age() < max_age and (cached.source == "page" or not deep):
+            print(cached.describe())
+            return cached
+        
+        info = None
+        if not deep:
+            result = self.probe.probe()
+            if result.state is ProbeState.LOGGED_IN and result.data:
+                info = UserInfo.from_status(result.data, self.session_lifetime)
+            elif result.state is ProbeState.LOGGED_OUT:
+                print("⚠️  当前未登录状态")
+                return None
+            else:
+                print("⚠️  快速探测无法获取用户信息，改用浏览器读取")
+        
+        if info is None:
+            info = self._read_user_info_page()
+            if info is None:
+                return None
+        
+        self._user_info = info
+        print(info.describe())
+        return info
+    
+    def _read_user_info_page(self):
+        """打开认证页面，等到IP地址出现后一次取回页面源码并解析全部字段"""
         try:
             # 先初始化WebDriver
             if not self.setup_driver():
@@ -436,58 +1406,126 @@ class GDIPUAutoLogin:
                 print("❌ 无法访问目标网站")
                 return None
             
-           #获取用户的IP地址
-            ip_element = self.driver.find_element(By.ID,"ipv4")
-            ip_address = ip_element.text
-            print(f"当前用户IP地址: {ip_address}")
+            if self.page_state().state is not PageState.LOGGED_IN:
+                print("⚠️  未找到IP地址信息，可能当前未登录")
+                return None
+            info = UserInfo.from_page(self.driver.page_source, self.session_lifetime)
+            if info is None:
+                print("⚠️  未找到IP地址信息，可能当前未登录")
+            return info
                 
         except Exception as e:
             print(f"获取用户信息时发生错误: {str(e)}")
             return None
+        
+        finally:
+            self.cleanup()
     
-    def cleanup(self):
-        """清理资源"""
-        if self.driver:
+    @contextmanager
+    def recording(self, path: str, operation: str = None):
+        """
+        在with块内录制HTTP交互、页面快照和阶段耗时，退出时保存到path
+        
+        Args:
+            path (str): 录制文件，以.gz结尾时gzip压缩
+            operation (str): 录制的操作名称，回放基准测试按此重复同样的操作
+        """
+        recorder = TraceRecorder(account=self.username, target_url=self.target_url, engine=self.engine,
+                                 operation=operation, logger=self.logger)
+        recorder.attach_metrics(self.metrics)
+        if self.http_client is not None:
+            recorder.attach_session(self.http_client.session)
+        if self.driver is not None:
+            recorder.attach_driver(self.driver)
+        self.trace = recorder
+        try:
+            yield recorder
+        finally:
+            self.trace = None
             try:
-                self.driver.quit()
-                self.logger.info("WebDriver已关闭")
-            except:
-                pass
+                recorder.save(path)
+            except OSError as e:
+                self.logger.warning(f"保存操作录制失败: {str(e)}")
+    
+    def _join_race(self, timeout: float = RACE_TEARDOWN_TIMEOUT):
+        """
+        等待race模式中已取消的路径结束（关闭其启动的浏览器）
+        
+        Args:
+            timeout (float): 最长等待时间（秒）
+        """
+        deadline = time.monotonic() + timeout
+        for thread in self._race_threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                self.logger.warning(f"等待race路径 {thread.name} 结束超时，其浏览器可能未关闭")
+        self._race_threads = [thread for thread in self._race_threads if thread.is_alive()]
+    
+    def cleanup(self):
+        """清理资源：浏览器会话被保持时不关闭，以便后续操作复用；等待race模式落败的路径关闭浏览器"""
+        self._join_race()
+        if self.trace is not None and self.driver is not None:
+            # 浏览器关闭前取回尚未读取的网络事件
+            self.trace.drain(self.driver)
+        self.session.release()
+        self.driver = self.session.driver
+        if self.session.last_rss:
+            self.metrics.annotate(browser_rss_bytes=self.session.last_rss)
 
 class Operations:
     """操作类"""
     def __init__(self, login):
         self.login = login
     
-    def execute_login_and_relogin(self):
-        """执行注销再登录操作"""
+    @staticmethod
+    def _print_log_location(action: str, success: bool):
+        """
+        提示日志文件位置，未写日志文件时不提示
+        
+        Args:
+            action (str): 操作名称，如登录、注销
+            success (bool): 操作是否成功
+        """
+        path = log_file_path()
+        if not path:
+            return
+        if success:
+            print(f"{action}日志已保存到: {path}")
+        else:
+            print(f"请查看日志文件 {path} 获取详细错误信息")
+    
+    def execute_logout_and_relogin(self):
+        """执行注销再登录操作，注销、登录和验证共用同一个浏览器会话"""
         try:
-            if not self.login.setup_driver():
-                print("❌ WebDriver初始化失败")
-                return False
-            
-            self.execute_logout()
-            self.execute_login()
-            return True
+            with self.login.session.hold():
+                self.execute_logout()
+                return self.execute_login(force=True)
             
         except Exception as e:
             print(f"执行注销再登录流程时发生错误: {str(e)}")
             return False
-        
+    
+    # 兼容旧的方法名
+    execute_login_and_relogin = execute_logout_and_relogin
 
-    def execute_login(self):
-        """执行登录操作"""
+    def execute_login(self, force: bool = False):
+        """
+        执行登录操作
+        
+        Args:
+            force (bool): 忽略本地认证记录，总是执行登录流程
+        """
         try:
             # 执行登录
-            success = self.login.login()
+            success = self.login.login(force=force)
             
             if success:
                 print("\n✅ 登录成功！")
-                print("登录日志已保存到: gdipu_login.log")
-                print("截图已保存到当前目录")
             else:
                 print("\n❌ 登录失败！")
-                print("请查看日志文件 gdipu_login.log 获取详细错误信息")
+            self._print_log_location("登录", success)
+            if self.login.last_artifact:
+                print(f"现场记录已保存到: {self.login.last_artifact}")
             
             return success
             
@@ -503,6 +1541,17 @@ class Operations:
     def execute_logout(self):
         """执行注销操作"""
         try:
+            # 优先使用HTTP引擎注销，不可用时回退到浏览器
+            if self.login.engine in ("auto", "http", "race"):
+                logout_success = self.login.http_logout()
+                if logout_success is not None or self.login.engine == "http":
+                    if logout_success:
+                        print("✅ 注销成功！")
+                    else:
+                        print("❌ 注销失败或当前未登录！")
+                        self._print_log_location("注销", False)
+                    return bool(logout_success)
+
             # 先初始化WebDriver
             if not self.login.setup_driver():
                 print("❌ WebDriver初始化失败")
@@ -524,12 +1573,11 @@ class Operations:
                 
                 if logout_success:
                     print("✅ 注销成功！")
-                    print("注销日志已保存到: gdipu_login.log")
-                    print("截图已保存到当前目录")
+                    self._print_log_location("注销", True)
                     return True
                 else:
                     print("❌ 注销失败！")
-                    print("请查看日志文件 gdipu_login.log 获取详细错误信息")
+                    self._print_log_location("注销", False)
                     return False
             else:
                 print("⚠️  当前未登录状态，无法执行注销")
@@ -545,8 +1593,39 @@ class Operations:
             # 确保资源被清理
             self.login.cleanup()
 
-    def check_login_status(self):
-        """检查登录状态"""
+    @staticmethod
+    def report_probe(result):
+        """
+        输出快速探测得出的登录状态
+        
+        Args:
+            result (ProbeResult): 快速探测结果
+        
+        Returns:
+            True/False: 已登录/未登录
+            None: 认证服务器无法访问，未输出任何内容
+        """
+        if result.state is ProbeState.LOGGED_IN:
+            print(f"✅ 当前已登录状态（{result.latency * 1000:.0f} ms）")
+            return True
+        if result.state is ProbeState.LOGGED_OUT:
+            print(f"⚠️  当前未登录状态（{result.latency * 1000:.0f} ms）")
+            return False
+        return None
+    
+    def check_login_status(self, deep: bool = False):
+        """
+        检查登录状态
+        
+        Args:
+            deep (bool): 是否使用浏览器打开认证页面检查，默认先使用快速探测
+        """
+        if not deep:
+            online = self.report_probe(self.login.probe.probe())
+            if online is not None:
+                return online
+            print("⚠️  快速探测无法访问认证服务器，改用浏览器检查")
+        
         try:
             # 先初始化WebDriver
             if not self.login.setup_driver():
@@ -569,9 +1648,41 @@ class Operations:
         except Exception as e:
             print(f"检查登录状态时发生错误: {str(e)}")
             return False
+        
+        finally:
+            self.login.cleanup()
+
+def load_setting(name: str, default=None):
+    """
+    读取config.py中的配置项，旧版配置文件缺少该项时使用默认值
+    
+    Args:
+        name (str): 配置项名称
+        default: 默认值
+    """
+    try:
+        import config
+    except ImportError:
+        return default
+    return getattr(config, name, default)
+
+def build_probe():
+    """根据配置文件创建快速探测器"""
+    return PortalProbe(
+        load_setting("PORTAL_URL", DEFAULT_PORTAL_URL),
+        check_url=load_setting("CONNECTIVITY_CHECK_URL", DEFAULT_CHECK_URL),
+        timeout=load_setting("PROBE_TIMEOUT", 0.5),
+        ttl=load_setting("PROBE_CACHE_TTL", 5),
+    )
 
-def main():
-    """主函数"""
+def build_login(engine: str = None, probe: PortalProbe = None):
+    """
+    根据配置文件创建登录实例
+    
+    Args:
+        engine (str): 登录引擎，None时使用配置文件中的设置
+        probe (PortalProbe): 快速探测器（可沿用已有的探测结果缓存），None时按配置文件创建
+    """
     # 从配置文件导入设置
     try:
         from config import USERNAME, PASSWORD, HEADLESS, TIMEOUT
@@ -583,8 +1694,165 @@ def main():
         HEADLESS = False
         TIMEOUT = 30
     
+    setup_logging(
+        level=load_setting("LOG_LEVEL", "INFO"),
+        log_file=load_setting("LOG_FILE", "gdipu_auto_login.log"),
+        fmt=load_setting("LOG_FORMAT", "text"),
+        rotation=load_setting("LOG_ROTATION", "size"),
+        max_bytes=load_setting("LOG_MAX_BYTES", 5 * 1024 * 1024),
+        backup_count=load_setting("LOG_BACKUP_COUNT", 5),
+    )
+    
+    LOGIN_ENGINE = engine or load_setting("LOGIN_ENGINE", "auto")
+    AC_ID = load_setting("AC_ID")
+    STEP_TIMEOUTS = load_setting("STEP_TIMEOUTS", {})
+    
+    login = GDIPUAutoLogin(username=USERNAME, password=PASSWORD, headless=HEADLESS,
+                           engine=LOGIN_ENGINE, ac_id=AC_ID, step_timeouts=STEP_TIMEOUTS,
+                           target_url=load_setting("PORTAL_URL", DEFAULT_PORTAL_URL),
+                           chromedriver_path=load_setting("CHROMEDRIVER_PATH"),
+                           browser=load_setting("BROWSER_BACKEND", "chrome"),
+                           browser_binary=load_setting("BROWSER_BINARY"),
+                           geckodriver_path=load_setting("GECKODRIVER_PATH"),
+                           chrome_profile=load_setting("CHROME_PROFILE", "lean"),
+                           timeout_ceiling=TIMEOUT,
+                           adaptive_timeouts=load_setting("ADAPTIVE_TIMEOUTS", True),
+                           batched_login=load_setting("BATCHED_LOGIN", True),
+                           session_store=SessionStore(load_setting("STATE_FILE", "gdipu_session.json"))
+                           if load_setting("SESSION_CACHE", True) else None,
+                           session_lifetime=load_setting("SESSION_LIFETIME", 12 * 3600),
+                           reauth_margin=load_setting("REAUTH_MARGIN", 600),
+                           user_data_dir=load_setting("CHROME_USER_DATA_DIR"),
+                           verification=load_setting("LOGIN_VERIFICATION", "network"),
+                           info_ttl=load_setting("USER_INFO_TTL", 30))
+    login.metrics = PhaseMetrics(
+        jsonl_path=load_setting("METRICS_FILE", "gdipu_metrics.jsonl"),
+        prometheus_path=load_setting("PROMETHEUS_FILE", "gdipu_auto_login.prom"),
+        account=login.username, logger=login.logger,
+    )
+    login.artifacts = ArtifactCollector(
+        directory=load_setting("ARTIFACT_DIR", "artifacts"),
+        mode=load_setting("ARTIFACT_MODE", "failure"),
+        fmt=load_setting("ARTIFACT_FORMAT", "png"),
+        max_bytes=load_setting("ARTIFACT_MAX_BYTES", 50 * 1024 * 1024),
+        max_age=load_setting("ARTIFACT_MAX_AGE", 7 * 24 * 3600),
+        logger=login.logger,
+    )
+    login.session.governor = MemoryGovernor(
+        budget=load_setting("BROWSER_MEMORY_BUDGET", 400 * 1024 * 1024),
+        idle_timeout=load_setting("BROWSER_IDLE_TIMEOUT", 300),
+        reap_orphans=load_setting("REAP_ORPHAN_BROWSERS", True),
+        logger=login.logger,
+    )
+    login.probe = probe or build_probe()
+    return login
+
+# 命令行退出码
+EXIT_OK = 0            # 操作成功 / 当前已登录
+EXIT_FAILURE = 1       # 操作失败
+EXIT_USAGE = 2         # 参数错误（argparse的约定）
+EXIT_UNREACHABLE = 3   # 认证服务器无法访问
+EXIT_LOGGED_OUT = 4    # status/info：当前未登录
+
+_STATE_EXIT_CODES = {
+    ProbeState.LOGGED_IN: EXIT_OK,
+    ProbeState.LOGGED_OUT: EXIT_LOGGED_OUT,
+    ProbeState.UNREACHABLE: EXIT_UNREACHABLE,
+}
+
+def build_parser():
+    """命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        description="广东轻工网络准入认证自动登录脚本，不带子命令运行时进入交互菜单",
+        epilog=f"退出码: {EXIT_OK}=成功/已登录 {EXIT_FAILURE}=失败 {EXIT_USAGE}=参数错误 "
+               f"{EXIT_UNREACHABLE}=认证服务器无法访问 {EXIT_LOGGED_OUT}=未登录",
+    )
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果（提示信息改为输出到stderr）")
+    parser.add_argument("--engine", choices=LOGIN_ENGINES, help="登录引擎，默认使用config.py中的设置")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="录制本次操作的HTTP交互、页面快照和耗时（.gz结尾时压缩），可用portal_trace.py回放")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    login_parser = subparsers.add_parser("login", help="登录")
+    login_parser.add_argument("--force", action="store_true", help="忽略本地认证记录，总是执行登录流程")
+    subparsers.add_parser("logout", help="注销")
+    subparsers.add_parser("relogin", help="注销再登录")
+    for name, help_text in (("status", "检查登录状态"), ("info", "获取用户信息")):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("--deep", action="store_true", help="使用浏览器打开认证页面检查")
+    subparsers.add_parser("daemon", help="后台保活模式")
+    return parser
+
+def _add_probe_result(result: dict, snapshot, ok: bool):
+    """把快速探测结果和对应的退出码写入status/info的命令结果"""
+    result.update(state=snapshot.state.value, source=snapshot.source,
+                  probe_latency_ms=round(snapshot.latency * 1000, 2))
+    result.setdefault("ip", snapshot.ip)
+    result["exit_code"] = _STATE_EXIT_CODES[snapshot.state] if not ok else EXIT_OK
+
+def run_command(args) -> dict:
+    """
+    执行子命令
+    
+    Returns:
+        dict: 命令结果，其中exit_code为进程退出码
+    """
+    start = time.perf_counter()
+    result = {"command": args.command}
+    probe = build_probe()
+    if args.command == "status" and not args.deep and not args.trace:
+        # 快速探测能得出结论时不创建登录实例，也不初始化日志系统（后台线程、日志文件）
+        snapshot = probe.probe()
+        ok = Operations.report_probe(snapshot)
+        if ok is not None:
+            result["ok"] = ok
+            _add_probe_result(result, snapshot, ok)
+            result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            return result
+    
+    login = build_login(engine=args.engine, probe=probe)
+    operations = Operations(login)
+    
+    # 录制时cleanup()在录制结束前执行，浏览器关闭前取回剩余的网络事件
+    with login.recording(args.trace, operation=args.command) if args.trace else nullcontext():
+        try:
+            if args.command == "login":
+                ok = operations.execute_login(force=args.force)
+            elif args.command == "logout":
+                ok = operations.execute_logout()
+            elif args.command == "relogin":
+                ok = operations.execute_logout_and_relogin()
+            elif args.command == "status":
+                ok = operations.check_login_status(deep=args.deep)
+            elif args.command == "info":
+                info = login.get_user_info(deep=args.deep)
+                ok = info is not None
+                if ok:
+                    result.update(ip=info.ip, info=info.to_dict())
+            else:
+                from keepalive import run_daemon
+                ok = run_daemon(login)
+        finally:
+            login.cleanup()
+    
+    result["ok"] = bool(ok)
+    if args.command in ("status", "info") and not args.deep:
+        # 快速探测的结果已被缓存，这里不会再次发出请求
+        _add_probe_result(result, login.probe.probe(), ok)
+    elif ok:
+        result["exit_code"] = EXIT_OK
+    elif args.command in ("status", "info"):
+        result["exit_code"] = EXIT_LOGGED_OUT
+    else:
+        unreachable = login.probe.probe().state is ProbeState.UNREACHABLE
+        result["exit_code"] = EXIT_UNREACHABLE if unreachable else EXIT_FAILURE
+    
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+def interactive_menu():
+    """交互式菜单"""
     # 创建登录实例
-    login = GDIPUAutoLogin(username=USERNAME, password=PASSWORD, headless=HEADLESS)
+    login = build_login()
     operations = Operations(login)
     
     # 显示操作选择菜单
@@ -597,10 +1865,11 @@ def main():
     print("3. 注销再登录系统")
     print("4. 检查登录状态")
     print("5. 获取用户信息")
+    print("6. 后台保活模式")
     print("="*50)
     
     while True:
-        choice = input("请选择 (1/2/3/4/5): ").strip()
+        choice = input("请选择 (1/2/3/4/5/6): ").strip()
         if choice == "1":
             print("\n🔄 开始执行登录流程...")
             return operations.execute_login()
@@ -616,11 +1885,34 @@ def main():
         elif choice == "5":
             print("\n🔄 获取用户信息...")
             return login.get_user_info()
+        elif choice == "6":
+            print("\n🔄 启动后台保活模式，按 Ctrl+C 退出...")
+            from keepalive import run_daemon
+            return run_daemon(login)
         else:
-            print("❌ 无效选择，请输入 1 或 2 或 3 或 4 或 5")
-
+            print("❌ 无效选择，请输入 1 或 2 或 3 或 4 或 5 或 6")
 
+def main(argv=None):
+    """
+    主函数
+    
+    Returns:
+        int: 进程退出码
+    """
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        return EXIT_OK if interactive_menu() else EXIT_FAILURE
+    
+    if not args.json:
+        return run_command(args)["exit_code"]
+    
+    # JSON模式下操作过程中的提示信息改为输出到stderr，保证stdout只有一行JSON
+    stdout = sys.stdout
+    with redirect_stdout(sys.stderr):
+        result = run_command(args)
+    stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return result["exit_code"]
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+广东轻工网络准入认证后台保活
+在12小时认证过期前主动重新认证；两次重新认证之间只做低成本的在线检查，
+检查失败时才走完整的登录流程（必要时才启动浏览器）；
+订阅网络变化事件，DHCP续租、网卡断开重连导致本机IP变化时在数秒内重新认证
+"""
+
+import time
+import signal
+import threading
+
+from gdipu_auto_login import GDIPUAutoLogin, Operations, build_login, load_setting
+from netwatch import create_watcher, PollingWatcher
+from portal_probe import ProbeState, local_address
+from resilience import Backoff
+from session_store import SessionStore
+
+
+class KeepaliveDaemon:
+    """后台保活守护进程"""
+
+    def __init__(self, login: GDIPUAutoLogin, store: SessionStore = None,
+                 session_lifetime: float = 12 * 3600, reauth_margin: float = 600,
+                 check_interval: float = 60, retry_interval: float = 30,
+                 max_retry_interval: float = 600, watcher=None, settle_time: float = 1.0):
+        """
+        初始化保活守护进程
+
+        Args:
+            login (GDIPUAutoLogin): 登录实例
+            store (SessionStore): 认证状态记录，用于在重启后恢复上次认证时间
+            session_lifetime (float): 认证有效期（秒）
+            reauth_margin (float): 在过期前多久重新认证（秒）
+            check_interval (float): 在线检查间隔（秒）
+            retry_interval (float): 认证失败或服务器不可达时的首次重试间隔（秒），之后按指数退避
+            max_retry_interval (float): 重试间隔上限（秒）
+            watcher: 网络变化监听器（netwatch.create_watcher()），None为只按检查间隔定时检查
+            settle_time (float): 收到网络事件后继续收集后续事件的时间（秒），一次DHCP续租会产生多个事件
+        """
+        self.login = login
+        self.operations = Operations(login)
+        self.store = store or SessionStore()
+        self.session_lifetime = session_lifetime
+        self.reauth_margin = reauth_margin
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.backoff = Backoff(base=retry_interval, cap=max(retry_interval, max_retry_interval))
+        self.watcher = watcher
+        self.settle_time = settle_time
+        self.logger = login.logger
+        self.known_ip = None
+        self._server_login_time = None
+        self._stop_event = threading.Event()
+
+    def last_login_time(self):
+        """最近一次认证的时间戳，取本地记录与认证服务器返回的上线时间中较晚的一个"""
+        times = [t for t in (self._server_login_time, self.store.get(self.login.username).get("last_login")) if t]
+        return max(times) if times else None
+
+    def next_reauth_time(self):
+        """计划的下一次重新认证时间，未知上次认证时间时返回None"""
+        last_login = self.last_login_time()
+        if last_login is None:
+            return None
+        return last_login + self.session_lifetime - self.reauth_margin
+
+    def check_online(self):
+        """
+        低成本在线检查：使用快速探测，不启动浏览器
+
+        Returns:
+            True/False: 已认证/未认证
+            None: 认证服务器无法访问
+        """
+        result = self.login.probe.probe(force=True)
+        if result.state is ProbeState.UNREACHABLE:
+            self.logger.warning("在线检查失败: 认证服务器无法访问")
+            return None
+
+        online = result.state is ProbeState.LOGGED_IN
+        if online and result.ip:
+            self.known_ip = result.ip
+        if online and result.data.get("add_time"):
+            self._server_login_time = float(result.data["add_time"])
+        return online
+
+    def reauthenticate(self, relogin: bool = False) -> bool:
+        """
+        重新认证
+
+        Args:
+            relogin (bool): True时先注销再登录，以刷新即将过期的会话
+
+        Returns:
+            bool: 是否认证成功
+        """
+        if relogin:
+            success = self.operations.execute_logout_and_relogin()
+        else:
+            success = self.operations.execute_login(force=True)
+
+        if success:
+            self._server_login_time = None
+            self.store.update(self.login.username, last_login=time.time(), verified=True)
+            self.logger.info("重新认证成功")
+        else:
+            self.store.update(self.login.username, verified=False)
+            self.logger.error("重新认证失败")
+        return success
+
+    def run_once(self) -> float:
+        """
+        执行一轮检查，必要时重新认证
+
+        Returns:
+            float: 距下一轮检查的秒数
+        """
+        online = self.check_online()
+        due = self.next_reauth_time()
+
+        if online is False:
+            self.logger.warning("检测到当前未认证，立即重新登录")
+            if not self.reauthenticate():
+                return self._retry_delay()
+        elif online is None:
+            # 状态接口不可用时无法判断是否在线，也不注销（认证服务器故障期间注销可能丢掉仍有效的会话），
+            # 退避后重试；只有上次认证时间未知时才走完整登录流程
+            if due is not None:
+                self.logger.warning("无法获取认证状态，暂不重新认证")
+                return self._retry_delay()
+            if not self.reauthenticate():
+                return self._retry_delay()
+        elif due is not None and time.time() >= due:
+            self.logger.info("认证即将过期，提前重新认证")
+            if not self.reauthenticate(relogin=True):
+                return self._retry_delay()
+
+        self.backoff.reset()
+        due = self.next_reauth_time()
+        if due is None:
+            return self.check_interval
+        return max(0.0, min(self.check_interval, due - time.time()))
+
+    def _retry_delay(self) -> float:
+        """连续失败时按带抖动的指数退避拉长重试间隔，避免认证服务器故障期间反复重试"""
+        delay = self.backoff.next_delay()
+        due = self.next_reauth_time()
+        if due is not None and due > time.time():
+            # 退避不能越过计划的重新认证时间
+            delay = min(delay, due - time.time())
+        self.logger.info(f"{delay:.0f} 秒后重试（第 {self.backoff.attempts} 次）")
+        return delay
+
+    def current_ip(self):
+        """本机访问认证服务器时使用的源IP"""
+        return self.login.source_address or local_address(self.login.target_url)
+
+    def binding_changed(self, events: list) -> bool:
+        """
+        判断网络事件是否可能使认证失效：本机IP与认证服务器记录的IP不一致，或网卡重新连接
+
+        Args:
+            events (list): NetworkEvent列表
+        """
+        current = self.current_ip()
+        if current is None:
+            # 网络尚未恢复，等待后续事件
+            self.logger.info(f"网络变化 {events}，暂时没有可用的网络")
+            return False
+        known = self.known_ip or self.store.get(self.login.username).get("ip")
+        if current != known:
+            self.logger.warning(f"本机IP已变化: {known} -> {current}，立即检查认证状态")
+            return True
+        if any(event.kind == "link" and event.action == "new" for event in events):
+            self.logger.info(f"网卡状态变化 {events}，检查认证状态")
+            return True
+        self.logger.debug(f"网络变化 {events}，本机IP未变化（{current}）")
+        return False
+
+    def _watch(self, timeout: float) -> list:
+        """等待网络事件；监听器出错时改为定期检查路由表，保活进程不因此退出"""
+        try:
+            return self.watcher.wait(timeout, self._stop_event)
+        except Exception as e:
+            if isinstance(self.watcher, PollingWatcher):
+                self.logger.error(f"检查网络变化失败: {str(e)}")
+                self._stop_event.wait(timeout)
+                return []
+            self.logger.error(f"网络变化监听失败，改为定期检查路由表: {str(e)}")
+            try:
+                self.watcher.close()
+            except OSError:
+                pass
+            self.watcher = PollingWatcher(self.login.target_url, logger=self.logger)
+            return []
+
+    def _wait(self, delay: float) -> bool:
+        """
+        等待到下一轮检查；有网络监听器时，影响认证的网络变化会提前结束等待
+
+        Returns:
+            bool: 是否因网络变化提前结束
+        """
+        if self.watcher is None:
+            self._stop_event.wait(delay)
+            return False
+        deadline = time.monotonic() + delay
+        while not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            events = self._watch(remaining)
+            if not events:
+                continue
+            # 等待事件平息，DHCP分配地址期间会连续产生多个事件
+            while not self._stop_event.is_set():
+                more = self._watch(self.settle_time)
+                if not more:
+                    break
+                events.extend(more)
+            if self.binding_changed(events):
+                return True
+        return False
+
+    def run(self):
+        """持续运行，直到stop()被调用"""
+        self.logger.info("后台保活模式已启动")
+        # 上次异常退出遗留的浏览器进程会一直占用内存，启动时先清理
+        governor = self.login.session.governor
+        if governor and governor.reap_orphans:
+            governor.reap()
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    delay = self.run_once()
+                except Exception as e:
+                    self.logger.error(f"保活检查异常: {str(e)}")
+                    delay = self._retry_delay()
+
+                due = self.next_reauth_time()
+                if due is not None:
+                    self.logger.debug(
+                        f"下一次计划重新认证时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(due))}"
+                    )
+                if self._wait(delay):
+                    # 网络变化后以在线检查的结果为准，不沿用之前的退避
+                    self.backoff.reset()
+        finally:
+            if self.watcher is not None:
+                self.watcher.close()
+            self.login.cleanup()
+            self.logger.info("后台保活模式已退出")
+
+    def stop(self):
+        """请求退出"""
+        self._stop_event.set()
+
+
+def run_daemon(login: GDIPUAutoLogin = None):
+    """按配置文件创建并运行保活守护进程"""
+    login = login or build_login()
+    watcher = create_watcher(login.target_url, login.logger) if load_setting("NETWORK_WATCH", True) else None
+    daemon = KeepaliveDaemon(
+        login,
+        store=SessionStore(load_setting("STATE_FILE", "gdipu_session.json")),
+        session_lifetime=load_setting("SESSION_LIFETIME", 12 * 3600),
+        reauth_margin=load_setting("REAUTH_MARGIN", 600),
+        check_interval=load_setting("CHECK_INTERVAL", 60),
+        retry_interval=load_setting("RETRY_INTERVAL", 30),
+        max_retry_interval=load_setting("MAX_RETRY_INTERVAL", 600),
+        watcher=watcher,
+    )
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("\n⚠️  用户中断操作")
+        daemon.stop()
+    return True
+
+
+if __name__ == "__main__":
+    run_daemon()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+延迟导入
+selenium、requests等依赖导入耗时较长，而查询状态等命令根本用不到它们；
+用代理对象占位，首次访问属性或调用时才真正导入
+"""
+
+import importlib
+
+
+class LazyImport:
+    """模块或模块属性的延迟导入代理"""
+
+    def __init__(self, module: str, attribute: str = None):
+        """
+        Args:
+            module (str): 模块名
+            attribute (str): 模块中的属性名，None表示代理模块本身
+        """
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def _resolve(self):
+        """导入并缓存目标对象"""
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            if self._attribute:
+                target = getattr(target, self._attribute)
+            self._target = target
+        return self._target
+
+    def __getattr__(self, name):
+        # 只有实例属性之外的名称才会进入这里
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f"{self._module}.{self._attribute}" if self._attribute else self._module
+        return f"<LazyImport {name}{' (loaded)' if self._target is not None else ''}>"
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志系统
+各登录实例只把日志记录放入内存队列，由后台QueueListener线程负责格式化和写文件，
+日志I/O不会阻塞登录流程；日志文件按大小或时间轮转，可选输出JSON Lines格式
+"""
+
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+
+
+# 所有登录实例日志记录器的上级
+LOGGER_NAME = "gdipu_auto_login"
+
+LOG_FORMATS = ("text", "json")
+LOG_ROTATIONS = ("size", "time", "none")
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_lock = threading.Lock()
+_listener = None
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，附带账号、阶段名称和耗时等字段"""
+
+    EXTRA_FIELDS = ("account", "phase", "duration")
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = round(value, 6) if isinstance(value, float) else value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _AccountFilter(logging.Filter):
+    """为实例日志记录器的每条记录标注账号"""
+
+    def __init__(self, account: str):
+        super().__init__()
+        self.account = account
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "account", None) is None:
+            record.account = self.account
+        return True
+
+
+def _create_file_handler(log_file: str, rotation: str, max_bytes: int, backup_count: int, when: str):
+    if rotation == "size":
+        return logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    if rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=when, backupCount=backup_count, encoding="utf-8")
+    return logging.FileHandler(log_file, encoding="utf-8")
+
+
+def setup_logging(level: str = "INFO", log_file: str = "gdipu_auto_login.log", fmt: str = "text",
+                  rotation: str = "size", max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5,
+                  when: str = "midnight", console: bool = True):
+    """
+    配置日志系统，重复调用时以最后一次的配置为准
+
+    Args:
+        level (str): 日志级别
+        log_file (str): 日志文件路径，None为不写文件
+        fmt (str): 日志文件格式，text或json（JSON Lines）；控制台总是使用text格式
+        rotation (str): 轮转方式，size按大小、time按时间、none不轮转
+        max_bytes (int): 按大小轮转时单个文件的上限（字节）
+        backup_count (int): 保留的历史文件数
+        when (str): 按时间轮转时的周期，取值同TimedRotatingFileHandler
+        console (bool): 是否同时输出到控制台
+
+    Returns:
+        logging.Logger: 所有登录实例日志记录器的上级
+    """
+    global _listener
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"不支持的日志格式: {fmt}，可选值: {', '.join(LOG_FORMATS)}")
+    if rotation not in LOG_ROTATIONS:
+        raise ValueError(f"不支持的日志轮转方式: {rotation}，可选值: {', '.join(LOG_ROTATIONS)}")
+
+    handlers = []
+    if log_file:
+        file_handler = _create_file_handler(log_file, rotation, max_bytes, backup_count, when)
+        file_handler.setFormatter(JSONFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+        handlers.append(file_handler)
+    if console:
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.append(console_handler)
+
+    logger = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        if _listener is not None:
+            _stop_listener()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        logger.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+        logger.propagate = False
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    return logger
+
+
+def _stop_listener():
+    """停止后台线程，写完队列中剩余的日志并关闭文件"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def shutdown_logging():
+    """写完队列中剩余的日志并关闭日志文件"""
+    with _lock:
+        _stop_listener()
+
+
+atexit.register(shutdown_logging)
+
+
+def log_file_path() -> str:
+    """
+    当前写入的日志文件路径，程序自行配置了根日志时也从中查找
+
+    Returns:
+        str: 日志文件的绝对路径，没有写日志文件时返回None
+    """
+    with _lock:
+        handlers = list(_listener.handlers) if _listener is not None else []
+    for handler in handlers + logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            return handler.baseFilename
+    return None
+
+
+def get_logger(account: str = None) -> logging.Logger:
+    """
+    获取登录实例的日志记录器，每个账号一个，日志记录中带有account字段
+
+    尚未调用setup_logging()时：若程序已自行配置了根日志（如嵌入其他程序或基准测试），
+    沿用其配置；否则使用默认配置
+
+    Args:
+        account (str): 账号
+
+    Returns:
+        logging.Logger: 日志记录器
+    """
+    base = logging.getLogger(LOGGER_NAME)
+    with _lock:
+        configured = _listener is not None or base.handlers or logging.getLogger().handlers
+    if not configured:
+        setup_logging()
+
+    if not account:
+        return base
+    logger = logging.getLogger(f"{LOGGER_NAME}.{str(account).replace('.', '_')}")
+    if not any(isinstance(f, _AccountFilter) for f in logger.filters):
+        logger.addFilter(_AccountFilter(str(account)))
+    return logger
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+浏览器内存管理
+统计浏览器及其驱动进程树的常驻内存，超出预算时在操作之间重启浏览器；
+清理上次运行异常退出后遗留的chrome/chromedriver进程（仅Linux）
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+
+from procmem import list_processes, descendants, process_tree_rss, format_bytes
+
+
+# 驱动进程名（/proc/<pid>/comm，最长15个字符）
+DRIVER_NAMES = {"chromedriver", "geckodriver"}
+# 浏览器进程名
+BROWSER_NAMES = {"chrome", "chromium", "chromium-browse", "google-chrome", "headless_shell",
+                 "firefox", "firefox-bin"}
+# 本工具启动驱动/浏览器时设置的环境变量（子进程会继承），清理时只认这一标记和cdp后端的临时目录，
+# 不会误伤用户自己打开的浏览器或其他自动化工具启动的进程
+LAUNCH_MARKER = "GDIPU_AUTO_LOGIN_BROWSER"
+CDP_TEMP_PREFIX = "gdipu_cdp_"
+# 孤儿进程会被过继给init或systemd（用户会话中的子进程收割者）
+REAPER_NAMES = {"systemd", "init"}
+
+# 仍在使用中的浏览器/驱动进程pid（由DriverSession登记），清理时连同其子进程一并跳过
+_live_pids = set()
+_live_lock = threading.Lock()
+
+
+def claim(driver):
+    """登记driver的驱动/浏览器进程为使用中，不会被当作遗留进程清理"""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is not None:
+        with _live_lock:
+            _live_pids.add(process.pid)
+
+
+def unclaim(driver):
+    """取消登记"""
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is not None:
+        with _live_lock:
+            _live_pids.discard(process.pid)
+
+
+def launch_environment() -> dict:
+    """启动驱动/浏览器时使用的环境变量（带有本工具的标记）"""
+    return dict(os.environ, **{LAUNCH_MARKER: "1"})
+
+
+def _launched_by_us(pid: int) -> bool:
+    """进程是否由本工具启动"""
+    environ = _read_proc(pid, "environ").split(b"\0")
+    if f"{LAUNCH_MARKER}=1".encode() in environ:
+        return True
+    return CDP_TEMP_PREFIX.encode() in _read_proc(pid, "cmdline")
+
+
+def _ancestors(pid: int, processes: dict) -> list:
+    """pid的祖先进程链（不含pid本身）"""
+    chain, seen = [], {pid}
+    parent = processes.get(pid)
+    while parent and parent not in seen:
+        chain.append(parent)
+        seen.add(parent)
+        parent = processes.get(parent)
+    return chain
+
+
+def _read_proc(pid: int, name: str) -> bytes:
+    try:
+        with open(f"/proc/{pid}/{name}", "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+def _owned_by_me(pid: int) -> bool:
+    try:
+        return os.stat(f"/proc/{pid}").st_uid == os.getuid()
+    except (OSError, AttributeError):
+        return False
+
+
+class MemoryGovernor:
+    """浏览器内存管理器"""
+
+    def __init__(self, budget: int = 400 * 1024 * 1024, idle_timeout: float = 300,
+                 reap_orphans: bool = True, logger=None):
+        """
+        Args:
+            budget (int): 浏览器进程树内存上限（字节），超出时在操作结束后重启浏览器，None为不限制
+            idle_timeout (float): 被保持的浏览器空闲超过该时间（秒）后关闭，None为不关闭
+            reap_orphans (bool): 启动浏览器前是否清理遗留的孤儿浏览器进程
+            logger: 日志记录器
+        """
+        self.budget = budget
+        self.idle_timeout = idle_timeout
+        self.reap_orphans = reap_orphans
+        self.logger = logger or logging.getLogger(__name__)
+        self.peak_rss = 0
+
+    def measure(self, driver) -> int:
+        """
+        统计浏览器及其驱动进程树的常驻内存
+
+        Args:
+            driver: WebDriver或CDPDriver
+
+        Returns:
+            int: 内存（字节），无法统计时返回0
+        """
+        process = getattr(getattr(driver, "service", None), "process", None)
+        if process is None:
+            return 0
+        rss = process_tree_rss(process.pid)
+        self.peak_rss = max(self.peak_rss, rss)
+        return rss
+
+    def over_budget(self, rss: int) -> bool:
+        """内存是否超出预算"""
+        return bool(self.budget) and rss > self.budget
+
+    def describe(self, rss: int) -> str:
+        """可读的内存描述"""
+        if self.budget:
+            return f"{format_bytes(rss)}（预算 {format_bytes(self.budget)}）"
+        return format_bytes(rss)
+
+    @staticmethod
+    def find_orphans(processes: dict = None) -> list:
+        """
+        查找本工具遗留的孤儿驱动和浏览器进程（带有启动标记），跳过本进程的子孙和仍在使用中的浏览器
+
+        Args:
+            processes (dict): list_processes()的结果，None时重新读取
+
+        Returns:
+            list: 孤儿进程树的根进程pid
+        """
+        processes = processes if processes is not None else list_processes()
+        with _live_lock:
+            protected = set(_live_pids)
+        # 本进程启动的浏览器都是本进程的子孙；本进程为PID 1（容器中）时它们的父进程也是1，不能据此判断
+        protected.add(os.getpid())
+        orphans = []
+        for pid, ppid in processes.items():
+            if ppid != 1 and _read_proc(ppid, "comm").strip().decode(errors="replace") not in REAPER_NAMES:
+                continue
+            if pid in protected or protected.intersection(_ancestors(pid, processes)):
+                continue
+            name = _read_proc(pid, "comm").strip().decode(errors="replace")
+            if name not in DRIVER_NAMES and name not in BROWSER_NAMES:
+                continue
+            if _owned_by_me(pid) and _launched_by_us(pid):
+                orphans.append(pid)
+        return orphans
+
+    def reap(self, grace: float = 2.0) -> int:
+        """
+        结束遗留的孤儿驱动和浏览器进程（连同其子进程），先发送SIGTERM，超时后SIGKILL
+
+        Args:
+            grace (float): 等待进程自行退出的时间（秒）
+
+        Returns:
+            int: 结束的进程数
+        """
+        processes = list_processes()
+        roots = self.find_orphans(processes)
+        if not roots:
+            return 0
+
+        targets = set()
+        freed = 0
+        for root in roots:
+            freed += process_tree_rss(root)
+            targets.add(root)
+            targets.update(descendants(root, processes))
+        for pid in targets:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+        deadline = time.monotonic() + grace
+        while time.monotonic() < deadline:
+            targets = {pid for pid in targets if os.path.exists(f"/proc/{pid}")}
+            if not targets:
+                break
+            time.sleep(0.1)
+        for pid in targets:
+            try:
+                os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            except OSError:
+                pass
+
+        self.logger.warning(f"已清理 {len(roots)} 组遗留的浏览器进程（pid {', '.join(map(str, roots))}），"
+                            f"释放约 {format_bytes(freed)}")
+        return len(roots)
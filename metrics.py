@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登录流程分阶段计时
+记录每个阶段的耗时、WebDriver往返次数和结果，写入JSON Lines文件，
+并导出为Prometheus textfile collector可读取的文本格式；
+写盘和导出放到后台线程，登录流程中只把记录放入队列
+"""
+
+import os
+import copy
+import json
+import math
+import time
+import queue
+import atexit
+import logging
+import functools
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+# 导出Prometheus指标时统计的最近记录条数
+DEFAULT_WINDOW = 1000
+
+
+def percentile(values, q: float) -> float:
+    """
+    计算百分位数（最近秩法）
+
+    Args:
+        values: 数值序列
+        q (float): 0~1之间的分位点
+
+    Returns:
+        float: 分位数，序列为空时返回0
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _tail_lines(path: str, limit: int) -> list:
+    """从文件末尾读取最多limit行"""
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            data = b""
+            while position > 0 and data.count(b"\n") <= limit:
+                step = min(65536, position)
+                position -= step
+                f.seek(position)
+                data = f.read(step) + data
+    except OSError:
+        return []
+    return data.decode("utf-8", "replace").splitlines()[-limit:]
+
+
+class _MetricsWriter:
+    """
+    一组输出文件的后台写入线程和最近记录窗口，同一组文件在进程内只有一个，
+    多个记录器（多账号、race模式的两条路径、后台服务与命令行）写入同一文件时共用，导出的指标包含全部记录
+    """
+
+    def __init__(self, jsonl_path: str, prometheus_path: str, window: int, logger):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.window = window
+        self.logger = logger
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._recent = None
+
+    def put(self, entry):
+        """放入一条记录，首次记录时启动后台线程"""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+                self._worker.start()
+                # 单次运行的命令行进程退出前把队列中的记录写完
+                atexit.register(self.flush, 5)
+        self._queue.put(entry)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # 一次取完已排队的记录，合并成一次追加写入和一次导出
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.logger.warning(f"写入计时记录失败: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: list):
+        """追加写入一批记录，批中有最外层阶段结束时导出一次Prometheus指标"""
+        entries = [entry for entry in batch if entry is not None]
+        recent = self.recent_records()
+        with self._lock:
+            recent.extend(entries)
+        if entries and self.jsonl_path:
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries))
+        if len(entries) < len(batch):
+            self.export_prometheus()
+
+    def recent_records(self) -> deque:
+        """最近window条计时记录，首次调用时从JSON Lines文件末尾读取，之后在内存中维护"""
+        with self._lock:
+            if self._recent is None:
+                self._recent = deque(maxlen=self.window)
+                lines = _tail_lines(self.jsonl_path, self.window) if self.jsonl_path else []
+                for line in lines:
+                    try:
+                        self._recent.append(json.loads(line))
+                    except ValueError:
+                        continue
+            return self._recent
+
+    def render_prometheus(self) -> str:
+        """将最近的计时记录渲染为Prometheus文本格式"""
+        durations = defaultdict(list)
+        round_trips = defaultdict(int)
+        outcomes = defaultdict(int)
+        recent = self.recent_records()
+        with self._lock:
+            entries = list(recent)
+        for entry in entries:
+            phase = entry.get("phase")
+            if not phase:
+                continue
+            durations[phase].append(float(entry.get("duration", 0)))
+            round_trips[phase] += int(entry.get("round_trips", 0))
+            outcomes[(phase, entry.get("outcome", "unknown"))] += 1
+
+        lines = [
+            "# HELP gdipu_phase_duration_seconds Wall time of each login phase over the most recent records.",
+            "# TYPE gdipu_phase_duration_seconds summary",
+        ]
+        for phase, values in sorted(durations.items()):
+            for q in (0.5, 0.95):
+                lines.append(f'gdipu_phase_duration_seconds{{phase="{phase}",quantile="{q}"}} {percentile(values, q):.6f}')
+            lines.append(f'gdipu_phase_duration_seconds_sum{{phase="{phase}"}} {sum(values):.6f}')
+            lines.append(f'gdipu_phase_duration_seconds_count{{phase="{phase}"}} {len(values)}')
+
+        lines += [
+            "# HELP gdipu_phase_webdriver_round_trips WebDriver commands issued per phase over the most recent records.",
+            "# TYPE gdipu_phase_webdriver_round_trips gauge",
+        ]
+        for phase, total in sorted(round_trips.items()):
+            lines.append(f'gdipu_phase_webdriver_round_trips{{phase="{phase}"}} {total}')
+
+        lines += [
+            "# HELP gdipu_phase_outcomes Phase outcomes over the most recent records.",
+            "# TYPE gdipu_phase_outcomes gauge",
+        ]
+        for (phase, outcome), count in sorted(outcomes.items()):
+            lines.append(f'gdipu_phase_outcomes{{phase="{phase}",outcome="{outcome}"}} {count}')
+
+        lines += [
+            "# HELP gdipu_metrics_last_update_timestamp_seconds Time the metrics file was last written.",
+            "# TYPE gdipu_metrics_last_update_timestamp_seconds gauge",
+            f"gdipu_metrics_last_update_timestamp_seconds {time.time():.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export_prometheus(self):
+        """写入Prometheus文本文件（先写临时文件再替换，避免采集到写了一半的文件）"""
+        if not self.prometheus_path:
+            return
+        try:
+            # 同一进程内可能有多个记录器（批量登录）导出到同一文件，临时文件按线程区分
+            tmp_path = f"{self.prometheus_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp_path, self.prometheus_path)
+        except OSError as e:
+            self.logger.warning(f"导出Prometheus指标失败: {str(e)}")
+
+    def flush(self, timeout: float = None) -> bool:
+        """等待队列中的记录全部写完，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def _writer_for(jsonl_path: str, prometheus_path: str, window: int, logger):
+    """按输出文件取得进程内共用的写入线程，两个文件都不输出时返回None"""
+    if not jsonl_path and not prometheus_path:
+        return None
+    key = tuple(os.path.abspath(path) if path else None for path in (jsonl_path, prometheus_path))
+    with _writers_lock:
+        if key not in _writers:
+            _writers[key] = _MetricsWriter(jsonl_path, prometheus_path, window, logger)
+        return _writers[key]
+
+
+class PhaseRecord:
+    """单个阶段的计时结果"""
+
+    def __init__(self, phase: str):
+        self.phase = phase
+        self.outcome = "success"
+        self.duration = 0.0
+        self.round_trips = 0
+        self.extra = {}
+
+
+class PhaseMetrics:
+    """分阶段计时记录器"""
+
+    def __init__(self, jsonl_path: str = "gdipu_metrics.jsonl",
+                 prometheus_path: str = "gdipu_auto_login.prom",
+                 account: str = None, window: int = DEFAULT_WINDOW, logger=None):
+        """
+        初始化计时记录器
+
+        Args:
+            jsonl_path (str): JSON Lines输出文件，None表示不写入
+            prometheus_path (str): Prometheus文本输出文件，None表示不导出
+            account (str): 记录中附带的账号
+            window (int): 导出Prometheus指标时统计的最近记录条数（同一输出文件以最先创建的记录器为准）
+            logger: 日志记录器
+        """
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.account = account
+        self.window = window
+        self.logger = logger or logging.getLogger(__name__)
+        self._local = threading.local()
+        self._writer = _writer_for(jsonl_path, prometheus_path, window, self.logger)
+
+    def for_account(self, account: str):
+        """
+        附带指定账号的记录器视图，与本记录器共用输出文件和最近记录窗口（多账号并发时使用）
+
+        Args:
+            account (str): 账号
+        """
+        view = copy.copy(self)
+        view.account = account
+        return view
+
+    @property
+    def round_trips(self) -> int:
+        """当前线程累计发出的WebDriver命令数"""
+        return getattr(self._local, "round_trips", 0)
+
+    def count_round_trips(self, driver):
+        """包装driver.execute，统计发往WebDriver的命令数（每条命令即一次HTTP往返）"""
+        execute = driver.execute
+
+        @functools.wraps(execute)
+        def counted_execute(*args, **kwargs):
+            self._local.round_trips = self.round_trips + 1
+            return execute(*args, **kwargs)
+
+        driver.execute = counted_execute
+        return driver
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        统计with块的耗时与WebDriver往返次数，块内抛出异常时结果记为exception
+
+        Args:
+            name (str): 阶段名称
+        """
+        record = PhaseRecord(name)
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        if depth == 0:
+            self._local.root = record
+        round_trips = self.round_trips
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record.outcome = "exception"
+            raise
+        finally:
+            record.duration = time.perf_counter() - start
+            record.round_trips = self.round_trips - round_trips
+            self._local.depth = depth
+            self.record(record)
+            if depth == 0:
+                self._local.root = None
+                self._submit(None)
+
+    def annotate(self, **fields):
+        """为当前线程正在计时的最外层阶段附加字段（写入JSON Lines记录），不在任何阶段内时忽略"""
+        root = getattr(self._local, "root", None)
+        if root is not None:
+            root.extra.update(fields)
+
+    def record(self, record: PhaseRecord):
+        """记录一个阶段的结果"""
+        self.logger.debug(
+            f"阶段 {record.phase} 耗时 {record.duration * 1000:.0f} ms，"
+            f"WebDriver往返 {record.round_trips} 次，结果: {record.outcome}",
+            extra={"phase": record.phase, "duration": record.duration},
+        )
+        entry = {
+            "ts": round(time.time(), 3),
+            "phase": record.phase,
+            "duration": round(record.duration, 6),
+            "round_trips": record.round_trips,
+            "outcome": record.outcome,
+        }
+        if self.account:
+            entry["account"] = self.account
+        entry.update(record.extra)
+        self._submit(entry)
+
+    def _submit(self, entry):
+        """把一条记录（None表示一个最外层阶段结束，需要导出）交给输出文件的后台写入线程"""
+        if self._writer is not None:
+            self._writer.put(entry)
+
+    def recent_records(self) -> deque:
+        """最近window条计时记录（同一输出文件的所有记录器共用）"""
+        return self._writer.recent_records() if self._writer is not None else deque()
+
+    def render_prometheus(self) -> str:
+        """将最近的计时记录渲染为Prometheus文本格式"""
+        return self._writer.render_prometheus() if self._writer is not None else ""
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待队列中的记录全部写完
+
+        Args:
+            timeout (float): 最长等待时间（秒），None为一直等待
+
+        Returns:
+            bool: 是否已全部写完
+        """
+        return self._writer.flush(timeout) if self._writer is not None else True
+
+
+def instrumented(phase: str, outcomes: tuple = ("success", "failure")):
+    """
+    为GDIPUAutoLogin的方法计时的装饰器，实例没有metrics属性时不做任何事
+
+    Args:
+        phase (str): 阶段名称
+        outcomes (tuple): 方法返回真值/假值时分别记录的结果，None时直接记录返回值
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            metrics = getattr(self, "metrics", None)
+            if metrics is None:
+                return func(self, *args, **kwargs)
+            with metrics.phase(phase) as record:
+                result = func(self, *args, **kwargs)
+                if outcomes is None:
+                    record.outcome = str(result)
+                else:
+                    record.outcome = outcomes[0] if result else outcomes[1]
+                return result
+        return wrapper
+    return decorator
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟认证服务器
+提供与 http://10.0.5.112/ 相同的页面元素约定（#username、#password、#login-account、#logout、
+#ipv4、.dialog.confirm.active、.btn-confirm 以及"您确定要注销吗？"对话框）和HTTP接口，
+支持响应延迟、故障注入和会话过期模拟，用于离线测试与基准测试
+
+用法:
+    python mock_portal.py --port 8080 --latency 0.05 --error-rate 0.1 --session-lifetime 60
+"""
+
+import time
+import json
+import random
+import secrets
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from portal_http import hmac_md5, encode_user_info, login_checksum
+
+
+_STYLE = """
+@font-face { font-family: portal; src: url("/static/portal.woff"); }
+body { font-family: portal, sans-serif; }
+.dialog { display: none; position: fixed; top: 30%; left: 30%; padding: 20px; background: #fff; border: 1px solid #999; }
+.dialog.active { display: block; }
+.error { color: #c00; }
+"""
+
+# 1x1透明PNG
+_PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000100e221bc330000000049454e44ae426082"
+)
+
+_LOGIN_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>广东轻工网络准入认证</title>
+<link rel="stylesheet" href="/static/style.css">
+</head>
+<body>
+<input type="hidden" id="ac_id" value="{ac_id}">
+<div class="login-form">
+  <input id="username" type="text" placeholder="账号">
+  <input id="password" type="password" placeholder="密码">
+  <button id="login-account">登录</button>
+  <div class="error" id="login-error"></div>
+</div>
+<img src="/static/banner.png" alt="">
+<div class="dialog confirm" id="network-dialog">
+  <div class="section">网络连接错误，请检查网络后重试</div>
+  <button class="btn-confirm">确认</button>
+</div>
+<script>
+(function () {{
+  var dialog = document.getElementById("network-dialog");
+  if ({network_error_dialog}) {{
+    setTimeout(function () {{ dialog.classList.add("active"); }}, {dialog_delay_ms});
+  }}
+  dialog.querySelector(".btn-confirm").addEventListener("click", function () {{
+    dialog.classList.remove("active");
+  }});
+  document.getElementById("login-account").addEventListener("click", function () {{
+    var query = "action=login&plain=1&ac_id={ac_id}"
+      + "&username=" + encodeURIComponent(document.getElementById("username").value)
+      + "&password=" + encodeURIComponent(document.getElementById("password").value);
+    fetch("/cgi-bin/srun_portal?" + query)
+      .then(function (response) {{ return response.json(); }})
+      .then(function (data) {{
+        if (data.error === "ok") {{
+          location.href = "/";
+        }} else {{
+          document.getElementById("login-error").textContent = data.error_msg || data.error;
+        }}
+      }})
+      .catch(function () {{
+        document.getElementById("login-error").textContent = "网络错误";
+      }});
+  }});
+}})();
+</script>
+</body>
+</html>
+"""
+
+_SUCCESS_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>广东轻工网络准入认证</title>
+<link rel="stylesheet" href="/static/style.css">
+</head>
+<body>
+<div class="user-info">
+  <span id="user-account">{username}</span>
+  <span id="ipv4">{ip}</span>
+  <span id="used-flow">{used_flow}</span>
+  <span id="used-time">{used_time}</span>
+</div>
+<button id="logout">注销</button>
+<img src="/static/banner.png" alt="">
+<div class="dialog confirm" id="logout-dialog">
+  <div class="section">您确定要注销吗？</div>
+  <button class="btn-confirm">确定</button>
+  <button class="btn-cancel">取消</button>
+</div>
+<script>
+(function () {{
+  var dialog = document.getElementById("logout-dialog");
+  document.getElementById("logout").addEventListener("click", function () {{
+    dialog.classList.add("active");
+  }});
+  dialog.querySelector(".btn-cancel").addEventListener("click", function () {{
+    dialog.classList.remove("active");
+  }});
+  dialog.querySelector(".btn-confirm").addEventListener("click", function () {{
+    dialog.classList.remove("active");
+    fetch("/cgi-bin/srun_portal?action=logout&ac_id={ac_id}&username={username}")
+      .then(function () {{ location.href = "/"; }});
+  }});
+}})();
+</script>
+</body>
+</html>
+"""
+
+
+class MockPortal:
+    """模拟认证服务器的状态与行为"""
+
+    def __init__(self, accounts: dict, ac_id: str = "1", latency: float = 0.0,
+                 error_rate: float = 0.0, session_lifetime: float = None,
+                 network_error_dialog: bool = False, dialog_delay: float = 0.2,
+                 asset_delay: float = 0.0):
+        """
+        Args:
+            accounts (dict): 可登录的账号 {用户名: 密码}
+            ac_id (str): 认证区域ID
+            latency (float): 每个响应额外增加的延迟（秒）
+            error_rate (float): 接口请求返回503的概率（0~1）
+            session_lifetime (float): 认证有效期（秒），None为不过期
+            network_error_dialog (bool): 登录页是否弹出网络连接错误对话框
+            dialog_delay (float): 页面加载后多久弹出该对话框（秒）
+            asset_delay (float): 图片、字体等静态资源的额外延迟（秒），模拟迟迟加载不完的资源
+        """
+        self.accounts = dict(accounts)
+        self.ac_id = str(ac_id)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.session_lifetime = session_lifetime
+        self.network_error_dialog = network_error_dialog
+        self.dialog_delay = dialog_delay
+        self.asset_delay = asset_delay
+        self.down = False
+        self.online = {}
+        self.challenges = {}
+        self.request_counts = {}
+        self._lock = threading.Lock()
+
+    def _session(self, ip: str):
+        """返回IP对应的在线会话，已过期的会话会被移除"""
+        session = self.online.get(ip)
+        if session and self.session_lifetime is not None \
+                and time.time() - session["add_time"] >= self.session_lifetime:
+            del self.online[ip]
+            return None
+        return session
+
+    def expire(self, ip: str = None):
+        """立即让指定IP（默认全部）的会话过期"""
+        with self._lock:
+            if ip is None:
+                self.online.clear()
+            else:
+                self.online.pop(ip, None)
+
+    def is_online(self, ip: str) -> bool:
+        with self._lock:
+            return self._session(ip) is not None
+
+    def status(self, ip: str) -> dict:
+        """rad_user_info接口"""
+        with self._lock:
+            session = self._session(ip)
+        if session is None:
+            return {"error": "not_online_error", "client_ip": ip, "online_ip": ip}
+        now = time.time()
+        return {
+            "error": "ok",
+            "user_name": session["username"],
+            "online_ip": ip,
+            "client_ip": ip,
+            "add_time": int(session["add_time"]),
+            "keepalive_time": int(now),
+            "sum_seconds": int(now - session["add_time"]),
+            "sum_bytes": session["bytes"],
+        }
+
+    def challenge(self, ip: str, username: str) -> dict:
+        """get_challenge接口"""
+        token = secrets.token_hex(32)
+        with self._lock:
+            self.challenges[(ip, username)] = token
+        return {"error": "ok", "res": "ok", "challenge": token, "client_ip": ip, "online_ip": ip}
+
+    def _check_encoded_login(self, ip: str, params: dict) -> str:
+        """按页面脚本的加密规则校验登录参数，校验通过返回None，否则返回错误信息"""
+        username = params.get("username", "")
+        with self._lock:
+            token = self.challenges.pop((ip, username), None)
+        if token is None:
+            return "challenge_expire_error"
+        password = self.accounts[username]
+        hmd5 = hmac_md5(password, token)
+        if params.get("password") != "{MD5}" + hmd5:
+            return "E2553: Password is error."
+        info = encode_user_info(username, password, params.get("ip", ""), self.ac_id, token)
+        if params.get("info") != info:
+            return "E2901: info error"
+        expected = login_checksum(token, username, hmd5, self.ac_id, params.get("ip", ""),
+                                  params.get("n", ""), params.get("type", ""), info)
+        if params.get("chksum") != expected:
+            return "E2901: chksum error"
+        return None
+
+    def portal_action(self, ip: str, params: dict) -> dict:
+        """srun_portal接口（登录/注销）"""
+        action = params.get("action")
+        username = params.get("username", "")
+
+        if action == "logout":
+            with self._lock:
+                self.online.pop(ip, None)
+            return {"error": "ok", "res": "ok", "suc_msg": "logout_ok", "online_ip": ip}
+
+        if action != "login":
+            return {"error": "unknown_action", "error_msg": f"unknown action: {action}"}
+        if username not in self.accounts:
+            return {"error": "login_error", "error_msg": "E2531: User not found."}
+        if params.get("ac_id") != self.ac_id:
+            return {"error": "login_error", "error_msg": "E2606: ac_id error."}
+
+        if params.get("plain"):
+            if params.get("password") != self.accounts[username]:
+                return {"error": "login_error", "error_msg": "E2553: Password is error."}
+        else:
+            message = self._check_encoded_login(ip, params)
+            if message:
+                return {"error": "login_error", "error_msg": message}
+
+        with self._lock:
+            self.online[ip] = {"username": username, "add_time": time.time(), "bytes": random.randint(0, 1 << 30)}
+        return {"error": "ok", "res": "ok", "suc_msg": "login_ok", "online_ip": ip}
+
+    def render_page(self, ip: str) -> str:
+        """认证首页：已登录显示在线信息页，未登录显示登录表单"""
+        status = self.status(ip)
+        if status["error"] == "ok":
+            return _SUCCESS_PAGE.format(
+                username=status["user_name"], ip=ip, ac_id=self.ac_id,
+                used_flow=f"{status['sum_bytes'] / (1 << 20):.2f} MB",
+                used_time=f"{status['sum_seconds']} 秒",
+            )
+        return _LOGIN_PAGE.format(
+            ac_id=self.ac_id,
+            network_error_dialog="true" if self.network_error_dialog else "false",
+            dialog_delay_ms=int(self.dialog_delay * 1000),
+        )
+
+    def count(self, path: str):
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """模拟认证服务器的请求处理"""
+
+    protocol_version = "HTTP/1.1"
+    # 响应头与响应体分两次写出，不关闭Nagle算法会与客户端的延迟确认叠加出约40ms的等待
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8",
+              headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data: dict, params: dict):
+        payload = json.dumps(data, ensure_ascii=False)
+        callback = params.get("callback")
+        if callback:
+            payload = f"{callback}({payload})"
+        self._send(200, payload.encode("utf-8"), "text/javascript; charset=utf-8")
+
+    def do_GET(self):
+        portal = self.server.portal
+        parsed = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        ip = self.client_address[0]
+        portal.count(parsed.path)
+
+        if portal.latency:
+            time.sleep(portal.latency)
+
+        if parsed.path.startswith("/static/"):
+            if portal.asset_delay:
+                time.sleep(portal.asset_delay)
+            if parsed.path.endswith(".css"):
+                return self._send(200, _STYLE.encode("utf-8"), "text/css")
+            if parsed.path.endswith(".png"):
+                return self._send(200, _PIXEL_PNG, "image/png")
+            return self._send(200, b"\0" * 1024, "font/woff")
+
+        if portal.down or (parsed.path.startswith("/cgi-bin/") and random.random() < portal.error_rate):
+            return self._send(503, b"Service Unavailable", "text/plain")
+
+        if parsed.path in ("/", "/index.html", "/srun_portal_pc"):
+            return self._send(200, portal.render_page(ip).encode("utf-8"))
+        if parsed.path == "/generate_204":
+            if portal.is_online(ip):
+                return self._send(204)
+            return self._send(302, headers={"Location": f"http://{self.headers.get('Host', '')}/"})
+        if parsed.path == "/cgi-bin/rad_user_info":
+            return self._send_json(portal.status(ip), params)
+        if parsed.path == "/cgi-bin/get_challenge":
+            return self._send_json(portal.challenge(ip, params.get("username", "")), params)
+        if parsed.path == "/cgi-bin/srun_portal":
+            return self._send_json(portal.portal_action(ip, params), params)
+        return self._send(404, b"Not Found", "text/plain")
+
+
+class MockPortalServer:
+    """在后台线程中运行的模拟认证服务器"""
+
+    def __init__(self, portal: MockPortal, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            portal (MockPortal): 模拟认证服务器状态
+            host (str): 监听地址
+            port (int): 监听端口，0为自动分配
+        """
+        self.portal = portal
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.portal = portal
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟认证服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--username", default="test")
+    parser.add_argument("--password", default="test")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个响应额外增加的延迟（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="接口请求返回503的概率")
+    parser.add_argument("--session-lifetime", type=float, default=None, help="认证有效期（秒）")
+    parser.add_argument("--network-error-dialog", action="store_true", help="登录页弹出网络连接错误对话框")
+    parser.add_argument("--asset-delay", type=float, default=0.0, help="静态资源额外延迟（秒）")
+    args = parser.parse_args()
+
+    portal = MockPortal(
+        {args.username: args.password}, latency=args.latency, error_rate=args.error_rate,
+        session_lifetime=args.session_lifetime, network_error_dialog=args.network_error_dialog,
+        asset_delay=args.asset_delay,
+    )
+    server = MockPortalServer(portal, args.host, args.port)
+    print(f"模拟认证服务器已启动: {server.url}（账号 {args.username} / 密码 {args.password}）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多账号并发认证
+按config.py中的ACCOUNTS列表为多个账号并发登录，每个账号可绑定各自的源地址或网卡，
+并发数受MAX_CONCURRENCY限制，输出每个账号的结果和整体吞吐量
+
+用法:
+    python multi_account.py --concurrency 8 --json result.json
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from gdipu_auto_login import GDIPUAutoLogin, DEFAULT_PORTAL_URL, LOGIN_ENGINES, load_setting
+from metrics import PhaseMetrics, percentile
+
+
+class AccountResult:
+    """单个账号的认证结果"""
+
+    def __init__(self, username: str, success: bool, duration: float, engine: str, error: str = None):
+        self.username = username
+        self.success = success
+        self.duration = duration
+        self.engine = engine
+        self.error = error
+
+    def to_dict(self) -> dict:
+        return {
+            "username": self.username,
+            "success": self.success,
+            "duration": round(self.duration, 4),
+            "engine": self.engine,
+            "error": self.error,
+        }
+
+
+class MultiAccountLogin:
+    """多账号并发认证"""
+
+    def __init__(self, accounts: list, max_concurrency: int = 4, engine: str = "http",
+                 target_url: str = DEFAULT_PORTAL_URL, headless: bool = True, metrics: PhaseMetrics = None):
+        """
+        Args:
+            accounts (list): 账号列表，每项为包含username、password，
+                             可选source_address、interface、ac_id的字典
+            max_concurrency (int): 最大并发数
+            engine (str): 登录引擎；绑定了源地址或网卡的账号总是使用http引擎，
+                          因为浏览器无法按实例绑定出口，回退到浏览器会用默认出口登录错误的IP
+            target_url (str): 认证页面地址
+            headless (bool): 使用浏览器时是否无头模式
+            metrics (PhaseMetrics): 各账号共用的计时记录器（导出的指标包含全部账号），None时使用默认设置
+        """
+        self.accounts = accounts
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.engine = engine
+        self.target_url = target_url
+        self.headless = headless
+        self.metrics = metrics or PhaseMetrics()
+        # 浏览器较占资源，即使并发数设得较大，也限制同时运行的浏览器数量；
+        # 名额只在回退到浏览器登录时占用，HTTP登录成功的账号不受限制
+        self._browser_slots = threading.BoundedSemaphore(min(self.max_concurrency, 2))
+
+    def _login_one(self, account: dict) -> AccountResult:
+        """登录单个账号"""
+        username = account["username"]
+        bound = bool(account.get("source_address") or account.get("interface"))
+        engine = "http" if bound else account.get("engine", self.engine)
+
+        login = GDIPUAutoLogin(
+            username, account["password"], headless=self.headless, engine=engine,
+            ac_id=account.get("ac_id"), target_url=self.target_url,
+            source_address=account.get("source_address"), interface=account.get("interface"),
+            browser_slots=self._browser_slots, metrics=self.metrics.for_account(username),
+        )
+        start = time.perf_counter()
+        try:
+            success = login.login()
+            return AccountResult(username, bool(success), time.perf_counter() - start, engine)
+        except Exception as e:
+            return AccountResult(username, False, time.perf_counter() - start, engine, str(e))
+        finally:
+            login.cleanup()
+
+    def run(self) -> dict:
+        """
+        并发登录全部账号
+
+        Returns:
+            dict: 每个账号的结果与整体统计
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="account") as pool:
+            results = list(pool.map(self._login_one, self.accounts))
+        wall_time = time.perf_counter() - start
+
+        durations = [r.duration for r in results]
+        return {
+            "accounts": [r.to_dict() for r in results],
+            "total": len(results),
+            "succeeded": sum(r.success for r in results),
+            "concurrency": self.max_concurrency,
+            "wall_time": round(wall_time, 4),
+            "serial_time": round(sum(durations), 4),
+            "speedup": round(sum(durations) / wall_time, 2) if wall_time else 0,
+            "throughput": round(len(results) / wall_time, 2) if wall_time else 0,
+            "p50": round(percentile(durations, 0.5), 4),
+            "p95": round(percentile(durations, 0.95), 4),
+        }
+
+
+def print_summary(summary: dict):
+    """输出每个账号的结果和整体统计"""
+    for account in summary["accounts"]:
+        mark = "✅" if account["success"] else "❌"
+        error = f"  {account['error']}" if account["error"] else ""
+        print(f"{mark} {account['username']:<20}{account['engine']:<10}{account['duration'] * 1000:>9.1f} ms{error}")
+    print(
+        f"\n共 {summary['total']} 个账号，成功 {summary['succeeded']} 个；"
+        f"并发数 {summary['concurrency']}，总耗时 {summary['wall_time']:.2f} s，"
+        f"串行耗时合计 {summary['serial_time']:.2f} s（加速 {summary['speedup']}x），"
+        f"吞吐量 {summary['throughput']} 个/秒，单账号 p50 {summary['p50'] * 1000:.0f} ms / p95 {summary['p95'] * 1000:.0f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多账号并发认证")
+    parser.add_argument("--concurrency", type=int, default=load_setting("MAX_CONCURRENCY", 4), help="最大并发数")
+    parser.add_argument("--engine", choices=LOGIN_ENGINES, default=load_setting("LOGIN_ENGINE", "auto"),
+                        help="登录引擎")
+    parser.add_argument("--json", help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    accounts = load_setting("ACCOUNTS", [])
+    if not accounts:
+        print("❌ config.py 中未配置 ACCOUNTS")
+        return 2
+
+    batch = MultiAccountLogin(
+        accounts, max_concurrency=args.concurrency, engine=args.engine,
+        target_url=load_setting("PORTAL_URL", DEFAULT_PORTAL_URL),
+        headless=load_setting("HEADLESS", True),
+        metrics=PhaseMetrics(jsonl_path=load_setting("METRICS_FILE", "gdipu_metrics.jsonl"),
+                             prometheus_path=load_setting("PROMETHEUS_FILE", "gdipu_auto_login.prom")),
+    )
+    summary = batch.run()
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 0 if summary["succeeded"] == summary["total"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网络变化监听
+订阅Linux netlink的网卡、地址和路由事件，DHCP续租、网卡断开重连或IP变化时立即得到通知；
+不支持netlink时退回定期读取/proc/net/route和本机源地址进行比较
+"""
+
+import os
+import time
+import errno
+import socket
+import struct
+import select
+import logging
+
+from portal_probe import local_address
+
+
+# netlink多播组
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+# netlink消息类型
+RTM_NEWLINK, RTM_DELLINK = 16, 17
+RTM_NEWADDR, RTM_DELADDR = 20, 21
+RTM_NEWROUTE, RTM_DELROUTE = 24, 25
+
+_MESSAGE_KINDS = {
+    RTM_NEWLINK: ("link", "new"), RTM_DELLINK: ("link", "del"),
+    RTM_NEWADDR: ("address", "new"), RTM_DELADDR: ("address", "del"),
+    RTM_NEWROUTE: ("route", "new"), RTM_DELROUTE: ("route", "del"),
+}
+
+# ifaddrmsg中的地址属性
+IFA_ADDRESS, IFA_LOCAL = 1, 2
+
+_NLMSG_HEADER = struct.Struct("=IHHII")
+_IFADDRMSG = struct.Struct("=BBBBI")
+_RTATTR = struct.Struct("=HH")
+
+
+class NetworkEvent:
+    """一次网络变化"""
+
+    def __init__(self, kind: str, action: str, address: str = None, interface: int = None):
+        """
+        Args:
+            kind (str): link（网卡）、address（地址）或route（路由）
+            action (str): new（新增/变化）、del（删除）或change（轮询比较发现的变化）
+            address (str): 地址事件中的IP
+            interface (int): 网卡序号
+        """
+        self.kind = kind
+        self.action = action
+        self.address = address
+        self.interface = interface
+
+    def __repr__(self):
+        detail = f" {self.address}" if self.address else ""
+        return f"{self.kind}:{self.action}{detail}"
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def parse_netlink_messages(data: bytes) -> list:
+    """
+    解析一次recv得到的netlink消息
+
+    Returns:
+        list: NetworkEvent列表，忽略不关心的消息
+    """
+    events = []
+    offset = 0
+    while offset + _NLMSG_HEADER.size <= len(data):
+        length, msg_type, _, _, _ = _NLMSG_HEADER.unpack_from(data, offset)
+        if length < _NLMSG_HEADER.size:
+            break
+        # 截断的消息只解析实际收到的部分
+        end = min(offset + length, len(data))
+        if msg_type in _MESSAGE_KINDS:
+            kind, action = _MESSAGE_KINDS[msg_type]
+            event = NetworkEvent(kind, action)
+            body = offset + _NLMSG_HEADER.size
+            if kind == "address" and body + _IFADDRMSG.size <= end:
+                family, _, _, _, index = _IFADDRMSG.unpack_from(data, body)
+                event.interface = index
+                attr = body + _IFADDRMSG.size
+                while attr + _RTATTR.size <= end:
+                    attr_len, attr_type = _RTATTR.unpack_from(data, attr)
+                    if attr_len < _RTATTR.size or attr + attr_len > end:
+                        break
+                    if attr_type in (IFA_LOCAL, IFA_ADDRESS) and event.address is None:
+                        payload = data[attr + _RTATTR.size:attr + attr_len]
+                        try:
+                            event.address = socket.inet_ntop(family, payload)
+                        except (OSError, ValueError):
+                            pass
+                    attr += _align(attr_len)
+            events.append(event)
+        offset += _align(length)
+    return events
+
+
+class NetlinkWatcher:
+    """基于netlink的网络变化监听（仅Linux）"""
+
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        self.sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+        self.sock.setblocking(False)
+
+    def _read(self) -> list:
+        events = []
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                return events
+            except OSError as e:
+                # 事件过多导致接收缓冲区溢出，丢失的事件当作一次变化处理
+                if e.errno == errno.ENOBUFS:
+                    events.append(NetworkEvent("link", "change"))
+                    continue
+                raise
+            events.extend(parse_netlink_messages(data))
+
+    def wait(self, timeout: float, stop_event=None) -> list:
+        """
+        等待网络变化
+
+        Args:
+            timeout (float): 最长等待时间（秒）
+            stop_event (threading.Event): 被设置时提前返回
+
+        Returns:
+            list: NetworkEvent列表，超时时为空
+        """
+        deadline = time.monotonic() + timeout
+        while not (stop_event and stop_event.is_set()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            # 分段等待，保证stop_event被设置后1秒内返回
+            readable, _, _ = select.select([self.sock], [], [], min(remaining, 1.0))
+            if readable:
+                events = self._read()
+                if events:
+                    return events
+        return []
+
+    def close(self):
+        self.sock.close()
+
+
+class PollingWatcher:
+    """不支持netlink时的替代方案：定期比较/proc/net/route与访问认证服务器使用的本机源地址"""
+
+    def __init__(self, target_url: str, interval: float = 2.0, logger=None):
+        """
+        Args:
+            target_url (str): 认证页面地址，用于确定本机源地址
+            interval (float): 比较间隔（秒），只读取本地文件和路由表，不产生网络流量
+        """
+        self.target_url = target_url
+        self.interval = interval
+        self.logger = logger or logging.getLogger(__name__)
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> tuple:
+        try:
+            with open("/proc/net/route", "r") as f:
+                routes = f.read()
+        except OSError:
+            routes = None
+        return routes, local_address(self.target_url)
+
+    def wait(self, timeout: float, stop_event=None) -> list:
+        """等待网络变化，参数与返回值同NetlinkWatcher.wait"""
+        deadline = time.monotonic() + timeout
+        while not (stop_event and stop_event.is_set()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            if stop_event:
+                stop_event.wait(min(remaining, self.interval))
+            else:
+                time.sleep(min(remaining, self.interval))
+            snapshot = self._take_snapshot()
+            if snapshot != self._snapshot:
+                events = []
+                if snapshot[0] != self._snapshot[0]:
+                    events.append(NetworkEvent("route", "change"))
+                if snapshot[1] != self._snapshot[1]:
+                    events.append(NetworkEvent("address", "change", snapshot[1]))
+                self._snapshot = snapshot
+                return events
+        return []
+
+    def close(self):
+        pass
+
+
+def create_watcher(target_url: str, logger=None):
+    """
+    创建网络变化监听器，优先使用netlink
+
+    Args:
+        target_url (str): 认证页面地址
+        logger: 日志记录器
+    """
+    logger = logger or logging.getLogger(__name__)
+    if hasattr(socket, "AF_NETLINK") and os.name == "posix":
+        try:
+            return NetlinkWatcher(logger)
+        except OSError as e:
+            logger.warning(f"无法订阅netlink事件，改为定期检查路由表: {str(e)}")
+    return PollingWatcher(target_url, logger=logger)
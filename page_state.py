@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+认证页面状态识别
+用一段脚本一次判断页面当前处于哪种状态（登录表单就绪、已登录、网络连接错误对话框、
+注销确认对话框、错误信息或尚无法识别），每次轮询只占一次WebDriver往返；
+各流程按识别结果分支，不再依次等待各个元素或对话框出现
+"""
+
+from enum import Enum
+
+
+class PageState(Enum):
+    """认证页面状态"""
+    LOGIN_FORM = "login_form"                      # 账号、密码输入框和登录按钮都已就绪
+    LOGGED_IN = "logged_in"                        # 在线信息页（注销按钮或IP地址）
+    NETWORK_ERROR_DIALOG = "network_error_dialog"  # 网络连接错误对话框
+    LOGOUT_CONFIRM = "logout_confirm"              # "您确定要注销吗？"对话框
+    ERROR_MESSAGE = "error_message"                # 页面显示错误信息
+    UNKNOWN = "unknown"                            # 页面仍在加载或无法识别
+
+
+# 打开认证页面后可以据此决定下一步的状态（网络连接错误对话框需先关闭）
+READY_STATES = frozenset(PageState) - {PageState.UNKNOWN, PageState.NETWORK_ERROR_DIALOG}
+# 点击登录后页面作出响应的状态
+OUTCOME_STATES = frozenset({PageState.LOGGED_IN, PageState.ERROR_MESSAGE})
+# 确认注销后页面已离开已登录状态
+LOGGED_OUT_STATES = READY_STATES - {PageState.LOGGED_IN, PageState.LOGOUT_CONFIRM}
+
+# 登录表单元素的id
+LOGIN_FORM_IDS = {"username": "username", "password": "password", "login_button": "login-account"}
+
+# 页面内的识别函数，批量登录脚本也复用它；dismiss为真时顺手点掉网络连接错误对话框
+CLASSIFY_FUNCTION = """
+function classifyPage(dismiss) {
+    var result = {state: "unknown", missing: [], message: null, ip: null, dialog_handled: false};
+    var dialog = document.querySelector(".dialog.confirm.active");
+    if (dialog) {
+        var section = dialog.querySelector(".section");
+        var text = section ? section.textContent.trim() : "";
+        if (text.indexOf("注销") >= 0) {
+            result.state = "logout_confirm";
+            result.message = text;
+            return result;
+        }
+        var confirm = dialog.querySelector(".btn-confirm");
+        if (!dismiss || !confirm) {
+            result.state = "network_error_dialog";
+            result.message = text;
+            return result;
+        }
+        confirm.click();
+        result.dialog_handled = true;
+        if (document.querySelector(".dialog.confirm.active")) {
+            result.state = "network_error_dialog";
+            result.message = text;
+            return result;
+        }
+    }
+    var ip = document.getElementById("ipv4");
+    if (document.getElementById("logout") || (ip && ip.textContent.trim())) {
+        result.state = "logged_in";
+        result.ip = ip ? ip.textContent.trim() : null;
+        return result;
+    }
+    var ids = %s;
+    for (var name in ids) {
+        if (!document.getElementById(ids[name])) { result.missing.push(name); }
+    }
+    var errors = Array.prototype.map.call(document.getElementsByClassName("error"), function (element) {
+        return element.textContent.trim();
+    }).filter(Boolean);
+    if (errors.length) {
+        result.state = "error_message";
+        result.message = errors[0];
+    } else if (!result.missing.length && document.readyState !== "loading") {
+        result.state = "login_form";
+    }
+    return result;
+}
+""" % str(LOGIN_FORM_IDS).replace("'", '"')
+
+# 识别一次页面状态，参数：是否点掉网络连接错误对话框
+PAGE_STATE_SCRIPT = CLASSIFY_FUNCTION + "\nreturn classifyPage(arguments[0]);"
+
+
+class PageSnapshot:
+    """一次页面状态识别的结果"""
+
+    def __init__(self, state: PageState, missing: list = None, message: str = None,
+                 ip: str = None, dialog_handled: bool = False):
+        """
+        Args:
+            state (PageState): 页面状态
+            missing (list): 缺少的登录表单元素（LOGIN_FORM_IDS中的键）
+            message (str): 对话框或错误信息的文本
+            ip (str): 已登录时页面显示的IP地址
+            dialog_handled (bool): 本次识别时是否点掉了网络连接错误对话框
+        """
+        self.state = state
+        self.missing = missing or []
+        self.message = message
+        self.ip = ip
+        self.dialog_handled = dialog_handled
+
+    @property
+    def form_ready(self) -> bool:
+        """登录表单元素是否齐全（出现错误信息时表单仍可能可用）"""
+        return self.state in (PageState.LOGIN_FORM, PageState.ERROR_MESSAGE) and not self.missing
+
+    @classmethod
+    def from_script(cls, data: dict):
+        """由页面脚本的返回值构造，无法识别的状态视为UNKNOWN"""
+        data = data or {}
+        try:
+            state = PageState(data.get("state"))
+        except ValueError:
+            state = PageState.UNKNOWN
+        return cls(state, data.get("missing"), data.get("message"), data.get("ip"),
+                   bool(data.get("dialog_handled")))
+
+    def __repr__(self):
+        return f"PageSnapshot({self.state.value}, message={self.message!r})"
+
+
+def classify(driver, dismiss_dialog: bool = False) -> PageSnapshot:
+    """
+    识别页面当前状态，只占一次WebDriver往返
+
+    Args:
+        driver: WebDriver
+        dismiss_dialog (bool): 是否顺手点掉网络连接错误对话框
+    """
+    return PageSnapshot.from_script(driver.execute_script(PAGE_STATE_SCRIPT, dismiss_dialog))
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+广东轻工网络准入认证 HTTP 登录引擎
+直接复现认证页面（深澜 Srun Portal）发出的登录/注销请求，包括页面脚本中的
+密码加密与校验和计算，无需启动浏览器
+"""
+
+import re
+import json
+import time
+import hmac
+import socket
+import hashlib
+import base64
+import logging
+from urllib.parse import urljoin, urlparse, parse_qs
+
+from lazy_import import LazyImport
+
+# requests导入耗时较长，只查询状态时用不到
+requests = LazyImport("requests")
+
+
+# 认证页面使用的自定义Base64字母表
+_SRUN_ALPHABET = "LVoJPiCN2R8G90yg+hmFHuacZ1OWMnrsSTXkYpUq/3dlbfKwv6xztjI7DeBE45QA"
+_STANDARD_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+_BASE64_TRANSLATION = str.maketrans(_STANDARD_ALPHABET, _SRUN_ALPHABET)
+
+_JSONP_PATTERN = re.compile(r"^[\w$.]*\((.*)\)\s*;?\s*$", re.S)
+_AC_ID_PATTERNS = (
+    re.compile(r'id=["\']ac_id["\'][^>]*value=["\'](\d+)["\']'),
+    re.compile(r'value=["\'](\d+)["\'][^>]*id=["\']ac_id["\']'),
+    re.compile(r'ac_id=(\d+)'),
+)
+
+
+class PortalError(Exception):
+    """HTTP登录引擎错误基类"""
+
+
+class PortalUnavailableError(PortalError):
+    """认证服务器无法访问或响应格式不符合预期，可回退到Selenium流程"""
+
+
+class PortalAuthError(PortalError):
+    """认证服务器明确拒绝了请求（如密码错误），回退到Selenium也无济于事"""
+
+
+def _ordat(message: str, index: int) -> int:
+    """返回指定位置字符的编码，越界时返回0"""
+    return ord(message[index]) if index < len(message) else 0
+
+
+def _to_words(message: str, include_length: bool) -> list:
+    """将字符串按小端序每4个字符打包为一个32位整数"""
+    words = []
+    for i in range(0, len(message), 4):
+        words.append(
+            _ordat(message, i)
+            | _ordat(message, i + 1) << 8
+            | _ordat(message, i + 2) << 16
+            | _ordat(message, i + 3) << 24
+        )
+    if include_length:
+        words.append(len(message))
+    return words
+
+
+def _from_words(words: list) -> str:
+    """将32位整数列表还原为字符串（每个字符对应一个字节）"""
+    chars = []
+    for word in words:
+        chars.append(chr(word & 0xFF))
+        chars.append(chr(word >> 8 & 0xFF))
+        chars.append(chr(word >> 16 & 0xFF))
+        chars.append(chr(word >> 24 & 0xFF))
+    return "".join(chars)
+
+
+def xencode(message: str, key: str) -> str:
+    """
+    认证页面脚本中的xEncode加密（XXTEA变体）
+
+    Args:
+        message (str): 明文
+        key (str): 密钥，即服务器下发的challenge
+
+    Returns:
+        str: 密文，每个字符对应一个字节
+    """
+    if not message:
+        return ""
+    v = _to_words(message, True)
+    k = _to_words(key, False)
+    if len(k) < 4:
+        k += [0] * (4 - len(k))
+
+    n = len(v) - 1
+    z = v[n]
+    c = 0x86014019 | 0x183639A0
+    q = 6 + 52 // (n + 1)
+    d = 0
+    while q > 0:
+        d = (d + c) & 0xFFFFFFFF
+        e = d >> 2 & 3
+        for p in range(n + 1):
+            y = v[0] if p == n else v[p + 1]
+            m = (z >> 5 ^ y << 2) + ((y >> 3 ^ z << 4) ^ (d ^ y)) + (k[(p & 3) ^ e] ^ z)
+            v[p] = z = (v[p] + m) & 0xFFFFFFFF
+        q -= 1
+    return _from_words(v)
+
+
+def srun_base64(data: str) -> str:
+    """使用认证页面的自定义字母表进行Base64编码"""
+    encoded = base64.b64encode(data.encode("latin-1")).decode("ascii")
+    return encoded.translate(_BASE64_TRANSLATION)
+
+
+def encode_user_info(username: str, password: str, ip: str, ac_id: str, token: str) -> str:
+    """生成登录请求中的info参数"""
+    info = json.dumps(
+        {
+            "username": username,
+            "password": password,
+            "ip": ip,
+            "acid": ac_id,
+            "enc_ver": "srun_bx1",
+        },
+        separators=(",", ":"),
+    )
+    return "{SRBX1}" + srun_base64(xencode(info, token))
+
+
+def hmac_md5(password: str, token: str) -> str:
+    """页面脚本中的md5(password, token)，即以challenge为密钥的HMAC-MD5"""
+    return hmac.new(token.encode("utf-8"), password.encode("utf-8"), hashlib.md5).hexdigest()
+
+
+def login_checksum(token: str, username: str, hmd5: str, ac_id: str, ip: str,
+                   n: str, user_type: str, info: str) -> str:
+    """计算登录请求中的chksum参数"""
+    parts = (username, hmd5, ac_id, ip, n, user_type, info)
+    return hashlib.sha1("".join(token + part for part in parts).encode("utf-8")).hexdigest()
+
+
+def parse_jsonp(text: str) -> dict:
+    """
+    解析JSONP响应
+
+    Args:
+        text (str): 形如 callback({...}) 的响应文本，也兼容纯JSON
+
+    Returns:
+        dict: 解析后的数据
+    """
+    text = text.strip()
+    match = _JSONP_PATTERN.match(text)
+    payload = match.group(1) if match else text
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        raise PortalUnavailableError(f"无法解析认证服务器响应: {text[:200]}")
+    if not isinstance(data, dict):
+        raise PortalUnavailableError(f"认证服务器响应格式异常: {text[:200]}")
+    return data
+
+
+def create_bound_adapter(source_address: str = None, interface: str = None):
+    """
+    创建将连接绑定到指定源地址或网卡的requests适配器，用于多账号分别从不同地址认证
+
+    Args:
+        source_address (str): 本地源地址
+        interface (str): 网卡名称（Linux的SO_BINDTODEVICE，需要root或CAP_NET_RAW权限）
+    """
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection
+
+    class BoundHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            if source_address:
+                kwargs["source_address"] = (source_address, 0)
+            if interface:
+                kwargs["socket_options"] = HTTPConnection.default_socket_options + [
+                    (socket.SOL_SOCKET, getattr(socket, "SO_BINDTODEVICE", 25), interface.encode())
+                ]
+            super().init_poolmanager(*args, **kwargs)
+
+    return BoundHTTPAdapter()
+
+
+class PortalHTTPClient:
+    """基于HTTP请求的认证客户端"""
+
+    def __init__(self, base_url: str, username: str, password: str,
+                 ac_id: str = None, timeout: float = 5, logger=None,
+                 source_address: str = None, interface: str = None):
+        """
+        初始化HTTP认证客户端
+
+        Args:
+            base_url (str): 认证页面地址
+            username (str): 用户名
+            password (str): 密码
+            ac_id (str): 认证区域ID，None时从认证页面自动检测
+            timeout (float): 单次请求超时时间（秒）
+            logger: 日志记录器
+            source_address (str): 发起请求使用的本地源地址，None为系统默认
+            interface (str): 发起请求使用的网卡，None为系统默认
+        """
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.ac_id = str(ac_id) if ac_id is not None else None
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger(__name__)
+        # 最近一次登录时认证服务器看到的本机IP
+        self.last_ip = None
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                          "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+            "Referer": base_url,
+        })
+        if source_address or interface:
+            adapter = create_bound_adapter(source_address, interface)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+
+    def _request(self, path: str, params: dict) -> dict:
+        """发送带JSONP回调的GET请求并解析响应"""
+        timestamp = int(time.time() * 1000)
+        query = {"callback": f"jQuery1124_{timestamp}"}
+        query.update(params)
+        query["_"] = timestamp
+        try:
+            response = self.session.get(urljoin(self.base_url, path), params=query, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise PortalUnavailableError(f"请求认证服务器失败: {str(e)}")
+        return parse_jsonp(response.text)
+
+    def detect_ac_id(self) -> str:
+        """从认证页面跳转地址或隐藏字段中检测认证区域ID"""
+        if self.ac_id is not None:
+            return self.ac_id
+        try:
+            response = self.session.get(self.base_url, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise PortalUnavailableError(f"无法访问认证页面: {str(e)}")
+
+        for url in [r.url for r in response.history] + [response.url]:
+            values = parse_qs(urlparse(url).query).get("ac_id")
+            if values:
+                self.ac_id = values[0]
+                break
+        else:
+            for pattern in _AC_ID_PATTERNS:
+                match = pattern.search(response.text)
+                if match:
+                    self.ac_id = match.group(1)
+                    break
+            else:
+                self.ac_id = "1"
+                self.logger.warning("未能检测到认证区域ID，使用默认值 ac_id=1")
+        return self.ac_id
+
+    def get_status(self) -> dict:
+        """查询当前在线状态，对应页面的rad_user_info接口"""
+        return self._request("cgi-bin/rad_user_info", {})
+
+    def is_online(self) -> bool:
+        """当前终端是否已通过认证"""
+        return self.get_status().get("error") == "ok"
+
+    def get_client_ip(self) -> str:
+        """获取认证服务器看到的本机IP地址"""
+        status = self.get_status()
+        ip = status.get("online_ip") or status.get("client_ip")
+        if not ip:
+            raise PortalUnavailableError("认证服务器未返回客户端IP地址")
+        return ip
+
+    def get_challenge(self, ip: str) -> str:
+        """获取登录所需的challenge"""
+        data = self._request("cgi-bin/get_challenge", {"username": self.username, "ip": ip})
+        token = data.get("challenge")
+        if not token:
+            raise PortalUnavailableError(f"获取challenge失败: {data.get('error_msg') or data.get('error')}")
+        return token
+
+    def login(self) -> dict:
+        """
+        执行登录请求
+
+        Returns:
+            dict: 认证服务器的响应数据
+
+        Raises:
+            PortalUnavailableError: 服务器不可达或协议不匹配
+            PortalAuthError: 服务器拒绝登录
+        """
+        ac_id = self.detect_ac_id()
+        ip = self.last_ip = self.get_client_ip()
+        token = self.get_challenge(ip)
+
+        n, user_type = "200", "1"
+        hmd5 = hmac_md5(self.password, token)
+        info = encode_user_info(self.username, self.password, ip, ac_id, token)
+        data = self._request("cgi-bin/srun_portal", {
+            "action": "login",
+            "username": self.username,
+            "password": "{MD5}" + hmd5,
+            "os": "Windows 10",
+            "name": "Windows",
+            "double_stack": "0",
+            "chksum": login_checksum(token, self.username, hmd5, ac_id, ip, n, user_type, info),
+            "info": info,
+            "ac_id": ac_id,
+            "ip": ip,
+            "n": n,
+            "type": user_type,
+        })
+
+        if data.get("error") == "ok" or data.get("res") == "ok":
+            return data
+        message = data.get("error_msg") or data.get("error") or data.get("res") or "未知错误"
+        raise PortalAuthError(message)
+
+    def logout(self) -> dict:
+        """
+        执行注销请求
+
+        Returns:
+            dict: 认证服务器的响应数据
+        """
+        ac_id = self.detect_ac_id()
+        ip = self.get_client_ip()
+        data = self._request("cgi-bin/srun_portal", {
+            "action": "logout",
+            "username": self.username,
+            "ip": ip,
+            "ac_id": ac_id,
+        })
+        if data.get("error") == "ok" or data.get("res") == "ok":
+            return data
+        message = data.get("error_msg") or data.get("error") or data.get("res") or "未知错误"
+        raise PortalAuthError(message)
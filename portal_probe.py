@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+认证状态快速探测
+直接请求认证服务器的状态接口，并辅以一次门户劫持检测，在毫秒级判断当前是否已认证，
+结果按TTL缓存，避免为了回答"是否在线"而启动浏览器
+"""
+
+import time
+import socket
+import threading
+from enum import Enum
+from urllib.parse import urljoin, urlparse
+
+from portal_http import parse_jsonp, PortalUnavailableError
+
+
+# 门户劫持检测地址：未认证时该请求会被重定向到认证页面，已认证时返回204
+DEFAULT_CHECK_URL = "http://connect.rom.miui.com/generate_204"
+
+
+class ProbeState(Enum):
+    """探测结果"""
+    LOGGED_IN = "logged_in"
+    LOGGED_OUT = "logged_out"
+    UNREACHABLE = "portal_unreachable"
+
+
+class ProbeResult:
+    """一次探测的结果"""
+
+    def __init__(self, state: ProbeState, source: str, latency: float, data: dict = None):
+        """
+        Args:
+            state (ProbeState): 探测结果
+            source (str): 得出结果的检测方式：portal（状态接口）或captive（门户劫持检测）
+            latency (float): 探测耗时（秒）
+            data (dict): 状态接口返回的原始数据
+        """
+        self.state = state
+        self.source = source
+        self.latency = latency
+        self.data = data or {}
+        self.checked_at = time.time()
+
+    @property
+    def ip(self):
+        """认证服务器看到的本机IP地址"""
+        return self.data.get("online_ip") or self.data.get("client_ip")
+
+    def __repr__(self):
+        return f"ProbeResult({self.state.value}, source={self.source}, latency={self.latency * 1000:.1f}ms)"
+
+
+def _http_get(url: str, timeout: float):
+    """
+    发送一次不跟随重定向的GET请求
+
+    只需要状态码和响应开头的一小段，直接用socket发送HTTP/1.0请求（服务器不会使用分块编码），
+    不导入http.client（连带导入email、ssl，status命令的启动耗时因此多出约20 ms）
+
+    Returns:
+        (int, str): 状态码和响应文本（最多4096字节）
+
+    Raises:
+        OSError: 网络错误或超时
+        ValueError: 响应不是HTTP响应
+    """
+    parsed = urlparse(url)
+    path = parsed.path or "/"
+    if parsed.query:
+        path += "?" + parsed.query
+    request = f"GET {path} HTTP/1.0\r\nHost: {parsed.netloc}\r\nConnection: close\r\n\r\n"
+    with socket.create_connection((parsed.hostname, parsed.port or 80), timeout=timeout) as sock:
+        sock.sendall(request.encode("ascii"))
+        data = b""
+        while True:
+            header_end = data.find(b"\r\n\r\n")
+            if header_end >= 0 and len(data) >= header_end + 4 + 4096:
+                break
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+
+    status_line = data.split(b"\r\n", 1)[0].split()
+    if len(status_line) < 2 or not status_line[0].startswith(b"HTTP/") or not status_line[1].isdigit():
+        raise ValueError(f"无效的HTTP响应: {data[:100]!r}")
+    header_end = data.find(b"\r\n\r\n")
+    body = data[header_end + 4:header_end + 4 + 4096] if header_end >= 0 else b""
+    return int(status_line[1]), body.decode("utf-8", "replace")
+
+
+def local_address(url: str):
+    """
+    本机访问该地址时使用的源IP，只查询路由表（UDP connect不发送数据包）
+
+    Returns:
+        str: 源IP，无法确定时返回None
+    """
+    parsed = urlparse(url)
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect((parsed.hostname, parsed.port or 80))
+            return sock.getsockname()[0]
+    except (OSError, TypeError):
+        return None
+
+
+class PortalProbe:
+    """带TTL缓存的认证状态探测器"""
+
+    def __init__(self, portal_url: str, check_url: str = DEFAULT_CHECK_URL,
+                 timeout: float = 0.5, ttl: float = 5):
+        """
+        初始化探测器
+
+        Args:
+            portal_url (str): 认证页面地址
+            check_url (str): 门户劫持检测地址，None表示不做该检测
+            timeout (float): 单次请求超时时间（秒）
+            ttl (float): 结果缓存时间（秒），0表示不缓存
+        """
+        self.status_url = urljoin(portal_url, "cgi-bin/rad_user_info")
+        self.check_url = check_url
+        self.timeout = timeout
+        self.ttl = ttl
+        self._cached = None
+        self._lock = threading.Lock()
+
+    def _portal_status(self):
+        """请求认证服务器的状态接口，服务器不可达时返回None"""
+        try:
+            status, body = _http_get(self.status_url, self.timeout)
+            if status != 200:
+                return None
+            return parse_jsonp(body)
+        except (OSError, ValueError, PortalUnavailableError):
+            return None
+
+    def _captive_check(self):
+        """
+        门户劫持检测
+
+        Returns:
+            True: 返回204，可以直接访问外网
+            False: 请求被劫持或重定向，需要认证
+            None: 网络不可达
+        """
+        if not self.check_url:
+            return None
+        try:
+            status, _ = _http_get(self.check_url, self.timeout)
+        except (OSError, ValueError):
+            return None
+        return status == 204
+
+    def _probe(self) -> ProbeResult:
+        """执行一次实际探测"""
+        start = time.perf_counter()
+        data = self._portal_status()
+        if data is not None:
+            state = ProbeState.LOGGED_IN if data.get("error") == "ok" else ProbeState.LOGGED_OUT
+            return ProbeResult(state, "portal", time.perf_counter() - start, data)
+
+        online = self._captive_check()
+        if online is None:
+            state = ProbeState.UNREACHABLE
+        else:
+            state = ProbeState.LOGGED_IN if online else ProbeState.LOGGED_OUT
+        return ProbeResult(state, "captive", time.perf_counter() - start)
+
+    def probe(self, force: bool = False) -> ProbeResult:
+        """
+        获取当前认证状态，缓存未过期时直接返回缓存结果
+
+        Args:
+            force (bool): 是否忽略缓存
+
+        Returns:
+            ProbeResult
+        """
+        with self._lock:
+            cached = self._cached
+            if not force and cached is not None and time.time() - cached.checked_at < self.ttl:
+                return cached
+            self._cached = self._probe()
+            return self._cached
+
+    def invalidate(self):
+        """清除缓存，登录/注销后调用"""
+        with self._lock:
+            self._cached = None
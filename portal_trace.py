@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+认证过程录制与回放
+录制：记录一次GDIPUAutoLogin操作中的HTTP交互（HTTP引擎的请求和浏览器的网络请求）、
+每个等待步骤结束时的页面快照以及各阶段耗时，保存为紧凑的gzip压缩JSON文件；
+回放：在本地按录制顺序返回录制的响应，并按原始或按比例缩放的延迟响应，
+用于离线复现真实的认证过程，以及在同一份录制上对比不同版本脚本的耗时
+
+用法:
+    python gdipu_auto_login.py --trace trace.json.gz login --force
+    python portal_trace.py show trace.json.gz
+    python portal_trace.py serve trace.json.gz --port 8080 --latency-scale 0.5
+    python bench_login.py --trace trace.json.gz --engines selenium --iterations 10
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import time
+import base64
+import hashlib
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+
+
+TRACE_VERSION = 1
+# 单个响应内容的保存上限（字节），超出部分截断
+MAX_BODY_BYTES = 512 * 1024
+# 录制时替换掉的请求参数：密码及可由其还原出密码的加密字段
+REDACTED_PARAMS = ("password", "info", "chksum")
+# 保存的响应头
+KEPT_HEADERS = ("content-type", "location", "cache-control")
+
+_TEXT_TYPES = ("text/", "json", "javascript", "xml")
+_JSONP_CALLBACK = re.compile(r"^\s*[\w$.]+\(")
+
+
+def redact_url(url: str) -> str:
+    """替换URL中的密码等敏感参数"""
+    parsed = urlparse(url)
+    if not parsed.query:
+        return url
+    query = [(key, "***" if key in REDACTED_PARAMS else value)
+             for key, values in parse_qs(parsed.query, keep_blank_values=True).items() for value in values]
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def _encode_body(data: bytes, content_type: str) -> dict:
+    """文本内容原样保存，其余内容Base64编码"""
+    truncated = len(data) > MAX_BODY_BYTES
+    data = data[:MAX_BODY_BYTES]
+    if any(kind in (content_type or "").lower() for kind in _TEXT_TYPES):
+        return {"body": data.decode("utf-8", "replace"), "encoding": "text", "truncated": truncated}
+    return {"body": base64.b64encode(data).decode("ascii"), "encoding": "base64", "truncated": truncated}
+
+
+def decode_body(exchange: dict) -> bytes:
+    """取回录制的响应内容"""
+    body = exchange.get("body") or ""
+    if exchange.get("encoding") == "base64":
+        return base64.b64decode(body)
+    return body.encode("utf-8")
+
+
+def _kept_headers(headers) -> dict:
+    return {name: str(value) for name, value in (headers or {}).items() if name.lower() in KEPT_HEADERS}
+
+
+class TraceRecorder:
+    """录制一次操作的HTTP交互、页面快照和阶段耗时"""
+
+    def __init__(self, account: str = None, target_url: str = None, engine: str = None,
+                 operation: str = None, logger=None):
+        """
+        Args:
+            account (str): 账号
+            target_url (str): 认证页面地址，回放时用于替换响应中的原始地址
+            engine (str): 登录引擎
+            operation (str): 录制的操作（login、logout、relogin等）
+            logger: 日志记录器
+        """
+        self.account = account
+        self.target_url = target_url
+        self.engine = engine
+        self.operation = operation
+        self.logger = logger or logging.getLogger(__name__)
+        self.started_at = time.time()
+        self.events = []
+        # 页面快照按内容去重，事件中只引用其摘要
+        self.snapshots = {}
+        self.closed = False
+        self._lock = threading.Lock()
+        self._sessions = []
+        self._drivers = []
+        self._metrics = []
+
+    def _add(self, event: dict):
+        with self._lock:
+            self.events.append(event)
+
+    def add_exchange(self, source: str, method: str, url: str, status, headers: dict,
+                     body: bytes, latency: float, started: float, error: str = None):
+        """
+        记录一次HTTP交互
+
+        Args:
+            source (str): 来源：http（HTTP引擎）或browser（浏览器）
+            method (str): 请求方法
+            url (str): 请求地址
+            status (int): HTTP状态码，请求失败时为None
+            headers (dict): 响应头
+            body (bytes): 响应内容
+            latency (float): 从发出请求到收到响应头的耗时（秒）
+            started (float): 发出请求的时间戳
+            error (str): 请求失败的原因
+        """
+        headers = _kept_headers(headers)
+        event = {"type": "http", "t": round(started - self.started_at, 6), "source": source,
+                 "method": method, "url": redact_url(url), "status": status, "headers": headers,
+                 "latency": round(latency or 0.0, 6)}
+        if error:
+            event["error"] = error
+        if body:
+            content_type = next((value for name, value in headers.items() if name.lower() == "content-type"), "")
+            event.update(_encode_body(body, content_type))
+        self._add(event)
+
+    # HTTP引擎
+
+    def attach_session(self, session):
+        """为requests.Session挂载响应钩子，记录HTTP引擎发出的请求（含重定向的每一跳）"""
+        if session in self._sessions:
+            return
+        session.hooks["response"].append(self._on_response)
+        self._sessions.append(session)
+
+    def _on_response(self, response, *args, **kwargs):
+        if self.closed:
+            return
+        latency = response.elapsed.total_seconds()
+        self.add_exchange("http", response.request.method, response.url, response.status_code,
+                          dict(response.headers), response.content, latency, time.time() - latency)
+
+    # 浏览器
+
+    def attach_driver(self, driver):
+        """
+        包装driver.get_log，从performance日志中的Network事件记录浏览器发出的请求；
+        录制器自行读取的日志条目会保留给下一次get_log调用，不影响AuthResponseWatcher
+        """
+        if any(attached is driver for attached, _ in self._drivers):
+            return
+        original = driver.get_log
+        pending = []
+
+        def get_log(log_type):
+            entries = original(log_type)
+            if log_type == "performance":
+                self._process_entries(driver, entries)
+                entries, pending[:] = pending + entries, []
+            return entries
+
+        driver.get_log = get_log
+        driver._trace_state = {"original": original, "pending": pending, "requests": {}}
+        self._drivers.append((driver, original))
+
+    def drain(self, driver):
+        """读取浏览器尚未取走的网络事件，在页面跳转使响应内容失效之前取回"""
+        state = getattr(driver, "_trace_state", None)
+        if state is None or self.closed:
+            return
+        try:
+            entries = state["original"]("performance")
+        except Exception:
+            # 浏览器不支持performance日志，只记录页面快照
+            return
+        self._process_entries(driver, entries)
+        state["pending"].extend(entries)
+
+    def _read_body(self, driver, request_id: str) -> bytes:
+        try:
+            result = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return b""
+        body = result.get("body", "")
+        return base64.b64decode(body) if result.get("base64Encoded") else body.encode("utf-8")
+
+    def _process_entries(self, driver, entries):
+        if self.closed:
+            return
+        requests = driver._trace_state["requests"]
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method, params = message.get("method"), message.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.requestWillBeSent":
+                request = params.get("request", {})
+                if request.get("url", "").startswith("data:"):
+                    continue
+                previous = requests.pop(request_id, None)
+                redirect = params.get("redirectResponse")
+                if previous is not None and redirect:
+                    # 重定向沿用同一个requestId，上一跳的响应随新请求一起到达
+                    self.add_exchange("browser", previous["method"], previous["url"], redirect.get("status"),
+                                      redirect.get("headers"), b"", params.get("timestamp", 0) - previous["sent"],
+                                      previous["wall"])
+                requests[request_id] = {
+                    "method": request.get("method", "GET"), "url": request.get("url", ""),
+                    "sent": params.get("timestamp", 0), "wall": params.get("wallTime") or time.time(),
+                }
+            elif request_id not in requests:
+                continue
+            elif method == "Network.responseReceived":
+                response = params.get("response", {})
+                requests[request_id].update(status=response.get("status"), headers=response.get("headers"),
+                                            received=params.get("timestamp", 0))
+            elif method == "Network.loadingFinished":
+                request = requests.pop(request_id)
+                if request.get("status") is None:
+                    continue
+                self.add_exchange("browser", request["method"], request["url"], request["status"],
+                                  request["headers"], self._read_body(driver, request_id),
+                                  request["received"] - request["sent"], request["wall"])
+            elif method == "Network.loadingFailed":
+                request = requests.pop(request_id)
+                if params.get("blockedReason"):
+                    # 被启动配置屏蔽的资源不是认证服务器的行为
+                    continue
+                self.add_exchange("browser", request["method"], request["url"], None, {}, b"",
+                                  params.get("timestamp", 0) - request["sent"], request["wall"],
+                                  error=params.get("errorText"))
+
+    def snapshot(self, driver, step: str, elapsed: float, outcome: str):
+        """
+        记录一个等待步骤结束时的页面快照
+
+        Args:
+            driver: WebDriver
+            step (str): 步骤名称
+            elapsed (float): 步骤耗时（秒）
+            outcome (str): success或timeout
+        """
+        if self.closed:
+            return
+        self.drain(driver)
+        try:
+            html = driver.page_source
+            url = driver.current_url
+        except Exception:
+            html, url = "", None
+        digest = hashlib.sha1(html.encode("utf-8")).hexdigest()[:12]
+        with self._lock:
+            self.snapshots.setdefault(digest, html)
+        self._add({"type": "dom", "t": round(time.time() - self.started_at, 6), "step": step,
+                   "elapsed": round(elapsed, 6), "outcome": outcome, "url": url, "snapshot": digest})
+
+    # 阶段耗时
+
+    def attach_metrics(self, metrics):
+        """包装metrics.record，同时记录各阶段的耗时"""
+        original = metrics.record
+
+        def record(phase_record):
+            original(phase_record)
+            if not self.closed:
+                self._add({"type": "phase", "t": round(time.time() - self.started_at, 6),
+                           "phase": phase_record.phase, "duration": round(phase_record.duration, 6),
+                           "outcome": phase_record.outcome, "round_trips": phase_record.round_trips})
+
+        metrics.record = record
+        self._metrics.append((metrics, original))
+
+    def close(self):
+        """停止录制并卸下所有钩子"""
+        for driver in (driver for driver, _ in self._drivers):
+            self.drain(driver)
+        self.closed = True
+        for session in self._sessions:
+            if self._on_response in session.hooks["response"]:
+                session.hooks["response"].remove(self._on_response)
+        for driver, original in self._drivers:
+            driver.get_log = original
+            del driver._trace_state
+        for metrics, original in self._metrics:
+            metrics.record = original
+        self._sessions, self._drivers, self._metrics = [], [], []
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["t"])
+            snapshots = dict(self.snapshots)
+        return {
+            "version": TRACE_VERSION,
+            "account": self.account,
+            "target_url": self.target_url,
+            "engine": self.engine,
+            "operation": self.operation,
+            "started_at": self.started_at,
+            "duration": round(time.time() - self.started_at, 6),
+            "events": events,
+            "snapshots": snapshots,
+        }
+
+    def save(self, path: str) -> str:
+        """
+        保存录制结果，文件名以.gz结尾时gzip压缩
+
+        Returns:
+            str: 保存的路径
+        """
+        if not self.closed:
+            self.close()
+        trace = self.to_dict()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as f:
+            json.dump(trace, f, ensure_ascii=False, separators=(",", ":"))
+        exchanges = sum(1 for event in trace["events"] if event["type"] == "http")
+        self.logger.info(f"操作录制已保存: {path}（{exchanges} 个HTTP交互，{len(trace['snapshots'])} 个页面快照，"
+                         f"{os.path.getsize(path) / 1024:.1f} KB）")
+        return path
+
+
+def load_trace(path: str) -> dict:
+    """读取录制文件"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        trace = json.load(f)
+    if trace.get("version") != TRACE_VERSION:
+        raise ValueError(f"不支持的录制文件版本: {trace.get('version')}")
+    return trace
+
+
+def summarize(trace: dict) -> str:
+    """录制内容的可读摘要"""
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(trace["started_at"]))
+    lines = [f"账号 {trace.get('account')}，操作 {trace.get('operation')}，引擎 {trace.get('engine')}，"
+             f"录制于 {started}，共 {trace['duration'] * 1000:.0f} ms"]
+    for event in trace["events"]:
+        prefix = f"{event['t'] * 1000:>9.1f} ms  "
+        if event["type"] == "http":
+            status = event["status"] if event["status"] is not None else event.get("error", "failed")
+            lines.append(f"{prefix}{event['source']:<8}{event['method']} {urlparse(event['url']).path} -> {status} "
+                         f"({event['latency'] * 1000:.1f} ms, {len(decode_body(event))} B)")
+        elif event["type"] == "dom":
+            lines.append(f"{prefix}step    {event['step']} {event['outcome']} ({event['elapsed'] * 1000:.1f} ms)")
+        else:
+            lines.append(f"{prefix}phase   {event['phase']} {event['outcome']} ({event['duration'] * 1000:.1f} ms, "
+                         f"WebDriver往返 {event['round_trips']} 次)")
+    return "\n".join(lines)
+
+
+class ReplayPortal:
+    """按录制顺序返回录制的响应"""
+
+    def __init__(self, trace: dict, latency_scale: float = 1.0):
+        """
+        Args:
+            trace (dict): load_trace()读取的录制内容
+            latency_scale (float): 响应延迟相对录制值的倍数，0为不延迟
+        """
+        self.trace = trace
+        self.latency_scale = latency_scale
+        origin = urlparse(trace.get("target_url") or "")
+        self.origin = f"{origin.scheme}://{origin.netloc}" if origin.netloc else None
+        # 同一路径（认证接口再按action区分）的响应按录制顺序排列
+        self.exchanges = {}
+        for event in trace["events"]:
+            if event["type"] == "http":
+                self.exchanges.setdefault(self._key(event["method"], event["url"]), []).append(event)
+        self.misses = 0
+        self.request_counts = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method: str, url: str) -> tuple:
+        parsed = urlparse(url)
+        return method, parsed.path, parse_qs(parsed.query).get("action", [None])[0]
+
+    def reset(self):
+        """从头开始回放，每次重复运行前调用"""
+        with self._lock:
+            self._cursors.clear()
+            self.misses = 0
+            self.request_counts.clear()
+
+    def next_exchange(self, method: str, url: str):
+        """
+        取出该请求对应的下一个录制响应，录制的响应用完后重复最后一个
+
+        Returns:
+            dict: 录制的HTTP交互，没有对应录制时返回None
+        """
+        key = self._key(method, url)
+        with self._lock:
+            self.request_counts[key[1]] = self.request_counts.get(key[1], 0) + 1
+            exchanges = self.exchanges.get(key)
+            if not exchanges:
+                self.misses += 1
+                return None
+            index = self._cursors.get(key, 0)
+            self._cursors[key] = index + 1
+            return exchanges[min(index, len(exchanges) - 1)]
+
+    def render(self, exchange: dict, url: str, base_url: str) -> tuple:
+        """
+        按本次请求改写录制的响应：原始地址换成回放服务器地址，JSONP回调名换成本次请求的
+
+        Returns:
+            tuple: (headers, body)
+        """
+        body = decode_body(exchange)
+        headers = dict(exchange.get("headers") or {})
+        if exchange.get("encoding") == "text":
+            text = body.decode("utf-8")
+            if self.origin:
+                text = text.replace(self.origin, base_url)
+            callback = parse_qs(urlparse(url).query).get("callback")
+            if callback:
+                text = _JSONP_CALLBACK.sub(lambda _: f"{callback[0]}(", text, count=1)
+            body = text.encode("utf-8")
+        for name, value in headers.items():
+            if name.lower() == "location" and self.origin:
+                headers[name] = value.replace(self.origin, base_url)
+        return headers, body
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    """回放服务器的请求处理"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _replay(self):
+        portal = self.server.portal
+        exchange = portal.next_exchange(self.command, self.path)
+        if exchange is None:
+            body = b"Not Recorded"
+            self.send_response(404)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        time.sleep(exchange["latency"] * portal.latency_scale)
+        if exchange["status"] is None:
+            # 录制时请求失败，直接断开连接
+            self.close_connection = True
+            return
+        headers, body = portal.render(exchange, self.path, f"http://{self.headers.get('Host', '')}")
+        self.send_response(exchange["status"])
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._replay()
+
+    def do_HEAD(self):
+        self._replay()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._replay()
+
+
+class ReplayServer:
+    """在后台线程中运行的回放服务器"""
+
+    def __init__(self, portal: ReplayPortal, host: str = "127.0.0.1", port: int = 0):
+        """
+        Args:
+            portal (ReplayPortal): 回放状态
+            host (str): 监听地址
+            port (int): 监听端口，0为自动分配
+        """
+        self.portal = portal
+        self.httpd = ThreadingHTTPServer((host, port), _ReplayHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.portal = portal
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="认证过程录制的查看与回放")
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="command")
+    show_parser = subparsers.add_parser("show", help="查看录制内容")
+    show_parser.add_argument("trace", help="录制文件")
+    serve_parser = subparsers.add_parser("serve", help="启动回放服务器")
+    serve_parser.add_argument("trace", help="录制文件")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--latency-scale", type=float, default=1.0,
+                              help="响应延迟相对录制值的倍数，0为不延迟")
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace)
+    if args.command == "show":
+        print(summarize(trace))
+        return 0
+
+    server = ReplayServer(ReplayPortal(trace, args.latency_scale), args.host, args.port)
+    print(f"回放服务器已启动: {server.url}（录制自 {trace.get('target_url')}，延迟倍数 {args.latency_scale:g}）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内存统计
+通过/proc读取进程树的常驻内存（RSS），用于统计浏览器及chromedriver占用的内存（仅Linux）
+"""
+
+import os
+import threading
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def list_processes() -> dict:
+    """
+    列出当前所有进程
+
+    Returns:
+        dict: {pid: ppid}
+    """
+    processes = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return processes
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # 进程名可能包含空格和括号，从最后一个右括号之后开始解析
+        fields = stat[stat.rfind(b")") + 2:].split()
+        processes[int(entry)] = int(fields[1])
+    return processes
+
+
+def descendants(pid: int, processes: dict = None) -> list:
+    """返回pid的全部子孙进程"""
+    processes = processes if processes is not None else list_processes()
+    children = {}
+    for child, parent in processes.items():
+        children.setdefault(parent, []).append(child)
+    result, stack = [], [pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            result.append(child)
+            stack.append(child)
+    return result
+
+
+def process_rss(pid: int) -> int:
+    """进程的常驻内存（字节），进程不存在时返回0"""
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_tree_rss(pid: int, include_root: bool = True) -> int:
+    """
+    进程树的常驻内存总和（字节）
+
+    Args:
+        pid (int): 根进程
+        include_root (bool): 是否计入根进程本身
+    """
+    pids = descendants(pid)
+    if include_root:
+        pids.append(pid)
+    return sum(process_rss(p) for p in pids)
+
+
+class PeakRSSSampler:
+    """在后台线程中定期采样进程树内存，记录峰值"""
+
+    def __init__(self, pid: int = None, interval: float = 0.05):
+        """
+        Args:
+            pid (int): 根进程，默认为当前进程
+            interval (float): 采样间隔（秒）
+        """
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.peak = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def sample(self) -> int:
+        """立即采样一次"""
+        rss = process_tree_rss(self.pid)
+        self.peak = max(self.peak, rss)
+        return rss
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = 0
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_event.set()
+        self._thread.join()
+        self.sample()
+        return False
+
+
+def format_bytes(size: int) -> str:
+    """将字节数格式化为MB"""
+    return f"{size / (1024 * 1024):.1f} MB"
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+认证服务器故障应对
+- AdaptiveTimeouts: 按最近观测到的各步骤耗时的p95设置等待上限
+- Backoff: 带随机抖动的指数退避
+- CircuitBreaker: 认证服务器无法访问时不再启动浏览器，快速探测恢复后自动放行
+"""
+
+import random
+import logging
+import threading
+from collections import deque
+
+from metrics import percentile
+from portal_probe import ProbeState
+
+
+class AdaptiveTimeouts:
+    """
+    自适应等待上限
+
+    样本不足时使用默认值；样本足够后取 max(p95 × multiplier, p95 + headroom)，
+    并限制在[max(floor, 默认值 × floor_ratio), ceiling]之间：一段时间响应很快后，
+    等待上限也不会收紧到一次偶发的慢响应就超时。可以像字典一样按步骤名称取值
+    """
+
+    def __init__(self, defaults: dict, ceiling: float = 30, floor: float = 1.0,
+                 floor_ratio: float = 0.5, multiplier: float = 3.0, headroom: float = 1.0,
+                 window: int = 50, min_samples: int = 5, enabled: bool = True):
+        """
+        Args:
+            defaults (dict): 各步骤的默认等待上限（秒）
+            ceiling (float): 任何步骤的等待上限都不超过该值（秒）
+            floor (float): 自适应得出的等待上限不低于该值（秒）
+            floor_ratio (float): 自适应得出的等待上限不低于该步骤默认值的这一比例
+            multiplier (float): p95的倍数
+            headroom (float): 在p95之上至少预留的时间（秒）
+            window (int): 每个步骤保留的最近样本数
+            min_samples (int): 开始自适应所需的最少样本数
+            enabled (bool): False时只使用默认值（仍受ceiling限制）
+        """
+        self.defaults = dict(defaults)
+        self.ceiling = ceiling
+        self.floor = floor
+        self.floor_ratio = floor_ratio
+        self.multiplier = multiplier
+        self.headroom = headroom
+        self.window = window
+        self.min_samples = min_samples
+        self.enabled = enabled
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, step: str, duration: float):
+        """记录一次步骤耗时（秒）"""
+        with self._lock:
+            samples = self._samples.setdefault(step, deque(maxlen=self.window))
+            samples.append(duration)
+
+    def get(self, step: str) -> float:
+        """获取步骤当前的等待上限（秒）"""
+        default = min(self.defaults[step], self.ceiling)
+        if not self.enabled:
+            return default
+        with self._lock:
+            samples = list(self._samples.get(step, ()))
+        if len(samples) < self.min_samples:
+            return default
+        p95 = percentile(samples, 0.95)
+        floor = max(self.floor, default * self.floor_ratio)
+        return min(self.ceiling, max(floor, p95 * self.multiplier, p95 + self.headroom))
+
+    def tightened(self, step: str) -> bool:
+        """步骤当前的等待上限是否已被自适应收紧到默认值以下"""
+        return self.get(step) < min(self.defaults[step], self.ceiling)
+
+    def __getitem__(self, step: str) -> float:
+        return self.get(step)
+
+    def snapshot(self) -> dict:
+        """各步骤当前的等待上限"""
+        return {step: round(self.get(step), 3) for step in self.defaults}
+
+
+class Backoff:
+    """带随机抖动的指数退避：第n次失败后等待 base × factor^n，取其一半加上随机的另一半，不超过cap"""
+
+    def __init__(self, base: float = 30, cap: float = 600, factor: float = 2.0):
+        """
+        Args:
+            base (float): 首次重试的等待时间（秒）
+            cap (float): 等待时间上限（秒）
+            factor (float): 每次失败后的增长倍数
+        """
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.attempts = 0
+
+    def next_delay(self) -> float:
+        """记录一次失败并返回下一次重试前的等待时间（秒）"""
+        delay = min(self.cap, self.base * self.factor ** self.attempts)
+        self.attempts += 1
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def reset(self):
+        """成功后重置"""
+        self.attempts = 0
+
+
+class CircuitBreaker:
+    """
+    启动浏览器前的熔断器
+
+    打开浏览器访问认证页面连续失败failure_threshold次后断开，之后不再启动浏览器
+    （在收紧后的自适应等待上限内超时不计入失败，可能只是一次偶发的慢响应）；
+    每次请求放行时先做一次快速探测，认证服务器恢复响应后立即闭合
+    """
+
+    def __init__(self, failure_threshold: int = 2, logger=None):
+        """
+        Args:
+            failure_threshold (int): 断开前允许的连续失败次数
+            logger: 日志记录器
+        """
+        self.failure_threshold = failure_threshold
+        self.logger = logger or logging.getLogger(__name__)
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        """是否处于断开状态"""
+        return self.failures >= self.failure_threshold
+
+    def allow(self, probe) -> bool:
+        """
+        是否允许启动浏览器
+
+        Args:
+            probe (PortalProbe): 断开状态下用于确认认证服务器是否恢复的快速探测器
+        """
+        if not self.is_open:
+            return True
+        if probe.probe(force=True).state is ProbeState.UNREACHABLE:
+            return False
+        self.logger.info("认证服务器已恢复响应，恢复使用浏览器")
+        self.record_success()
+        return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            tripped = self.failures == self.failure_threshold
+        if tripped:
+            self.logger.warning("认证页面无法访问，暂停启动浏览器，直到快速探测确认认证服务器恢复")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+认证状态记录
+按账号保存最近一次认证的时间等信息，供后台保活等长期运行的模式使用
+"""
+
+import os
+import json
+import threading
+
+
+class SessionStore:
+    """基于JSON文件的认证状态记录"""
+
+    def __init__(self, path: str = "gdipu_session.json"):
+        """
+        初始化状态记录
+
+        Args:
+            path (str): 记录文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load_all(self) -> dict:
+        """读取全部记录，文件不存在或已损坏时返回空记录"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, username: str) -> dict:
+        """
+        获取账号的认证记录
+
+        Args:
+            username (str): 用户名
+
+        Returns:
+            dict: 认证记录，没有记录时返回空字典
+        """
+        with self._lock:
+            return self._load_all().get(username, {})
+
+    def update(self, username: str, **fields) -> dict:
+        """
+        更新账号的认证记录（先写临时文件再替换，避免写入中断导致记录损坏）
+
+        Args:
+            username (str): 用户名
+            **fields: 要更新的字段
+
+        Returns:
+            dict: 更新后的记录
+        """
+        with self._lock:
+            data = self._load_all()
+            record = data.setdefault(username, {})
+            record.update(fields)
+
+            # 记录中含有Cookie，文件只允许当前用户读写
+            tmp_path = f"{self.path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, "w", encoding="utf-8") as f:
+                os.chmod(tmp_path, 0o600)
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            return record
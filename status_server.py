@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地认证状态服务
+常驻进程通过Unix域套接字或本机HTTP端口提供认证状态查询：是否已认证、IP、最近一次登录时间和
+各操作的最近耗时，查询直接返回内存中预先序列化好的结果，不访问认证服务器也不启动浏览器；
+状态由后台线程定期快速探测刷新。登录、注销、注销再登录请求进入队列，与队列中尚未执行的
+相同请求合并，由唯一的工作线程依次执行，并发请求不会同时启动多个浏览器
+
+用法:
+    python status_server.py
+    python status_server.py --socket /run/user/1000/gdipu.sock --port 8765
+    curl --unix-socket gdipu_status.sock http://localhost/status
+    curl -X POST --unix-socket gdipu_status.sock "http://localhost/login?wait=60"
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+import socketserver
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from gdipu_auto_login import GDIPUAutoLogin, Operations, build_login, load_setting
+from metrics import percentile
+
+
+# 可排队执行的命令
+COMMANDS = ("login", "logout", "relogin")
+
+# 每种操作保留的最近耗时样本数
+LATENCY_WINDOW = 100
+
+# 等待命令完成的上限（秒），防止客户端无限期占用连接
+MAX_WAIT = 300
+
+
+class StatusCache:
+    """内存中的认证状态，每次更新时重新序列化，查询时直接返回字节串"""
+
+    def __init__(self):
+        self.state = {
+            "state": "unknown",
+            "ip": None,
+            "last_login": None,
+            "checked_at": None,
+            "source": None,
+            "running": None,
+            "queued": [],
+            "last_command": None,
+            "latency": {},
+        }
+        self._samples = {}
+        self._lock = threading.Lock()
+        self.payload = self._serialize()
+
+    def _serialize(self) -> bytes:
+        return json.dumps(self.state, ensure_ascii=False).encode("utf-8")
+
+    def update(self, **fields):
+        """更新状态字段"""
+        with self._lock:
+            self.state.update(fields)
+            self.payload = self._serialize()
+
+    def record_latency(self, name: str, seconds: float):
+        """
+        记录一次操作耗时，并更新该操作的耗时统计
+
+        Args:
+            name (str): 操作名称（probe、login、logout、relogin）
+            seconds (float): 耗时（秒）
+        """
+        with self._lock:
+            samples = self._samples.setdefault(name, deque(maxlen=LATENCY_WINDOW))
+            samples.append(seconds)
+            self.state["latency"][name] = {
+                "count": len(samples),
+                "last_ms": round(seconds * 1000, 2),
+                "p50_ms": round(percentile(samples, 0.5) * 1000, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+            }
+            self.payload = self._serialize()
+
+
+class Command:
+    """一条排队中的命令，合并后的多个请求共享同一个实例"""
+
+    def __init__(self, name: str, command_id: int):
+        self.name = name
+        self.id = command_id
+        self.requests = 1
+        self.queued_at = time.time()
+        self.finished_at = None
+        self.ok = None
+        self._done = threading.Event()
+
+    def finish(self, ok: bool):
+        self.ok = ok
+        self.finished_at = time.time()
+        self._done.set()
+
+    def wait(self, timeout: float) -> bool:
+        """等待命令执行完毕，返回是否已完成"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> dict:
+        """转换为可序列化的字典"""
+        return {"id": self.id, "command": self.name, "requests": self.requests,
+                "queued_at": self.queued_at, "finished_at": self.finished_at, "ok": self.ok}
+
+
+class CommandQueue:
+    """命令队列：与尚未执行的相同命令合并，由单个工作线程依次执行"""
+
+    def __init__(self, handler, on_change=None):
+        """
+        Args:
+            handler: 接收命令名称、返回是否成功的可调用对象
+            on_change: 队列或执行状态变化时调用，参数为(running, queued)
+        """
+        self.handler = handler
+        self.on_change = on_change
+        self.running = None
+        self._pending = deque()
+        self._next_id = 1
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def submit(self, name: str) -> tuple:
+        """
+        提交命令
+
+        Args:
+            name (str): 命令名称，COMMANDS之一
+
+        Returns:
+            (Command, bool): 命令实例，以及是否与已在队列中的相同命令合并
+        """
+        with self._condition:
+            if self._stopped:
+                command = Command(name, 0)
+                command.finish(False)
+                return command, False
+            for command in self._pending:
+                if command.name == name:
+                    command.requests += 1
+                    return command, True
+            command = Command(name, self._next_id)
+            self._next_id += 1
+            self._pending.append(command)
+            self._condition.notify()
+            self._changed()
+        return command, False
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self.running, list(self._pending))
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                self.running = self._pending.popleft()
+                self._changed()
+            command = self.running
+            try:
+                ok = bool(self.handler(command.name))
+            except Exception:
+                ok = False
+            command.finish(ok)
+            with self._condition:
+                self.running = None
+                self._changed()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._work, name="gdipu-commands", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        """停止接收新命令；正在执行的命令会执行完毕，队列中其余命令标记为失败"""
+        with self._condition:
+            self._stopped = True
+            pending, self._pending = list(self._pending), deque()
+            self._condition.notify_all()
+        for command in pending:
+            command.finish(False)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class _StatusHandler(BaseHTTPRequestHandler):
+    """状态服务的请求处理，TCP与Unix域套接字共用"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, data: dict):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip("/")
+        if path in ("", "/status"):
+            self._send(200, self.server.status.cache.payload)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        url = urlparse(self.path)
+        name = url.path.strip("/")
+        if name not in COMMANDS:
+            self._send_json(404, {"error": "not found", "commands": list(COMMANDS)})
+            return
+        try:
+            wait = min(float(parse_qs(url.query).get("wait", ["0"])[0]), MAX_WAIT)
+        except ValueError:
+            self._send_json(400, {"error": "invalid wait"})
+            return
+
+        command, merged = self.server.status.queue.submit(name)
+        done = wait > 0 and command.wait(wait)
+        self._send_json(200 if done else 202, dict(command.to_dict(), merged=merged))
+
+
+class _UnixStatusHandler(_StatusHandler):
+    """Unix域套接字上的请求处理（TCP_NODELAY不适用）"""
+
+    disable_nagle_algorithm = False
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix域套接字上的HTTP服务器"""
+
+    daemon_threads = True
+
+
+class StatusServer:
+    """本地认证状态服务"""
+
+    def __init__(self, login: GDIPUAutoLogin, socket_path: str = None, host: str = "127.0.0.1",
+                 port: int = None, refresh_interval: float = 30):
+        """
+        Args:
+            login (GDIPUAutoLogin): 登录实例，所有命令都在同一个实例上依次执行
+            socket_path (str): Unix域套接字路径，None为不监听（不支持Unix域套接字的平台上忽略）
+            host (str): HTTP监听地址
+            port (int): HTTP监听端口，None为不监听，0为自动分配
+            refresh_interval (float): 后台快速探测刷新状态的间隔（秒）
+        """
+        self.login = login
+        self.operations = Operations(login)
+        self.logger = login.logger
+        self.refresh_interval = refresh_interval
+        self.cache = StatusCache()
+        self.queue = CommandQueue(self._execute, self._queue_changed)
+        self.servers = []
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._closed = False
+
+        if socket_path and hasattr(socket, "AF_UNIX"):
+            if os.path.exists(socket_path):
+                # 上次异常退出遗留的套接字文件
+                os.unlink(socket_path)
+            server = _UnixHTTPServer(socket_path, _UnixStatusHandler)
+            os.chmod(socket_path, 0o600)
+            self.servers.append(server)
+        elif socket_path:
+            self.logger.warning("当前平台不支持Unix域套接字，改用HTTP端口")
+            port = 0 if port is None else port
+        if port is not None:
+            server = ThreadingHTTPServer((host, port), _StatusHandler)
+            server.daemon_threads = True
+            self.servers.append(server)
+        for server in self.servers:
+            server.status = self
+
+    @property
+    def addresses(self) -> list:
+        """监听地址：Unix域套接字路径或http://host:port/"""
+        addresses = []
+        for server in self.servers:
+            if isinstance(server.server_address, tuple):
+                host, port = server.server_address[:2]
+                addresses.append(f"http://{host}:{port}/")
+            else:
+                addresses.append(server.server_address)
+        return addresses
+
+    def refresh(self):
+        """快速探测一次认证状态并更新缓存"""
+        result = self.login.probe.probe(force=True)
+        self.cache.record_latency("probe", result.latency)
+        record = self.login.session_store.get(self.login.username) if self.login.session_store else {}
+        times = [t for t in (record.get("last_login"), result.data.get("add_time")) if t]
+        self.cache.update(
+            state=result.state.value,
+            ip=result.ip or self.cache.state["ip"],
+            last_login=max(float(t) for t in times) if times else None,
+            checked_at=result.checked_at,
+            source=result.source,
+        )
+
+    def _execute(self, name: str) -> bool:
+        """在工作线程中执行一条命令，结束后立即刷新状态"""
+        self.logger.info(f"执行命令: {name}")
+        start = time.perf_counter()
+        try:
+            if name == "login":
+                ok = self.operations.execute_login(force=True)
+            elif name == "logout":
+                ok = self.operations.execute_logout()
+            else:
+                ok = self.operations.execute_logout_and_relogin()
+        except Exception as e:
+            self.logger.error(f"执行命令 {name} 异常: {str(e)}")
+            ok = False
+        elapsed = time.perf_counter() - start
+        self.cache.record_latency(name, elapsed)
+        self.cache.update(last_command={"command": name, "ok": bool(ok), "finished_at": time.time(),
+                                        "elapsed_ms": round(elapsed * 1000, 2)})
+        try:
+            self.refresh()
+        except Exception as e:
+            self.logger.warning(f"刷新认证状态失败: {str(e)}")
+        return ok
+
+    def _queue_changed(self, running, queued):
+        self.cache.update(running=running.name if running else None,
+                          queued=[command.name for command in queued])
+
+    def _refresh_loop(self):
+        while not self._stop_event.is_set():
+            # 命令执行结束时已经刷新过，执行期间不重复探测
+            if self.queue.running is None:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.logger.warning(f"刷新认证状态失败: {str(e)}")
+            self._stop_event.wait(self.refresh_interval)
+
+    def start(self):
+        """在后台线程中启动命令队列、状态刷新和各监听服务器"""
+        self.queue.start()
+        self._threads.append(threading.Thread(target=self._refresh_loop, name="gdipu-refresh", daemon=True))
+        for server in self.servers:
+            self._threads.append(threading.Thread(target=server.serve_forever, daemon=True))
+        for thread in self._threads:
+            thread.start()
+        self.logger.info(f"认证状态服务已启动: {', '.join(self.addresses)}")
+        return self
+
+    def request_stop(self):
+        """请求退出（可在信号处理函数中调用），wait()随即返回"""
+        self._stop_event.set()
+
+    def wait(self):
+        """阻塞直到request_stop()或stop()被调用"""
+        while not self._stop_event.wait(1):
+            pass
+
+    def stop(self):
+        """停止服务并关闭浏览器"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_event.set()
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+            if not isinstance(server.server_address, tuple):
+                try:
+                    os.unlink(server.server_address)
+                except OSError:
+                    pass
+        self.queue.stop(timeout=MAX_WAIT)
+        self.login.cleanup()
+        self.logger.info("认证状态服务已退出")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地认证状态服务：从内存返回认证状态，排队执行登录/注销命令")
+    parser.add_argument("--socket", default=load_setting("STATUS_SOCKET", "gdipu_status.sock"),
+                        help="Unix域套接字路径，空字符串为不监听")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=load_setting("STATUS_PORT", None),
+                        help="HTTP监听端口，默认不监听")
+    parser.add_argument("--refresh-interval", type=float, default=load_setting("STATUS_REFRESH_INTERVAL", 30),
+                        help="快速探测刷新状态的间隔（秒）")
+    args = parser.parse_args()
+
+    login = build_login()
+    # 上次异常退出遗留的浏览器进程会一直占用内存，启动时先清理
+    governor = login.session.governor
+    if governor and governor.reap_orphans:
+        governor.reap()
+    server = StatusServer(login, socket_path=args.socket or None, host=args.host, port=args.port,
+                          refresh_interval=args.refresh_interval)
+    if not server.servers:
+        parser.error("未指定Unix域套接字或HTTP端口")
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.request_stop())
+    server.start()
+    for address in server.addresses:
+        print(f"认证状态服务已启动: {address}")
+    try:
+        server.wait()
+    except KeyboardInterrupt:
+        print("\n⚠️  用户中断操作")
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
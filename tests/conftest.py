@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共配置
+各模块位于仓库根目录；测试在临时目录中运行，日志只保留在内存中，不会在仓库中留下日志、指标等文件
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logging_setup import setup_logging  # noqa: E402
+from metrics import PhaseMetrics  # noqa: E402
+from mock_portal import MockPortal, MockPortalServer  # noqa: E402
+
+
+ACCOUNTS = {"2023001": "secret", "2023002": "hunter2"}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet_logging():
+    setup_logging(level="DEBUG", log_file=None, console=False)
+
+
+@pytest.fixture(autouse=True)
+def in_tmp_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def portal():
+    """在本机随机端口运行的模拟认证服务器，返回(MockPortal, MockPortalServer)"""
+    state = MockPortal(ACCOUNTS)
+    with MockPortalServer(state) as server:
+        yield state, server
+
+
+@pytest.fixture
+def no_metrics():
+    """不写文件的计时记录器"""
+    return PhaseMetrics(jsonl_path=None, prometheus_path=None)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""fleet_scheduler：共用计划文件的读写与互斥，以及错峰时间的安排"""
+
+import json
+import multiprocessing
+import threading
+
+import pytest
+
+from fleet_scheduler import FleetScheduler, SharedSchedule
+
+
+def increment(path: str, times: int):
+    schedule = SharedSchedule(path)
+    for _ in range(times):
+        with schedule.transaction() as data:
+            data["last_start"] += 1
+
+
+def test_missing_or_corrupt_file_reads_as_empty(tmp_path):
+    path = tmp_path / "fleet.json"
+    schedule = SharedSchedule(str(path))
+    assert schedule.read() == {"accounts": {}, "last_start": 0}
+    path.write_text("[1, 2", encoding="utf-8")
+    assert schedule.read() == {"accounts": {}, "last_start": 0}
+
+
+def test_transaction_persists_changes(tmp_path):
+    path = tmp_path / "fleet.json"
+    schedule = SharedSchedule(str(path))
+    with schedule.transaction() as data:
+        data["accounts"]["2023001"] = {"slot": 123.0}
+    assert json.loads(path.read_text(encoding="utf-8"))["accounts"] == {"2023001": {"slot": 123.0}}
+    assert SharedSchedule(str(path)).read()["accounts"]["2023001"]["slot"] == 123.0
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_transaction_not_written_on_error(tmp_path):
+    path = tmp_path / "fleet.json"
+    schedule = SharedSchedule(str(path))
+    with pytest.raises(RuntimeError):
+        with schedule.transaction() as data:
+            data["last_start"] = 99
+            raise RuntimeError
+    assert schedule.read()["last_start"] == 0
+
+
+def test_transactions_are_serialized_across_threads(tmp_path):
+    path = str(tmp_path / "fleet.json")
+    schedule = SharedSchedule(path)
+
+    def work():
+        for _ in range(25):
+            with schedule.transaction() as data:
+                data["last_start"] += 1
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert schedule.read()["last_start"] == 100
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="需要fork")
+def test_transactions_are_serialized_across_processes(tmp_path):
+    path = str(tmp_path / "fleet.json")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=increment, args=(path, 20)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+    assert SharedSchedule(path).read()["last_start"] == 60
+
+
+def make_scheduler(tmp_path, **kwargs):
+    return FleetScheduler([], schedule=SharedSchedule(str(tmp_path / "fleet.json")), **kwargs)
+
+
+def test_plan_slot_stays_in_window_and_spaced(tmp_path):
+    scheduler = make_scheduler(tmp_path, reauth_margin=600, window=1800, min_interval=60)
+    now, expires_at = 1000.0, 100000.0
+    taken = []
+    for _ in range(20):
+        slot = scheduler.plan_slot(expires_at, taken, now)
+        assert expires_at - 600 - 1800 <= slot <= expires_at - 600
+        assert all(abs(slot - other) >= 60 for other in taken)
+        taken.append(slot)
+
+
+def test_plan_slot_past_window_returns_now(tmp_path):
+    scheduler = make_scheduler(tmp_path, reauth_margin=600, window=1800)
+    assert scheduler.plan_slot(expires_at=1500.0, taken=[], now=1000.0) == 1000.0
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""GDIPUAutoLogin的HTTP引擎与模拟认证服务器的登录/状态/注销往返（不启动浏览器）"""
+
+from conftest import ACCOUNTS
+from gdipu_auto_login import GDIPUAutoLogin
+from portal_probe import ProbeState
+from session_store import SessionStore
+
+
+def make_login(server, metrics, username="2023001", password=None, **kwargs):
+    kwargs.setdefault("session_store", None)
+    return GDIPUAutoLogin(username, password or ACCOUNTS[username], engine="http", target_url=server.url,
+                          metrics=metrics, **kwargs)
+
+
+def test_login_status_logout_roundtrip(portal, no_metrics):
+    state, server = portal
+    login = make_login(server, no_metrics)
+    assert login.probe.probe(force=True).state is ProbeState.LOGGED_OUT
+
+    assert login.login(force=True) is True
+    assert state.is_online("127.0.0.1")
+    assert login.session_ip == "127.0.0.1"
+    assert login.probe.probe(force=True).state is ProbeState.LOGGED_IN
+
+    assert login.http_logout() is True
+    assert not state.is_online("127.0.0.1")
+    assert login.probe.probe(force=True).state is ProbeState.LOGGED_OUT
+    # 未登录时注销报告失败
+    assert login.http_logout() is False
+
+
+def test_login_when_already_online_skips_submit(portal, no_metrics):
+    state, server = portal
+    make_login(server, no_metrics).login(force=True)
+    submits = state.request_counts.get("/cgi-bin/srun_portal", 0)
+    assert make_login(server, no_metrics).login(force=True) is True
+    assert state.request_counts.get("/cgi-bin/srun_portal", 0) == submits
+
+
+def test_wrong_password_fails_without_fallback(portal, no_metrics):
+    state, server = portal
+    login = make_login(server, no_metrics, password="wrong")
+    assert login.login(force=True) is False
+    assert not state.is_online("127.0.0.1")
+
+
+def test_portal_down_reports_engine_unavailable(portal, no_metrics):
+    state, server = portal
+    state.down = True
+    login = make_login(server, no_metrics, ac_id="1")
+    assert login.http_login() is None
+
+
+def test_session_cache_skips_portal(portal, no_metrics, tmp_path):
+    state, server = portal
+    store = SessionStore(str(tmp_path / "session.json"))
+    assert make_login(server, no_metrics, session_store=store).login() is True
+    requests = sum(state.request_counts.values())
+
+    assert make_login(server, no_metrics, session_store=store).login() is True
+    assert sum(state.request_counts.values()) == requests
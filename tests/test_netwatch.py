@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""netwatch.parse_netlink_messages：按内核格式拼出的netlink消息，包括截断和畸形的消息"""
+
+import socket
+import struct
+
+from netwatch import (
+    IFA_ADDRESS, IFA_LOCAL, RTM_DELADDR, RTM_NEWADDR, RTM_NEWLINK, RTM_NEWROUTE, parse_netlink_messages,
+)
+
+NLMSG_DONE = 3
+
+
+def rtattr(attr_type: int, payload: bytes) -> bytes:
+    length = 4 + len(payload)
+    return struct.pack("=HH", length, attr_type) + payload + b"\0" * (-length % 4)
+
+
+def nlmsg(msg_type: int, body: bytes) -> bytes:
+    length = 16 + len(body)
+    return struct.pack("=IHHII", length, msg_type, 0, 1, 0) + body + b"\0" * (-length % 4)
+
+
+def addr_msg(msg_type: int, address: str, index: int = 2, attr_type: int = IFA_LOCAL) -> bytes:
+    ifaddrmsg = struct.pack("=BBBBI", socket.AF_INET, 24, 0, 0, index)
+    return nlmsg(msg_type, ifaddrmsg + rtattr(attr_type, socket.inet_aton(address)))
+
+
+def test_address_events():
+    data = addr_msg(RTM_NEWADDR, "10.20.30.40", index=3) + addr_msg(RTM_DELADDR, "10.20.30.41", attr_type=IFA_ADDRESS)
+    events = parse_netlink_messages(data)
+    assert [(e.kind, e.action, e.address) for e in events] == [
+        ("address", "new", "10.20.30.40"), ("address", "del", "10.20.30.41"),
+    ]
+    assert events[0].interface == 3
+
+
+def test_link_and_route_events_and_ignored_types():
+    data = nlmsg(RTM_NEWLINK, b"\0" * 16) + nlmsg(NLMSG_DONE, b"\0" * 4) + nlmsg(RTM_NEWROUTE, b"\0" * 12)
+    assert [(e.kind, e.action) for e in parse_netlink_messages(data)] == [("link", "new"), ("route", "new")]
+
+
+def test_ipv6_address():
+    ifaddrmsg = struct.pack("=BBBBI", socket.AF_INET6, 64, 0, 0, 1)
+    payload = socket.inet_pton(socket.AF_INET6, "fe80::1")
+    events = parse_netlink_messages(nlmsg(RTM_NEWADDR, ifaddrmsg + rtattr(IFA_ADDRESS, payload)))
+    assert events[0].address == "fe80::1"
+
+
+def test_truncated_buffer_keeps_complete_messages():
+    first = addr_msg(RTM_NEWADDR, "10.0.0.1")
+    second = addr_msg(RTM_NEWADDR, "10.0.0.2")
+    for cut in range(1, len(second)):
+        events = parse_netlink_messages(first + second[:cut])
+        assert events[0].address == "10.0.0.1"
+        # 被截断的第二条消息只解析实际收到的部分，不会越界读取
+        assert all(e.address in (None, "10.0.0.2") for e in events[1:])
+
+
+def test_malformed_lengths_do_not_loop_or_raise():
+    header_too_short = struct.pack("=IHHII", 8, RTM_NEWADDR, 0, 0, 0)
+    assert parse_netlink_messages(header_too_short) == []
+
+    ifaddrmsg = struct.pack("=BBBBI", socket.AF_INET, 24, 0, 0, 1)
+    zero_attr = struct.pack("=HH", 0, IFA_LOCAL) + b"\0" * 4
+    oversized_attr = struct.pack("=HH", 200, IFA_LOCAL) + b"\0" * 4
+    for attr in (zero_attr, oversized_attr):
+        events = parse_netlink_messages(nlmsg(RTM_NEWADDR, ifaddrmsg + attr))
+        assert [(e.kind, e.address) for e in events] == [("address", None)]
+
+    assert parse_netlink_messages(b"") == []
+    assert parse_netlink_messages(b"\xff" * 7) == []
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""portal_http：页面脚本加密算法的协议向量，以及HTTP客户端与模拟认证服务器的往返"""
+
+import base64
+import hashlib
+import json
+
+import pytest
+
+from conftest import ACCOUNTS
+from portal_http import (
+    PortalAuthError, PortalHTTPClient, PortalUnavailableError, _from_words, _to_words,
+    encode_user_info, hmac_md5, login_checksum, parse_jsonp, srun_base64, xencode,
+)
+
+
+def xdecode(cipher: str, key: str) -> str:
+    """标准XXTEA解密，作为xencode的独立逆运算"""
+    v = _to_words(cipher, False)
+    k = _to_words(key, False)
+    k += [0] * (4 - len(k))
+    n = len(v) - 1
+    delta = 0x9E3779B9
+    rounds = 6 + 52 // (n + 1)
+    d = (rounds * delta) & 0xFFFFFFFF
+    y = v[0]
+    while d:
+        e = d >> 2 & 3
+        for p in range(n, -1, -1):
+            z = v[p - 1] if p > 0 else v[n]
+            m = (z >> 5 ^ y << 2) + ((y >> 3 ^ z << 4) ^ (d ^ y)) + (k[(p & 3) ^ e] ^ z)
+            v[p] = y = (v[p] - m) & 0xFFFFFFFF
+        d = (d - delta) & 0xFFFFFFFF
+    length = v.pop()
+    return _from_words(v)[:length]
+
+
+@pytest.mark.parametrize("message", ["a", "abcd", '{"username":"2023001","password":"secret"}', "x" * 257])
+def test_xencode_roundtrip(message):
+    token = hashlib.sha256(message.encode()).hexdigest()
+    cipher = xencode(message, token)
+    # 明文按4字节打包，末尾追加长度字
+    assert len(cipher) == 4 * (len(_to_words(message, False)) + 1)
+    assert xdecode(cipher, token) == message
+
+
+def test_xencode_delta_is_xxtea_constant():
+    assert 0x86014019 | 0x183639A0 == 0x9E3779B9
+
+
+def test_xencode_empty_message():
+    assert xencode("", "key") == ""
+
+
+def test_srun_base64_uses_portal_alphabet():
+    assert srun_base64("\x00\x00\x00") == "LLLL"
+    standard = base64.b64encode(bytes(range(256))).decode()
+    custom = srun_base64("".join(map(chr, range(256))))
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+    portal = "LVoJPiCN2R8G90yg+hmFHuacZ1OWMnrsSTXkYpUq/3dlbfKwv6xztjI7DeBE45QA"
+    assert custom == standard.translate(str.maketrans(alphabet, portal))
+
+
+def test_hmac_md5_rfc2202_vector():
+    assert hmac_md5("what do ya want for nothing?", "Jefe") == "750c783e6ab0b503eaa86e310a5db738"
+
+
+def test_encode_user_info_decodes_to_payload():
+    token = "0123456789abcdef" * 4
+    info = encode_user_info("2023001", "secret", "10.1.2.3", "1", token)
+    assert info.startswith("{SRBX1}")
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+    portal = "LVoJPiCN2R8G90yg+hmFHuacZ1OWMnrsSTXkYpUq/3dlbfKwv6xztjI7DeBE45QA"
+    cipher = base64.b64decode(info[len("{SRBX1}"):].translate(str.maketrans(portal, alphabet))).decode("latin-1")
+    assert json.loads(xdecode(cipher, token)) == {
+        "username": "2023001", "password": "secret", "ip": "10.1.2.3", "acid": "1", "enc_ver": "srun_bx1",
+    }
+
+
+def test_login_checksum_concatenates_token_before_each_field():
+    fields = ("2023001", "hmd5", "1", "10.1.2.3", "200", "1", "{SRBX1}info")
+    expected = hashlib.sha1(("tok" + "tok".join(fields)).encode()).hexdigest()
+    assert login_checksum("tok", *fields) == expected
+
+
+@pytest.mark.parametrize("text", [
+    'jQuery1124_1({"error":"ok","online_ip":"10.0.0.1"})',
+    'jQuery1124_1({"error":"ok","online_ip":"10.0.0.1"});\n',
+    '{"error":"ok","online_ip":"10.0.0.1"}',
+])
+def test_parse_jsonp(text):
+    assert parse_jsonp(text) == {"error": "ok", "online_ip": "10.0.0.1"}
+
+
+@pytest.mark.parametrize("text", ["<html>portal</html>", "cb([1, 2])", ""])
+def test_parse_jsonp_rejects_unexpected_responses(text):
+    with pytest.raises(PortalUnavailableError):
+        parse_jsonp(text)
+
+
+def test_client_login_status_logout(portal):
+    state, server = portal
+    client = PortalHTTPClient(server.url, "2023001", ACCOUNTS["2023001"])
+    assert not client.is_online()
+    assert client.detect_ac_id() == state.ac_id
+
+    client.login()
+    assert client.is_online()
+    assert client.last_ip == "127.0.0.1"
+    assert state.is_online("127.0.0.1")
+
+    client.logout()
+    assert not client.is_online()
+
+
+def test_client_wrong_password_is_auth_error(portal):
+    state, server = portal
+    client = PortalHTTPClient(server.url, "2023001", "wrong")
+    with pytest.raises(PortalAuthError):
+        client.login()
+    assert not state.is_online("127.0.0.1")
+
+
+def test_client_portal_down_is_unavailable(portal):
+    state, server = portal
+    state.down = True
+    client = PortalHTTPClient(server.url, "2023001", ACCOUNTS["2023001"], ac_id="1")
+    with pytest.raises(PortalUnavailableError):
+        client.login()
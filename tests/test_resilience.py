@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""resilience：退避、熔断器和自适应等待上限"""
+
+import pytest
+
+from portal_probe import ProbeResult, ProbeState
+from resilience import AdaptiveTimeouts, Backoff, CircuitBreaker
+
+
+class FakeProbe:
+    def __init__(self, state: ProbeState):
+        self.state = state
+        self.calls = 0
+
+    def probe(self, force: bool = False) -> ProbeResult:
+        self.calls += 1
+        return ProbeResult(self.state, "test", 0.0)
+
+
+def test_backoff_grows_with_jitter_and_cap(monkeypatch):
+    monkeypatch.setattr("resilience.random.uniform", lambda low, high: high)
+    backoff = Backoff(base=10, cap=50, factor=2)
+    assert [backoff.next_delay() for _ in range(5)] == [10, 20, 40, 50, 50]
+    assert backoff.attempts == 5
+    backoff.reset()
+    assert backoff.attempts == 0
+
+
+def test_backoff_jitter_stays_within_half_to_full_delay():
+    backoff = Backoff(base=8, cap=8)
+    for _ in range(100):
+        assert 4 <= backoff.next_delay() <= 8
+
+
+def test_breaker_trips_after_threshold_and_recovers_on_probe():
+    breaker = CircuitBreaker(failure_threshold=2)
+    probe = FakeProbe(ProbeState.UNREACHABLE)
+    breaker.record_failure()
+    assert breaker.allow(probe) and probe.calls == 0
+
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow(probe)
+
+    probe.state = ProbeState.LOGGED_OUT
+    assert breaker.allow(probe)
+    assert not breaker.is_open
+
+
+def test_breaker_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.is_open
+
+
+def test_adaptive_timeouts_use_defaults_until_enough_samples():
+    timeouts = AdaptiveTimeouts({"login": 20}, ceiling=30, min_samples=5)
+    for _ in range(4):
+        timeouts.observe("login", 0.1)
+    assert timeouts["login"] == 20
+    assert not timeouts.tightened("login")
+
+
+def test_adaptive_timeouts_tighten_to_per_step_floor():
+    timeouts = AdaptiveTimeouts({"login": 20, "fill": 3}, ceiling=30, floor=1.0, floor_ratio=0.5)
+    for _ in range(10):
+        timeouts.observe("login", 0.1)
+        timeouts.observe("fill", 0.1)
+    # 收紧后不低于默认值的一半，也不低于全局下限
+    assert timeouts["login"] == 10
+    assert timeouts["fill"] == 1.5
+    assert timeouts.tightened("login")
+
+
+def test_adaptive_timeouts_follow_p95_and_ceiling():
+    timeouts = AdaptiveTimeouts({"page_load": 30}, ceiling=25, multiplier=3.0, headroom=1.0)
+    assert timeouts["page_load"] == 25
+    for _ in range(20):
+        timeouts.observe("page_load", 6.0)
+    assert timeouts["page_load"] == 18
+    for _ in range(20):
+        timeouts.observe("page_load", 20.0)
+    assert timeouts["page_load"] == 25
+
+
+def test_adaptive_timeouts_disabled():
+    timeouts = AdaptiveTimeouts({"login": 20}, ceiling=15, enabled=False)
+    for _ in range(10):
+        timeouts.observe("login", 0.1)
+    assert timeouts.snapshot() == {"login": 15}
+
+
+def test_unknown_step_raises():
+    with pytest.raises(KeyError):
+        AdaptiveTimeouts({"login": 20})["missing"]
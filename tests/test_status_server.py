@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""status_server.CommandQueue：相同命令合并、单线程依次执行和停止"""
+
+import threading
+
+from status_server import CommandQueue
+
+
+class BlockingHandler:
+    """第一条命令阻塞到release()，记录执行顺序"""
+
+    def __init__(self, result=True):
+        self.result = result
+        self.executed = []
+        self.started = threading.Event()
+        self._release = threading.Event()
+
+    def __call__(self, name):
+        self.executed.append(name)
+        self.started.set()
+        self._release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+    def release(self):
+        self._release.set()
+
+
+def test_pending_commands_merge_while_one_runs():
+    handler = BlockingHandler()
+    commands = CommandQueue(handler).start()
+    try:
+        running, merged = commands.submit("login")
+        assert not merged
+        assert handler.started.wait(5)
+
+        queued = [commands.submit(name) for name in ("logout", "login", "logout", "login")]
+        assert [merged for _, merged in queued] == [False, False, True, True]
+        logout, login = queued[0][0], queued[1][0]
+        assert queued[2][0] is logout and queued[3][0] is login
+        assert login is not running and login.requests == 2
+
+        handler.release()
+        assert login.wait(5) and logout.wait(5) and running.wait(5)
+        assert handler.executed == ["login", "logout", "login"]
+        assert running.ok and logout.ok and login.ok
+        assert login.id > logout.id > running.id
+    finally:
+        handler.release()
+        commands.stop(5)
+
+
+def test_handler_exception_marks_command_failed():
+    handler = BlockingHandler(result=RuntimeError("boom"))
+    handler.release()
+    commands = CommandQueue(handler).start()
+    try:
+        command, _ = commands.submit("relogin")
+        assert command.wait(5)
+        assert command.ok is False
+        assert command.to_dict()["command"] == "relogin"
+    finally:
+        commands.stop(5)
+
+
+def test_on_change_reports_running_and_queued():
+    handler = BlockingHandler()
+    changes = []
+    commands = CommandQueue(handler, on_change=lambda running, queued: changes.append(
+        (running and running.name, [c.name for c in queued]))).start()
+    try:
+        commands.submit("login")
+        assert handler.started.wait(5)
+        commands.submit("logout")
+        assert ("login", ["logout"]) in changes
+        handler.release()
+        assert commands.submit("logout")[0].wait(5)
+    finally:
+        handler.release()
+        commands.stop(5)
+
+
+def test_stop_fails_pending_and_rejects_new_commands():
+    handler = BlockingHandler()
+    commands = CommandQueue(handler).start()
+    running, _ = commands.submit("login")
+    assert handler.started.wait(5)
+    pending, _ = commands.submit("logout")
+
+    stopper = threading.Thread(target=commands.stop, args=(5,))
+    stopper.start()
+    assert pending.wait(5) and pending.ok is False
+    handler.release()
+    stopper.join(5)
+    assert running.ok is True
+
+    rejected, merged = commands.submit("login")
+    assert rejected.wait(0) and rejected.ok is False and not merged
+    assert handler.executed == ["login"]
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+当前登录用户信息
+从rad_user_info接口返回的数据或一次取回的认证页面源码中一次性解析出IP、账号、在线时长、
+已用流量和会话过期时间，不必为每个字段单独查找页面元素
+"""
+
+import re
+import time
+
+from lazy_import import LazyImport
+
+
+BeautifulSoup = LazyImport("bs4", "BeautifulSoup")
+
+# 认证成功页面中各字段可能使用的元素id，按顺序取第一个有内容的
+PAGE_FIELDS = {
+    "account": ("user-account", "username", "user_name"),
+    "ip": ("ipv4", "user_ip"),
+    "used_flow": ("used-flow", "used_flow", "sum_bytes"),
+    "used_time": ("used-time", "used_time", "sum_seconds"),
+    "balance": ("balance", "user_balance", "wallet"),
+}
+
+_FLOW_UNITS = {"": 1, "B": 1, "K": 1 << 10, "KB": 1 << 10, "M": 1 << 20, "MB": 1 << 20,
+               "G": 1 << 30, "GB": 1 << 30, "T": 1 << 40, "TB": 1 << 40}
+_TIME_UNITS = {"天": 86400, "小时": 3600, "时": 3600, "分钟": 60, "分": 60, "秒": 1,
+               "d": 86400, "h": 3600, "m": 60, "s": 1}
+
+
+def parse_flow(text: str):
+    """把"12.34 MB"之类的流量文本换算为字节数，无法识别时返回None"""
+    match = re.match(r"\s*([\d.]+)\s*([KMGT]?B?)\s*$", str(text or ""), re.IGNORECASE)
+    if not match:
+        return None
+    try:
+        return int(float(match.group(1)) * _FLOW_UNITS[match.group(2).upper()])
+    except ValueError:
+        return None
+
+
+def parse_duration(text: str):
+    """把"123 秒"、"1小时2分3秒"或"01:02:03"之类的时长文本换算为秒数，无法识别时返回None"""
+    text = str(text or "").strip()
+    if re.fullmatch(r"\d+(:\d{1,2}){1,2}", text):
+        seconds = 0
+        for part in text.split(":"):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    if re.fullmatch(r"\d+", text):
+        return int(text)
+    seconds, found = 0, False
+    for value, unit in re.findall(r"(\d+)\s*(天|小时|时|分钟|分|秒|[dhms])", text):
+        seconds += int(value) * _TIME_UNITS[unit]
+        found = True
+    return seconds if found else None
+
+
+class UserInfo:
+    """当前登录用户信息，认证服务器没有提供的字段为None"""
+
+    FIELDS = ("ip", "account", "online_seconds", "used_bytes", "balance",
+              "login_time", "expires_at", "source", "fetched_at")
+
+    def __init__(self, ip: str = None, account: str = None, online_seconds: int = None,
+                 used_bytes: int = None, balance: float = None, login_time: float = None,
+                 expires_at: float = None, source: str = None, fetched_at: float = None):
+        """
+        Args:
+            ip (str): 本机IP地址
+            account (str): 登录账号
+            online_seconds (int): 本次在线时长（秒）
+            used_bytes (int): 已用流量（字节）
+            balance (float): 账户余额
+            login_time (float): 本次上线时间戳
+            expires_at (float): 按认证有效期推算的会话过期时间戳
+            source (str): 信息来源：portal（状态接口）或page（认证页面）
+            fetched_at (float): 获取时间戳
+        """
+        self.ip = ip
+        self.account = account
+        self.online_seconds = online_seconds
+        self.used_bytes = used_bytes
+        self.balance = balance
+        self.login_time = login_time
+        self.expires_at = expires_at
+        self.source = source
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+
+    @classmethod
+    def from_status(cls, data: dict, session_lifetime: float = None):
+        """
+        从rad_user_info接口返回的数据解析
+
+        Args:
+            data (dict): 接口返回的数据
+            session_lifetime (float): 认证有效期（秒），用于推算过期时间
+        """
+        def number(key, kind=int):
+            try:
+                return kind(data[key]) if data.get(key) not in (None, "") else None
+            except (TypeError, ValueError):
+                return None
+
+        login_time = number("add_time", float)
+        online_seconds = number("sum_seconds")
+        if login_time is not None and online_seconds is None:
+            online_seconds = int((number("keepalive_time", float) or time.time()) - login_time)
+        return cls(
+            ip=data.get("online_ip") or data.get("client_ip"),
+            account=data.get("user_name") or data.get("username"),
+            online_seconds=online_seconds,
+            used_bytes=number("sum_bytes"),
+            balance=number("user_balance", float),
+            login_time=login_time,
+            expires_at=login_time + session_lifetime if login_time is not None and session_lifetime else None,
+            source="portal",
+        )
+
+    @classmethod
+    def from_page(cls, html: str, session_lifetime: float = None):
+        """
+        从认证页面源码解析
+
+        Args:
+            html (str): 页面源码
+            session_lifetime (float): 认证有效期（秒），用于推算过期时间
+
+        Returns:
+            UserInfo: 页面中没有IP地址（未登录）时返回None
+        """
+        soup = BeautifulSoup(html, "lxml")
+        values = {}
+        for field, ids in PAGE_FIELDS.items():
+            for element_id in ids:
+                element = soup.find(id=element_id)
+                # 登录页面中的同名输入框不是用户信息
+                if element is None or element.name in ("input", "textarea"):
+                    continue
+                text = element.get_text(strip=True)
+                if text:
+                    values[field] = text
+                    break
+        if not values.get("ip"):
+            return None
+
+        fetched_at = time.time()
+        online_seconds = parse_duration(values.get("used_time"))
+        login_time = fetched_at - online_seconds if online_seconds is not None else None
+        try:
+            balance = float(re.sub(r"[^\d.]", "", values["balance"])) if values.get("balance") else None
+        except ValueError:
+            balance = None
+        return cls(
+            ip=values["ip"],
+            account=values.get("account"),
+            online_seconds=online_seconds,
+            used_bytes=parse_flow(values.get("used_flow")),
+            balance=balance,
+            login_time=login_time,
+            expires_at=login_time + session_lifetime if login_time is not None and session_lifetime else None,
+            source="page",
+            fetched_at=fetched_at,
+        )
+
+    def age(self) -> float:
+        """距获取时的秒数"""
+        return time.time() - self.fetched_at
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def describe(self) -> str:
+        """可读的多行描述，省略认证服务器没有提供的字段"""
+        lines = [f"当前用户IP地址: {self.ip}"]
+        if self.account:
+            lines.append(f"账号: {self.account}")
+        if self.online_seconds is not None:
+            hours, rest = divmod(int(self.online_seconds), 3600)
+            lines.append(f"在线时长: {hours}小时{rest // 60}分{rest % 60}秒")
+        if self.used_bytes is not None:
+            lines.append(f"已用流量: {self.used_bytes / (1 << 20):.2f} MB")
+        if self.balance is not None:
+            lines.append(f"账户余额: {self.balance:.2f}")
+        if self.expires_at is not None:
+            lines.append(f"预计过期时间: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.expires_at))}")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"UserInfo(ip={self.ip}, account={self.account}, source={self.source})"